@@ -0,0 +1,190 @@
+import heapq
+import math
+
+# Up to this many tickers the exact solver stays interactive
+EXACT_MAX_TICKERS = 12
+
+
+# --- Multi-Ticker Budget Allocation ---
+def lot_costs(prices, buy_fee_pct):
+    """
+    Cost of one 100-share lot per ticker, including the buy fee. For a
+    fees.FeeSide this is its flat rate, ignoring the minimum commission and tiers.
+    """
+    try:
+        b_fee = buy_fee_pct / 100
+    except TypeError:
+        b_fee = buy_fee_pct.flat_pct / 100
+    return [(price * 100) * (1 + b_fee) for price in prices]
+
+
+def normalize_weights(weights, n_tickers):
+    """Target weights as fractions summing to 1 (equal weights when none are given)."""
+    if weights is None:
+        return [1 / n_tickers] * n_tickers
+    total = sum(weights)
+    if total <= 0:
+        raise ValueError("Bobot target harus lebih dari nol.")
+    return [w / total for w in weights]
+
+
+def allocation_error(lots, costs, targets):
+    """Sum of squared deviations (IDR^2) between money spent and the target amount per ticker."""
+    return sum((c * x - t) ** 2 for x, c, t in zip(lots, costs, targets))
+
+
+def allocate_exact(budget, costs, targets):
+    """
+    Exact integer-lot allocation by depth-first branch and bound.
+
+    Candidate lot counts for each ticker are explored outward from its ideal
+    (fractional) count, and a branch is cut as soon as its error plus the
+    best-case error of the remaining tickers cannot beat the incumbent.
+    Intended for a handful of tickers.
+    """
+    n = len(costs)
+    # Best error each ticker can reach on its own, ignoring the budget
+    best_single = []
+    for c, t in zip(costs, targets):
+        ideal = t / c
+        best_single.append(min((c * x - t) ** 2 for x in {math.floor(ideal), math.ceil(ideal)}))
+    tail_bound = [0.0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        tail_bound[i] = tail_bound[i + 1] + best_single[i]
+
+    best = {"error": float("inf"), "lots": [0] * n}
+    lots = [0] * n
+
+    def search(i, remaining, error):
+        if error + tail_bound[i] >= best["error"]:
+            return
+        if i == n:
+            best["error"] = error
+            best["lots"] = lots.copy()
+            return
+        c, t = costs[i], targets[i]
+        max_lots = int(remaining // c)
+        ideal = min(max(round(t / c), 0), max_lots)
+        # Walk outward from the ideal count; the error grows monotonically each way
+        for direction in (0, -1, 1):
+            x = ideal if direction == 0 else ideal + direction
+            while 0 <= x <= max_lots:
+                step_error = (c * x - t) ** 2
+                if error + step_error + tail_bound[i + 1] >= best["error"]:
+                    break
+                lots[i] = x
+                search(i + 1, remaining - c * x, error + step_error)
+                if direction == 0:
+                    break
+                x += direction
+        lots[i] = 0
+
+    search(0, budget, 0.0)
+    return best["lots"]
+
+
+def allocate_greedy(budget, costs, targets):
+    """
+    Fast approximate allocation for many tickers.
+
+    Starts from the floor of each ideal lot count (always affordable because
+    the targets sum to the budget) and then spends the leftover one lot at a
+    time on whichever ticker reduces the error the most, using a heap.
+    """
+    lots = [int(t // c) for c, t in zip(costs, targets)]
+    remaining = budget - sum(c * x for c, x in zip(costs, lots))
+
+    def gain(i):
+        c, t, x = costs[i], targets[i], lots[i]
+        return (c * (x + 1) - t) ** 2 - (c * x - t) ** 2
+
+    heap = [(gain(i), i) for i in range(len(costs))]
+    heapq.heapify(heap)
+    while heap:
+        delta, i = heapq.heappop(heap)
+        if delta >= 0:
+            break
+        if costs[i] > remaining:
+            continue
+        lots[i] += 1
+        remaining -= costs[i]
+        heapq.heappush(heap, (gain(i), i))
+    return lots
+
+
+def fit_to_schedule(budget, prices, lots, targets, buy_fee):
+    """
+    Adjusts an allocation solved at a fee schedule's flat rate to the fees
+    actually charged per order (minimum commission, tiers).
+
+    Lots are removed while the orders cost more than the budget, each time
+    from the ticker whose error grows least, then added one at a time while
+    one still fits and brings a ticker closer to its target. Returns
+    (lots, order_costs).
+    """
+    lots = list(lots)
+
+    def spent(i, x):
+        # Same order of operations as calculations.calculate_cost_basis
+        value = x * 100 * prices[i]
+        return value + buy_fee.fee(value)
+
+    def change(i, x):
+        return (spent(i, x) - targets[i]) ** 2 - (costs[i] - targets[i]) ** 2
+
+    costs = [spent(i, x) for i, x in enumerate(lots)]
+    total = sum(costs)
+    while total > budget:
+        i = min((i for i in range(len(lots)) if lots[i] > 0), key=lambda i: change(i, lots[i] - 1))
+        lots[i] -= 1
+        total -= costs[i]
+        costs[i] = spent(i, lots[i])
+        total += costs[i]
+    while True:
+        fits = [i for i in range(len(lots)) if total - costs[i] + spent(i, lots[i] + 1) <= budget]
+        i = min(fits, key=lambda i: change(i, lots[i] + 1), default=None)
+        if i is None or change(i, lots[i] + 1) >= 0:
+            break
+        lots[i] += 1
+        total -= costs[i]
+        costs[i] = spent(i, lots[i])
+        total += costs[i]
+    return lots, costs
+
+
+def allocate_budget(budget, prices, weights=None, buy_fee_pct=0.0, method="auto"):
+    """
+    Splits one budget across several tickers in whole lots toward target weights.
+
+    Returns (lots_per_ticker, total_cost). `method` is "exact", "greedy" or
+    "auto" (exact for up to EXACT_MAX_TICKERS tickers, greedy beyond that).
+    buy_fee_pct is a percentage or a fees.FeeSide; a schedule is solved at its
+    flat rate and then fitted to its real per-order fees (fit_to_schedule), so
+    total_cost never exceeds the budget.
+    """
+    if not prices:
+        return [], 0
+    if any(price <= 0 for price in prices):
+        raise ValueError("Harga saham tidak boleh nol.")
+
+    costs = lot_costs(prices, buy_fee_pct)
+    targets = [w * budget for w in normalize_weights(weights, len(prices))]
+
+    if method == "auto":
+        method = "exact" if len(prices) <= EXACT_MAX_TICKERS else "greedy"
+    if method == "exact":
+        lots = allocate_exact(budget, costs, targets)
+    elif method == "greedy":
+        lots = allocate_greedy(budget, costs, targets)
+    else:
+        raise ValueError(f"Unknown allocation method: {method}")
+
+    try:
+        buy_fee_pct / 100
+    except TypeError:
+        # Minimum commission and tiers make the cost non-linear in the lot count
+        lots, order_costs = fit_to_schedule(budget, prices, lots, targets, buy_fee_pct)
+        return lots, sum(order_costs)
+    total_cost = sum(c * x for c, x in zip(costs, lots))
+    return lots, total_cost
+
@@ -0,0 +1,249 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Bars pulled from the memory map at a time; only this much is ever materialized
+BLOCK_BARS = 1 << 18
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+
+
+# --- Columnar Price Store ---
+# A store is a directory with one sub-directory per ticker holding
+# `time.npy` (datetime64[s]) and `close.npy` (float64), read back memory-mapped.
+def write_series(store, ticker, timestamps, closes):
+    """Writes one ticker's bars to the store as columnar .npy files."""
+    folder = os.path.join(store, ticker)
+    os.makedirs(folder, exist_ok=True)
+    np.save(os.path.join(folder, "time.npy"), np.asarray(timestamps, dtype="datetime64[s]"))
+    np.save(os.path.join(folder, "close.npy"), np.asarray(closes, dtype=np.float64))
+
+
+def import_csv(csv_path, store, ticker, chunk_rows=BLOCK_BARS):
+    """
+    Streams an OHLC CSV (columns include date/time and close) into the store.
+
+    The file is read twice: once to count rows, once to fill pre-allocated
+    memory-mapped columns chunk by chunk, so the CSV is never fully loaded.
+    """
+    with open(csv_path) as f:
+        header = [c.strip().lower() for c in f.readline().split(",")]
+        n_rows = sum(1 for line in f if line.strip())
+    i_time = header.index("date") if "date" in header else header.index("time")
+    i_close = header.index("close")
+
+    folder = os.path.join(store, ticker)
+    os.makedirs(folder, exist_ok=True)
+    times = np.lib.format.open_memmap(os.path.join(folder, "time.npy"), mode="w+", dtype="datetime64[s]", shape=(n_rows,))
+    closes = np.lib.format.open_memmap(os.path.join(folder, "close.npy"), mode="w+", dtype=np.float64, shape=(n_rows,))
+
+    with open(csv_path) as f:
+        f.readline()
+        row = 0
+        batch_time, batch_close = [], []
+        for line in f:
+            if not line.strip():
+                continue
+            fields = line.split(",")
+            batch_time.append(fields[i_time].strip())
+            batch_close.append(float(fields[i_close]))
+            if len(batch_close) == chunk_rows:
+                times[row:row + chunk_rows] = np.array(batch_time, dtype="datetime64[s]")
+                closes[row:row + chunk_rows] = batch_close
+                row += chunk_rows
+                batch_time, batch_close = [], []
+        times[row:row + len(batch_close)] = np.array(batch_time, dtype="datetime64[s]")
+        closes[row:row + len(batch_close)] = batch_close
+    times.flush()
+    closes.flush()
+    return n_rows
+
+
+def open_series(store, ticker):
+    """Memory-mapped (timestamps, closes) for one ticker; nothing is read until sliced."""
+    folder = os.path.join(store, ticker)
+    return (
+        np.load(os.path.join(folder, "time.npy"), mmap_mode="r"),
+        np.load(os.path.join(folder, "close.npy"), mmap_mode="r"),
+    )
+
+
+def list_tickers(store):
+    return sorted(name for name in os.listdir(store) if os.path.isfile(os.path.join(store, name, "close.npy")))
+
+
+# --- Buy Rules ---
+def drop_rule_buys(close, state, rule):
+    """Bar indices (within the block) where "buy every X% drop from the last buy" fires."""
+    drop = rule["drop_pct"] / 100
+    max_buys = rule.get("max_buys", np.inf)
+    buys = []
+    k = 0
+    while k < len(close) and state["n_buys"] + len(buys) < max_buys:
+        if state["last_buy"] is None and not buys:
+            hit = 0  # Initial entry on the first bar
+        else:
+            threshold = (close[buys[-1]] if buys else state["last_buy"]) * (1 - drop)
+            below = close[k:] <= threshold
+            hit = int(below.argmax())
+            if not below[hit]:
+                break
+        buys.append(k + hit)
+        k += hit + 1
+    return np.array(buys, dtype=np.int64)
+
+
+def dca_rule_buys(times, state, rule):
+    """Bar indices (within the block) opening a new period ("D", "W" or "M") for periodic buying."""
+    periods = times.astype(f"datetime64[{rule.get('period', 'M')}]")
+    previous = np.empty_like(periods)
+    previous[1:] = periods[:-1]
+    previous[0] = state["last_period"] if state["last_period"] is not None else periods[0] - 1
+    state["last_period"] = periods[-1]
+    buys = np.flatnonzero(periods != previous)
+    max_buys = rule.get("max_buys")
+    if max_buys is not None:
+        buys = buys[:max(0, max_buys - state["n_buys"])]
+    return buys
+
+
+# --- Backtest Engine ---
+def backtest_series(times, close, rule, buy_fee_pct, sell_fee_pct, keep_curve=True, block_bars=BLOCK_BARS):
+    """
+    Replays one averaging/DCA rule over a (possibly memory-mapped) price series.
+
+    Buys follow calculate_metrics: each costs lots x 100 x price x (1 + buy fee),
+    and the PnL curve marks the whole position at the close net of the sell fee.
+    The series is processed in blocks so only `block_bars` bars are in memory.
+    Returns the final position, capital deployed, max drawdown of the PnL curve
+    and (optionally) the curve itself.
+    """
+    b_fee = buy_fee_pct / 100
+    s_fee = sell_fee_pct / 100
+    lot_shares = rule["lots"] * 100
+    state = {"shares": 0, "cost": 0.0, "n_buys": 0, "last_buy": None, "last_period": None, "peak": 0.0, "max_dd": 0.0}
+    curve = []
+
+    for start in range(0, len(close), block_bars):
+        c = np.asarray(close[start:start + block_bars], dtype=np.float64)
+        if rule["kind"] == "drop":
+            idx = drop_rule_buys(c, state, rule)
+        elif rule["kind"] == "dca":
+            idx = dca_rule_buys(np.asarray(times[start:start + block_bars]), state, rule)
+        else:
+            raise ValueError(f"Unknown rule kind: {rule['kind']}")
+
+        buy_shares = np.zeros(len(c), dtype=np.int64)
+        buy_cost = np.zeros(len(c))
+        buy_shares[idx] = lot_shares
+        buy_cost[idx] = lot_shares * c[idx] * (1 + b_fee)
+
+        shares = state["shares"] + np.cumsum(buy_shares)
+        cost = state["cost"] + np.cumsum(buy_cost)
+        pnl = shares * c * (1 - s_fee) - cost
+
+        peak = np.maximum.accumulate(np.maximum(pnl, state["peak"]))
+        if len(pnl):
+            state["max_dd"] = max(state["max_dd"], float((peak - pnl).max()))
+            state["peak"] = float(peak[-1])
+            state["shares"] = int(shares[-1])
+            state["cost"] = float(cost[-1])
+        if len(idx):
+            state["n_buys"] += len(idx)
+            state["last_buy"] = float(c[idx[-1]])
+        if keep_curve:
+            curve.append(pnl)
+
+    years = float((times[-1] - times[0]).astype("timedelta64[s]").astype(np.int64)) / SECONDS_PER_YEAR if len(times) > 1 else 0.0
+    final_pnl = state["shares"] * float(close[-1]) * (1 - s_fee) - state["cost"] if len(close) else 0.0
+    return {
+        "bars": len(close),
+        "years": years,
+        "buys": state["n_buys"],
+        "lots": state["shares"] // 100,
+        "avg": state["cost"] / state["shares"] if state["shares"] else 0.0,
+        "capital_deployed": state["cost"],
+        "final_pnl": final_pnl,
+        "max_drawdown": state["max_dd"],
+        "equity_curve": np.concatenate(curve) if keep_curve and curve else None,
+    }
+
+
+def _run_job(args):
+    store, ticker, rule, buy_fee_pct, sell_fee_pct, keep_curve = args
+    times, close = open_series(store, ticker)
+    result = backtest_series(times, close, rule, buy_fee_pct, sell_fee_pct, keep_curve)
+    result["ticker"] = ticker
+    result["rule"] = rule
+    return result
+
+
+def run_backtests(store, tickers, rules, buy_fee_pct, sell_fee_pct, workers=1, keep_curve=False):
+    """
+    Backtests every (ticker, rule) pair, in a process pool when workers > 1.
+
+    Workers open the memory maps themselves, so only file paths cross process
+    boundaries. Returns (results, symbol_years_per_second).
+    """
+    jobs = [(store, ticker, rule, buy_fee_pct, sell_fee_pct, keep_curve) for ticker in tickers for rule in rules]
+    start = time.perf_counter()
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        results = [_run_job(job) for job in jobs]
+    elapsed = time.perf_counter() - start
+    symbol_years = sum(r["years"] for r in results)
+    return results, symbol_years / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backtest averaging/DCA rules over a local price store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Convert an OHLC CSV into the columnar store")
+    imp.add_argument("csv")
+    imp.add_argument("store")
+    imp.add_argument("ticker")
+
+    run = sub.add_parser("run", help="Run rules over tickers in the store")
+    run.add_argument("store")
+    run.add_argument("--tickers", nargs="*", help="Default: every ticker in the store")
+    run.add_argument("--rule", choices=("drop", "dca"), default="drop")
+    run.add_argument("--drop", type=float, nargs="+", default=[5.0], help="Beli setiap turun X%% (boleh beberapa nilai)")
+    run.add_argument("--period", nargs="+", default=["M"], help="Periode DCA: D, W atau M")
+    run.add_argument("--lots", type=int, nargs="+", default=[1])
+    run.add_argument("--max-buys", type=int)
+    run.add_argument("--buy-fee", type=float, default=0.15)
+    run.add_argument("--sell-fee", type=float, default=0.25)
+    run.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(f"{import_csv(args.csv, args.store, args.ticker):,} bars written")
+        return
+
+    if args.rule == "drop":
+        rules = [{"kind": "drop", "drop_pct": d, "lots": n} for d in args.drop for n in args.lots]
+    else:
+        rules = [{"kind": "dca", "period": p, "lots": n} for p in args.period for n in args.lots]
+    if args.max_buys is not None:
+        for rule in rules:
+            rule["max_buys"] = args.max_buys
+
+    tickers = args.tickers or list_tickers(args.store)
+    results, throughput = run_backtests(args.store, tickers, rules, args.buy_fee, args.sell_fee, workers=args.workers)
+
+    print("ticker,rule,buys,lots,avg,capital_deployed,final_pnl,max_drawdown")
+    for r in results:
+        rule = r["rule"]
+        label = f"drop{rule['drop_pct']:g}%x{rule['lots']}" if rule["kind"] == "drop" else f"dca{rule['period']}x{rule['lots']}"
+        print(f"{r['ticker']},{label},{r['buys']},{r['lots']},{r['avg']:.2f},{r['capital_deployed']:.0f},{r['final_pnl']:.0f},{r['max_drawdown']:.0f}")
+    print(f"# {throughput:,.1f} symbol-years/s", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import numpy as np
+
+
+# --- Vectorized Metrics ---
+def calculate_metrics_batch(current_avg, current_lots, buy_price, buy_lots, buy_fee_pct, sell_fee_pct, target_sell_price):
+    """
+    Vectorized version of calculations.calculate_metrics.
+
+    Every argument may be a scalar or an array-like column (list, NumPy array,
+    pandas Series); scalars are broadcast against the columns, so per-row fees
+    and target prices are supported. Returns (new_avg, bep, total_lots,
+    pnl_nominal, pnl_percent) as arrays, with rows that end up holding zero
+    shares reported as all zeros, exactly like the scalar function.
+    """
+    current_avg = np.asarray(current_avg, dtype=np.float64)
+    current_lots = np.asarray(current_lots, dtype=np.int64)
+    buy_price = np.asarray(buy_price, dtype=np.float64)
+    buy_lots = np.asarray(buy_lots, dtype=np.int64)
+    b_fee = np.asarray(buy_fee_pct, dtype=np.float64) / 100
+    s_fee = np.asarray(sell_fee_pct, dtype=np.float64) / 100
+    target_sell_price = np.asarray(target_sell_price, dtype=np.float64)
+
+    current_shares = current_lots * 100
+    current_cost = current_shares * current_avg
+
+    new_shares = buy_lots * 100
+    new_buy_value = new_shares * buy_price
+    new_buy_cost_total = new_buy_value * (1 + b_fee)
+
+    total_shares = current_shares + new_shares
+    total_cost_basis = current_cost + new_buy_cost_total
+
+    # Same operation order as the scalar path so results match bit for bit
+    with np.errstate(divide="ignore", invalid="ignore"):
+        new_avg = total_cost_basis / total_shares
+        bep = new_avg / (1 - s_fee)
+
+        total_sell_value = total_shares * target_sell_price
+        net_sell_proceeds = total_sell_value * (1 - s_fee)
+        pnl_nominal = net_sell_proceeds - total_cost_basis
+        pnl_percent = np.where(total_cost_basis > 0, (pnl_nominal / total_cost_basis) * 100, 0.0)
+
+    empty = total_shares == 0
+    new_avg = np.where(empty, 0.0, new_avg)
+    bep = np.where(empty, 0.0, bep)
+    pnl_nominal = np.where(empty, 0.0, pnl_nominal)
+    pnl_percent = np.where(empty, 0.0, pnl_percent)
+
+    return new_avg, bep, total_shares // 100, pnl_nominal, pnl_percent
+
+
+def calculate_metrics_batch_schedule(current_avg, current_lots, buy_price, buy_lots, buy_fee, sell_fee, target_sell_price):
+    """
+    calculate_metrics_batch with broker fee schedules: buy_fee and sell_fee are
+    each a percentage or one fees.FeeSide applied to every row, so minimum
+    commissions and tiers are charged per trade. Follows the schedule path of
+    calculations.calculate_metrics (cost basis, fee-inclusive average, BEP via
+    gross_for_net, net PnL) elementwise.
+    """
+    current_avg = np.asarray(current_avg, dtype=np.float64)
+    current_lots = np.asarray(current_lots, dtype=np.int64)
+    buy_price = np.asarray(buy_price, dtype=np.float64)
+    buy_lots = np.asarray(buy_lots, dtype=np.int64)
+    target_sell_price = np.asarray(target_sell_price, dtype=np.float64)
+
+    current_shares = current_lots * 100
+    new_buy_value = (buy_lots * 100) * buy_price
+    try:
+        new_buy_cost_total = new_buy_value * (1 + buy_fee / 100)
+    except TypeError:
+        new_buy_cost_total = new_buy_value + buy_fee.fee_array(new_buy_value)
+    total_shares = current_shares + buy_lots * 100
+    total_cost_basis = current_shares * current_avg + new_buy_cost_total
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        new_avg = total_cost_basis / total_shares
+        total_sell_value = total_shares * target_sell_price
+        try:
+            bep = new_avg / (1 - sell_fee / 100)
+            net_sell_proceeds = total_sell_value * (1 - sell_fee / 100)
+        except TypeError:
+            bep = sell_fee.gross_for_net_array(new_avg * total_shares) / total_shares
+            net_sell_proceeds = total_sell_value - sell_fee.fee_array(total_sell_value)
+        pnl_nominal = net_sell_proceeds - total_cost_basis
+        pnl_percent = np.where(total_cost_basis > 0, (pnl_nominal / total_cost_basis) * 100, 0.0)
+
+    empty = total_shares == 0
+    new_avg = np.where(empty, 0.0, new_avg)
+    bep = np.where(empty, 0.0, bep)
+    pnl_nominal = np.where(empty, 0.0, pnl_nominal)
+    pnl_percent = np.where(empty, 0.0, pnl_percent)
+
+    return new_avg, bep, total_shares // 100, pnl_nominal, pnl_percent
@@ -0,0 +1,55 @@
+"""
+Benchmark: solve time of the multi-ticker budget allocator as tickers and budget grow.
+
+Run from the repository root:
+    python benchmarks/bench_allocator.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from allocator import allocate_budget, allocation_error, lot_costs, normalize_weights
+
+
+def make_universe(n_tickers, seed=0):
+    """Random IDX-like prices and target weights."""
+    rng = random.Random(seed)
+    prices = [rng.randint(50, 25000) for _ in range(n_tickers)]
+    weights = [rng.random() for _ in range(n_tickers)]
+    return prices, weights
+
+
+def timed(budget, prices, weights, method, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        lots, total_cost = allocate_budget(budget, prices, weights, buy_fee_pct=0.15, method=method)
+        best = min(best, time.perf_counter() - start)
+    costs = lot_costs(prices, 0.15)
+    targets = [w * budget for w in normalize_weights(weights, len(prices))]
+    return best, allocation_error(lots, costs, targets), total_cost
+
+
+def main():
+    print("exact (branch and bound)")
+    for budget in (10_000_000, 1_000_000_000):
+        for n_tickers in (2, 4, 8, 12):
+            prices, weights = make_universe(n_tickers)
+            t_exact, err_exact, _ = timed(budget, prices, weights, "exact")
+            _, err_greedy, _ = timed(budget, prices, weights, "greedy")
+            gap = (err_greedy / err_exact - 1) * 100 if err_exact else 0.0
+            print(f"  budget Rp {budget:>15,} | {n_tickers:>4} tickers | {t_exact * 1000:8.2f} ms | greedy error +{gap:.1f}%")
+
+    print("greedy")
+    for budget in (1_000_000_000, 100_000_000_000):
+        for n_tickers in (10, 100, 500, 1000):
+            prices, weights = make_universe(n_tickers)
+            t_greedy, _, total_cost = timed(budget, prices, weights, "greedy")
+            print(f"  budget Rp {budget:>15,} | {n_tickers:>4} tickers | {t_greedy * 1000:8.2f} ms | invested {total_cost / budget * 100:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark: backtest throughput in symbol-years per second.
+
+Builds a synthetic columnar store (daily and 1-minute intraday series) in a
+temporary directory, then runs a grid of drop and DCA rules over it.
+
+Run from the repository root:
+    python benchmarks/bench_backtest.py [--workers N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import list_tickers, run_backtests, write_series
+
+# Spreads 390 bars/day x 250 days evenly over a calendar year
+SECONDS_PER_TRADING_MINUTE = 365.25 * 86400 / (250 * 390)
+
+
+def build_store(store, n_daily=40, n_intraday=4, years=10, intraday_years=2, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2014-01-01T00:00:00", "s")
+    daily_bars = int(years * 250)
+    for i in range(n_daily):
+        times = start + (np.arange(daily_bars) * 86400 * 365.25 / 250).astype("timedelta64[s]")
+        closes = rng.integers(100, 10000) * np.exp(np.cumsum(rng.normal(0, 0.02, daily_bars)))
+        write_series(store, f"D{i:03d}", times, closes)
+    # 1-minute bars over a ~6.5 hour session
+    minute_bars = int(intraday_years * 250 * 390)
+    for i in range(n_intraday):
+        times = start + (np.arange(minute_bars) * SECONDS_PER_TRADING_MINUTE).astype("timedelta64[s]")
+        closes = rng.integers(100, 10000) * np.exp(np.cumsum(rng.normal(0, 0.001, minute_bars)))
+        write_series(store, f"M{i:03d}", times, closes)
+
+RULES = [{"kind": "drop", "drop_pct": d, "lots": 1} for d in (2, 5, 10)] + [{"kind": "dca", "period": p, "lots": 1} for p in ("W", "M")]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as store:
+        build_store(store)
+        tickers = list_tickers(store)
+        for workers in sorted({1, args.workers}):
+            results, throughput = run_backtests(store, tickers, RULES, 0.15, 0.25, workers=workers)
+            print(f"{len(tickers)} tickers x {len(RULES)} rules | {workers} workers | {throughput:,.0f} symbol-years/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: calculate_metrics_batch vs. a Python loop over calculations.calculate_metrics.
+
+Run from the repository root:
+    python benchmarks/bench_batch.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import calculate_metrics_batch
+from calculations import calculate_metrics
+
+
+def make_portfolio(n_rows, seed=0):
+    """Random IDX-like positions: prices in rupiah, lots as whole numbers."""
+    rng = np.random.default_rng(seed)
+    current_avg = rng.integers(50, 20000, n_rows)
+    current_lots = rng.integers(0, 500, n_rows)
+    buy_price = rng.integers(50, 20000, n_rows)
+    buy_lots = rng.integers(0, 500, n_rows)
+    # Sprinkle in rows with no position at all
+    buy_lots[current_lots == 0] = 0
+    buy_fee = rng.choice([0.10, 0.15, 0.18, 0.19], n_rows)
+    sell_fee = buy_fee + 0.10
+    target = rng.integers(50, 20000, n_rows)
+    return current_avg, current_lots, buy_price, buy_lots, buy_fee, sell_fee, target
+
+
+def run_scalar(columns):
+    rows = zip(*(c.tolist() for c in columns))
+    return [calculate_metrics(*row) for row in rows]
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    for n_rows, repeat in ((10_000, 5), (1_000_000, 1)):
+        columns = make_portfolio(n_rows)
+        t_scalar, scalar = best_of(lambda: run_scalar(columns), repeat)
+        t_batch, batch = best_of(lambda: calculate_metrics_batch(*columns), repeat)
+
+        expected = np.array(scalar, dtype=np.float64).T
+        for got, want in zip(batch, expected):
+            assert np.array_equal(got, want), "batch result differs from scalar"
+
+        print(f"{n_rows:>9,} rows | scalar {t_scalar * 1000:9.1f} ms | batch {t_batch * 1000:7.1f} ms | speedup {t_scalar / t_batch:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
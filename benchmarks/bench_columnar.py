@@ -0,0 +1,102 @@
+"""
+Benchmark: columnar export of a large sweep and LTTB chart downsampling.
+
+- A scenario_grid of ~4M scenarios streamed to Parquet, Arrow IPC and CSV
+  with columnar.sweep_batches/write_batches: time, rows/s, file size and the
+  peak memory held in chunks while writing (at most one row group), against
+  building the whole long-format pandas DataFrame first and calling
+  to_parquet.
+- The PnL columns of every batch are checked to be views of the grid.
+- lttb on a 1M-point PnL-vs-target series: time and chart payload size.
+
+Run from the repository root:
+    python benchmarks/bench_columnar.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pyarrow as pa
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from columnar import CHART_POINTS, CHUNK_ROWS, FORMATS, PARQUET_ROW_GROUP, lttb, sweep_batches, write_batches
+from fees import load_fee_schedules
+from solvers import PRICE_LADDER
+from sweep import scenario_grid
+
+
+def tracked(batches, peak, window):
+    """Passes batches through, recording the largest Arrow allocation plus the size of the last `window` batches (those the writer can still hold)."""
+    held = []
+    for batch in batches:
+        held = (held + [batch.nbytes])[-window:]
+        peak[0] = max(peak[0], pa.total_allocated_bytes() + sum(held))
+        yield batch
+
+
+def bench_export(tmp):
+    grid = scenario_grid(1000.0, 10, (800, 1200, 2), (0, 50, 1), (600, 1400, 2), 0.15, 0.25)
+    rows = grid["pnl"].size
+    flat_pnl = grid["pnl"].reshape(-1)
+    for batch in sweep_batches(grid):
+        assert np.shares_memory(batch.column("pnl").to_numpy(), flat_pnl)
+    print(f"sweep of {rows:,} scenarios ({grid['pnl'].nbytes * 2 / 1e6:.0f} MB of PnL columns in the grid):")
+
+    for fmt in FORMATS:
+        path = os.path.join(tmp, f"sweep.{fmt}")
+        peak = [0]
+        start = time.perf_counter()
+        window = PARQUET_ROW_GROUP // CHUNK_ROWS if fmt == "parquet" else 1
+        written = write_batches(tracked(sweep_batches(grid), peak, window), path, fmt)
+        elapsed = time.perf_counter() - start
+        assert written == rows
+        print(f"  stream -> {fmt:<8} {elapsed:6.2f} s  {rows / elapsed / 1e6:5.1f} M rows/s  "
+              f"{os.path.getsize(path) / 1e6:7.1f} MB  peak chunk memory {peak[0] / 1e6:6.1f} MB")
+
+    import pandas as pd
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    pp, ll, tt = np.meshgrid(grid["buy_price"], grid["buy_lots"], grid["target_price"], indexing="ij")
+    frame = pd.DataFrame({
+        "buy_price": pp.ravel(), "buy_lots": ll.ravel(), "target_price": tt.ravel(),
+        "new_avg": np.repeat(grid["new_avg"].ravel(), len(grid["target_price"])),
+        "bep": np.repeat(grid["bep"].ravel(), len(grid["target_price"])),
+        "pnl": grid["pnl"].ravel(), "pnl_pct": grid["pnl_pct"].ravel(),
+    })
+    frame.to_parquet(os.path.join(tmp, "naive.parquet"))
+    elapsed = time.perf_counter() - start
+    _, peak_numpy = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  DataFrame + to_parquet {elapsed:6.2f} s  {rows / elapsed / 1e6:5.1f} M rows/s  peak NumPy memory {peak_numpy / 1e6:6.1f} MB (before Arrow's own copy)")
+
+
+def bench_lttb(n=1_000_000):
+    schedules = load_fee_schedules()
+    targets = np.linspace(PRICE_LADDER[0], PRICE_LADDER[-1], n)
+    shares, cost = 100_000, 1e8
+    value = shares * targets
+    pnl = value - schedules.apply(0, "jual", value) - cost
+
+    start = time.perf_counter()
+    keep = lttb(targets, pnl, CHART_POINTS)
+    elapsed = time.perf_counter() - start
+    full = len(json.dumps({"x": targets.tolist(), "y": pnl.tolist()}))
+    sent = len(json.dumps({"x": targets[keep].tolist(), "y": pnl[keep].tolist()}))
+    print(f"lttb {n:,} -> {len(keep)} points: {elapsed * 1000:6.1f} ms; chart payload {full / 1e6:.1f} MB -> {sent / 1e3:.1f} kB")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_export(tmp)
+    bench_lttb()
+
+
+if __name__ == "__main__":
+    main()
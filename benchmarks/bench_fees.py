@@ -0,0 +1,59 @@
+"""
+Benchmark: vectorized fee-schedule application vs. per-trade scalar fees.
+
+Uses brokers.json plus a tiered schedule with minimum commission, VAT, levy
+and sales tax so every code path of the compiled lookup is exercised.
+
+Run from the repository root:
+    python benchmarks/bench_fees.py
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fees import DEFAULT_PATH, SIDES, FeeSchedules, load_fee_schedules
+
+TIERED = {
+    "beli": {"tiers": [[0, 0.20], [100_000_000, 0.15], [1_000_000_000, 0.10]], "min_commission": 10_000, "vat_pct": 11, "levy_pct": 0.043},
+    "jual": {"tiers": [[0, 0.20], [100_000_000, 0.15], [1_000_000_000, 0.10]], "min_commission": 10_000, "vat_pct": 11, "levy_pct": 0.043, "sales_tax_pct": 0.1},
+}
+
+
+def make_trades(schedules, n, seed=0):
+    rng = np.random.default_rng(seed)
+    brokers = rng.integers(0, len(schedules.names), n)
+    sides = rng.integers(0, 2, n)
+    values = np.round(rng.lognormal(np.log(5_000_000), 1.5, n), -2)
+    return brokers, sides, values
+
+
+def main():
+    with open(DEFAULT_PATH, encoding="utf-8") as f:
+        specs = json.load(f)
+    specs["ZZ (Tiered)"] = TIERED
+    schedules = FeeSchedules(specs)
+    assert load_fee_schedules().names == schedules.names[:-1]
+
+    for n in (10_000, 1_000_000):
+        brokers, sides, values = make_trades(schedules, n)
+        start = time.perf_counter()
+        vectorized = schedules.apply(brokers, sides, values)
+        t_vec = time.perf_counter() - start
+
+        sample = min(n, 100_000)
+        lookup = [[schedules.side(name, side) for side in SIDES] for name in schedules.names]
+        start = time.perf_counter()
+        scalar = [lookup[b][s].fee(v) for b, s, v in zip(brokers[:sample].tolist(), sides[:sample].tolist(), values[:sample].tolist())]
+        t_scalar = (time.perf_counter() - start) * n / sample
+
+        assert np.allclose(vectorized[:sample], scalar, rtol=1e-12, atol=1e-6)
+        print(f"{n:>9,} trades | scalar {t_scalar * 1000:9.1f} ms | vectorized {t_vec * 1000:7.1f} ms | speedup {t_scalar / t_vec:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark: fixed-point (int64 rupiah) metrics vs. the float path and Decimal.
+
+Two parts:
+
+1. Reconciliation. A generated trade ledger is replayed by the fixed-point
+   ledger and by a Decimal reference that applies the broker rounding rules
+   one trade at a time (the "statement"). Fixed-point must match the
+   statement to the rupiah on every ticker, with flat fees and with a tiered
+   schedule. With flat fees the float ledger is replayed too and reported by
+   how many tickers land on a different rupiah once rounded.
+2. Speed. calculate_metrics for the same positions in float (vectorized),
+   fixed-point (vectorized int64) and Decimal (per-row, on a sample, scaled).
+
+Run from the repository root:
+    python benchmarks/bench_fixedpoint.py
+"""
+import io
+import os
+import sys
+import time
+from decimal import ROUND_CEILING, ROUND_HALF_UP, Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import calculate_metrics_batch
+from fees import compile_side
+from fixedpoint import AVG_SCALE, calculate_metrics_fixed
+from ledger import portfolio_snapshot, portfolio_snapshot_fixed, replay_ledger
+from solvers import snap_price
+
+FLAT_FEES = (0.15, 0.25)
+FLAT = (compile_side({"tiers": [[0, 0.15]]}), compile_side({"tiers": [[0, 0.15]], "sales_tax_pct": 0.1}))
+# Tiered schedule with VAT, levy and sales tax so every fee component is rounded
+TIERED = (
+    compile_side({"tiers": [[0, 0.18], [100_000_000, 0.15]], "min_commission": 5_000, "vat_pct": 11, "levy_pct": 0.043}),
+    compile_side({"tiers": [[0, 0.18], [100_000_000, 0.15]], "min_commission": 5_000, "vat_pct": 11, "levy_pct": 0.043, "sales_tax_pct": 0.1}),
+)
+
+
+# --- Decimal Reference (the broker statement) ---
+def whole(x):
+    return x.quantize(Decimal(1), rounding=ROUND_HALF_UP)
+
+
+def statement_fee(side, value):
+    if value <= 0:
+        return Decimal(0)
+    rate = Decimal(str(side.tiers_pct[0]))
+    for start, pct in zip(side.tiers_from, side.tiers_pct):
+        if value >= start:
+            rate = Decimal(str(pct))
+    commission = max(whole(value * rate / 100), Decimal(str(side.min_commission)))
+    fee = commission + whole(commission * Decimal(str(side.vat_pct)) / 100)
+    fee += whole(value * Decimal(str(side.levy_pct)) / 100)
+    fee += whole(value * Decimal(str(side.sales_tax_pct)) / 100)
+    return fee
+
+
+def statement(trades, buy_side, sell_side):
+    positions = {}
+    for ticker, side, price, shares in trades:
+        pos = positions.setdefault(ticker, {"shares": 0, "cost": Decimal(0), "realized_pnl": Decimal(0)})
+        value = Decimal(price) * shares
+        if side == "B":
+            pos["shares"] += shares
+            pos["cost"] += value
+        else:
+            removed = whole(pos["cost"] * shares / pos["shares"])
+            pos["realized_pnl"] += value - statement_fee(sell_side, value) - removed - statement_fee(buy_side, removed)
+            pos["shares"] -= shares
+            pos["cost"] -= removed
+    return {
+        ticker: (pos["shares"], whole(pos["cost"] * AVG_SCALE / pos["shares"]) if pos["shares"] else 0, int(pos["realized_pnl"]))
+        for ticker, pos in positions.items()
+    }
+
+
+def make_ledger(n_trades, n_tickers, seed=0):
+    rng = np.random.default_rng(seed)
+    base = snap_price(np.exp(rng.uniform(np.log(50), np.log(30000), n_tickers)))
+    held = np.zeros(n_tickers, dtype=np.int64)
+    trades = []
+    for t, drift in zip(rng.integers(0, n_tickers, n_trades), rng.normal(0, 0.03, n_trades)):
+        base[t] = max(50, snap_price(base[t] * (1 + drift)))
+        if held[t] and rng.random() < 0.35:
+            shares = int(rng.integers(1, held[t] // 100 + 1)) * 100
+            trades.append((f"T{t:04d}", "S", int(base[t]), shares))
+            held[t] -= shares
+        else:
+            shares = int(rng.integers(1, 200)) * 100
+            trades.append((f"T{t:04d}", "B", int(base[t]), shares))
+            held[t] += shares
+    return trades
+
+
+def reconcile(n_trades=200_000, n_tickers=2_000):
+    trades = make_ledger(n_trades, n_tickers)
+    data = ("ticker,side,price,shares\n" + "".join(f"{t},{s},{p},{q}\n" for t, s, p, q in trades)).encode()
+    print(f"Reconciliation over {n_trades:,} trades / {n_tickers:,} tickers vs. Decimal statement:")
+
+    for label, (buy_side, sell_side) in (("flat fees", FLAT), ("tiered schedule", TIERED)):
+        expected = statement(trades, buy_side, sell_side)
+        checkpoint = replay_ledger(io.BytesIO(data), buy_side, sell_side, fixed=True)
+        fixed = portfolio_snapshot_fixed(checkpoint["positions"], buy_side, sell_side)
+        fixed_off = sum((r["shares"], r["avg"], r["realized_pnl"]) != expected[r["ticker"]] for r in fixed)
+        print(f"  {label:<16} fixed-point mismatches: {fixed_off:,}")
+        assert fixed_off == 0
+
+    expected = statement(trades, *FLAT)
+    floats = portfolio_snapshot(replay_ledger(io.BytesIO(data), *FLAT_FEES)["positions"], *FLAT_FEES)
+    float_off = sum((r["shares"], round(r["avg"] * AVG_SCALE), round(r["realized_pnl"])) != expected[r["ticker"]] for r in floats)
+    print(f"  {'flat fees':<16} float mismatches:       {float_off:,}")
+
+
+def speed(n=1_000_000, sample=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    avg = rng.integers(50 * AVG_SCALE, 30000 * AVG_SCALE, n)
+    lots = rng.integers(1, 1000, n)
+    buy_p = snap_price(rng.integers(50, 30000, n)).astype(np.int64)
+    buy_l = rng.integers(0, 1000, n)
+    target = snap_price(rng.integers(50, 30000, n)).astype(np.int64)
+
+    start = time.perf_counter()
+    calculate_metrics_batch(avg / AVG_SCALE, lots, buy_p, buy_l, 0.15, 0.25, target)
+    t_float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calculate_metrics_fixed(avg, lots, buy_p, buy_l, 0.15, 0.25, target)
+    t_fixed = time.perf_counter() - start
+
+    b, s = Decimal("0.15"), Decimal("0.25")
+    rows = zip(avg[:sample].tolist(), lots[:sample].tolist(), buy_p[:sample].tolist(), buy_l[:sample].tolist(), target[:sample].tolist())
+    start = time.perf_counter()
+    for a, l, p, q, t in rows:
+        shares = (l + q) * 100
+        cost = whole(Decimal(l * 100 * a) / AVG_SCALE) + p * q * 100 + whole(Decimal(p * q * 100) * b / 100)
+        (cost * AVG_SCALE / shares).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        (cost * AVG_SCALE / (shares * (1 - s / 100))).quantize(Decimal(1), rounding=ROUND_CEILING)
+        value = Decimal(shares * t)
+        pnl = value - whole(value * s / 100) - cost
+        (pnl * 100 * 100 / cost).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    t_decimal = (time.perf_counter() - start) * n / sample
+
+    print(f"calculate_metrics over {n:,} positions:")
+    print(f"  float (vectorized)    {t_float * 1000:9.1f} ms")
+    print(f"  fixed-point (int64)   {t_fixed * 1000:9.1f} ms  ({t_fixed / t_float:.1f}x float)")
+    print(f"  Decimal (per row)     {t_decimal * 1000:9.1f} ms  ({t_decimal / t_fixed:.0f}x fixed-point)")
+
+
+def main():
+    reconcile()
+    speed()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: live mark-to-market throughput (marktomarket.py).
+
+- Ticks/s of MarkToMarket.run over 1M in-memory ticks for 500, 5k and 50k
+  positions (per-tick work must not grow with the portfolio), with flat
+  percentage fees and with a broker fee schedule.
+- End to end at 5k positions: ticks parsed from a CSV replay, and ticks
+  received from the stand-in quote server in a separate process.
+- The engine's state after the run is checked against the calculations
+  functions evaluated at each ticker's last price.
+
+Target: 100k ticks/s across 5k positions.
+
+Run from the repository root:
+    python benchmarks/bench_marktomarket.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from calculations import calculate_bep, calculate_net_pnl, calculate_percentage_change
+from fees import load_fee_schedules
+from marktomarket import MarkToMarket, generate_ticks, replay_ticks, socket_ticks, write_ticks
+
+N_TICKS = 1_000_000
+PORT = 8771
+
+
+def make_positions(n, seed=1):
+    rng = np.random.default_rng(seed)
+    avg = rng.uniform(100, 10000, n)
+    lots = rng.integers(1, 500, n)
+    return [{"ticker": f"T{i:04d}", "shares": int(l) * 100, "avg": float(a)} for i, (a, l) in enumerate(zip(avg, lots))]
+
+
+def timed_run(engine, ticks):
+    start = time.perf_counter()
+    engine.run(ticks)
+    elapsed = time.perf_counter() - start
+    return engine.ticks / elapsed
+
+
+def check(engine, buy_fee, sell_fee):
+    for i in range(0, len(engine), max(1, len(engine) // 500)):
+        price = engine.price[i]
+        if np.isnan(price):
+            continue
+        shares, avg = engine.shares[i], engine.avg[i]
+        bep = calculate_bep(avg, shares / 100, buy_fee, sell_fee)
+        assert engine.pnl[i] == calculate_net_pnl(shares, engine.cost[i], sell_fee, price)[0]
+        assert engine.change_pct[i] == calculate_percentage_change(avg, price)
+        assert engine.bep_gap[i] == price - bep
+        assert engine.history(engine.tickers[i])[-1] == price
+
+
+def wait_for_port(port, timeout=10):
+    import socket
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def main():
+    rows = generate_ticks(N_TICKS, 50_000)
+    schedules = load_fee_schedules()
+    broker = schedules.names[0]
+    fee_cases = (("flat 0.15/0.25%", 0.15, 0.25), (f"schedule {broker}", schedules.side(broker, "beli"), schedules.side(broker, "jual")))
+
+    print(f"MarkToMarket.run, {N_TICKS:,} in-memory ticks:")
+    for n_positions in (500, 5_000, 50_000):
+        # Ticks only for held tickers, so every tick does full work
+        ticks = [(f"T{int(ticker[1:]) % n_positions:04d}", price) for _, ticker, price in rows]
+        for label, buy_fee, sell_fee in fee_cases:
+            engine = MarkToMarket(make_positions(n_positions), buy_fee, sell_fee)
+            rate = timed_run(engine, ticks)
+            check(engine, buy_fee, sell_fee)
+            print(f"  {n_positions:>6,} positions  {label:<22} {rate:>10,.0f} ticks/s")
+
+    rows = [(t, f"T{int(ticker[1:]) % 5_000:04d}", price) for t, ticker, price in rows]
+    positions = make_positions(5_000)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ticks.csv")
+        with open(path, "w") as out:
+            write_ticks(rows, out)
+
+        engine = MarkToMarket(positions, 0.15, 0.25)
+        rate = timed_run(engine, replay_ticks(path))
+        check(engine, 0.15, 0.25)
+        print(f"CSV replay, 5,000 positions:          {rate:>10,.0f} ticks/s")
+
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "marktomarket.py"), "serve", path, "--port", str(PORT)])
+        try:
+            wait_for_port(PORT)
+            engine = MarkToMarket(positions, 0.15, 0.25)
+            rate = timed_run(engine, socket_ticks(f"tcp://127.0.0.1:{PORT}"))
+            check(engine, 0.15, 0.25)
+            assert engine.ticks == N_TICKS, engine.ticks
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"socket stand-in, 5,000 positions:     {rate:>10,.0f} ticks/s (server in another process)")
+
+
+if __name__ == "__main__":
+    main()
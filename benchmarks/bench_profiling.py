@@ -0,0 +1,87 @@
+"""
+Benchmark: cost of the rerun instrumentation (profiling.py), off vs. on.
+
+- Per-operation cost of a section lap and of a calculate_* call, with
+  profiling off (no-op lap, unwrapped function) and on (histogram update).
+- A headless rerun of each app with profiling off and on, best of N.
+
+With profiling off the apps should rerun as fast as before the lap calls
+were added; suite.py's app group guards that against its baseline.
+
+Run from the repository root:
+    python benchmarks/bench_profiling.py
+"""
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import profiling
+from calculations import calculate_metrics
+
+APPS = ("main2.py", "main3.py", "main4.py")
+N = 200_000
+
+
+def per_op(stmt, setup_globals):
+    return min(timeit.repeat(stmt, globals=setup_globals, number=N, repeat=5)) / N * 1e9
+
+
+def bench_ops():
+    profiling.disable()
+    rerun = profiling.start_rerun("bench")
+    lap_off = per_op("rerun.lap('x')", {"rerun": rerun})
+    call_off = per_op("f(1000, 10, 900, 5, 0.15, 0.25, 1100)", {"f": calculate_metrics})
+
+    profiling.enable()
+    rerun = profiling.start_rerun("bench")
+    lap_on = per_op("rerun.lap('x')", {"rerun": rerun})
+    call_on = per_op("f(1000, 10, 900, 5, 0.15, 0.25, 1100)", {"f": profiling.timed("calculate_metrics", calculate_metrics)})
+    rerun.end()
+    profiling.disable()
+
+    print(f"section lap        off {lap_off:7.0f} ns | on {lap_on:7.0f} ns")
+    print(f"calculate_metrics  off {call_off:7.0f} ns | on {call_on:7.0f} ns")
+
+
+def bench_apps(repeat=10):
+    from streamlit.testing.v1 import AppTest
+
+    for app in APPS:
+        times = {}
+        for label in ("off", "on"):
+            profiling.enable() if label == "on" else profiling.disable()
+            at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=120)
+            at.run()
+            assert not at.exception, at.exception
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                at.run()
+                best = min(best, time.perf_counter() - start)
+            times[label] = best
+        print(f"{app} rerun      off {times['off'] * 1000:7.1f} ms | on {times['on'] * 1000:7.1f} ms (panel included)")
+    profiling.disable()
+
+
+def main():
+    bench_ops()
+    previous_db = os.environ.get("STOCKCALC_DB")
+    with tempfile.TemporaryDirectory() as tmp:
+        # main4 opens the store named by STOCKCALC_DB; keep the user's portfolio database out of it
+        os.environ["STOCKCALC_DB"] = os.path.join(tmp, "portfolio.db")
+        try:
+            bench_apps()
+        finally:
+            if previous_db is None:
+                del os.environ["STOCKCALC_DB"]
+            else:
+                os.environ["STOCKCALC_DB"] = previous_db
+
+
+if __name__ == "__main__":
+    main()
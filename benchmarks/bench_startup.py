@@ -0,0 +1,40 @@
+"""
+Benchmark: cold-start time of the headless CLI vs. importing streamlit.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE = (
+    "current_avg,current_lots,buy_price,buy_lots,buy_fee_pct,sell_fee_pct,target_sell_price\n"
+    "1000,10,900,10,0.15,0.25,1100\n"
+)
+
+
+def best_wall_time(cmd, stdin="", repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, input=stdin, text=True, capture_output=True, check=True, cwd=ROOT)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    timings = {
+        "python (no-op)": best_wall_time([sys.executable, "-c", "pass"]),
+        "cli.py (1 row)": best_wall_time([sys.executable, "cli.py"], SAMPLE),
+        "import calculations": best_wall_time([sys.executable, "-c", "import calculations"]),
+        "import streamlit": best_wall_time([sys.executable, "-c", "import streamlit"]),
+    }
+    for name, seconds in timings.items():
+        print(f"{name:<22} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
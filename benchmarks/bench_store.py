@@ -0,0 +1,110 @@
+"""
+Benchmark: SQLite portfolio store (bulk upsert, incremental trades, dashboard load).
+
+- Bulk upsert of 100k positions.
+- Trades recorded one at a time (one transaction each), timed early and late
+  in the history to show the per-trade cost stays flat, then in batches; the
+  resulting positions are checked against a full ledger replay.
+- load_positions of 100k rows, and the BEP column computed cold vs. served
+  from the cached-metrics table.
+- A headless rerun of main4 with the 100k-position account shown.
+
+Run from the repository root:
+    python benchmarks/bench_store.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from calculations import calculate_bep
+from ledger import apply_trade
+from solvers import snap_price
+from store import PortfolioStore
+
+N_POSITIONS = 100_000
+
+
+def make_positions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    avg = snap_price(np.exp(rng.uniform(np.log(50), np.log(30000), n)))
+    shares = rng.integers(1, 500, n) * 100
+    return [{"ticker": f"T{i:06d}", "shares": int(s), "avg": float(a), "realized_pnl": 0.0, "fees": 0.0} for i, (s, a) in enumerate(zip(shares, avg))]
+
+
+def make_trades(n, n_tickers, seed=1):
+    rng = np.random.default_rng(seed)
+    tickers = rng.integers(0, n_tickers, n)
+    prices = snap_price(rng.uniform(100, 10000, n))
+    return [(f"X{t:04d}", "B", float(p), int(q) * 100) for t, p, q in zip(tickers, prices, rng.integers(1, 50, n))]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def bench_store(path):
+    store = PortfolioStore(path)
+
+    positions = make_positions(N_POSITIONS)
+    _, t_upsert = timed(lambda: store.upsert_positions("BIG", positions))
+    print(f"upsert_positions   {N_POSITIONS:,} rows: {t_upsert * 1000:8.1f} ms")
+
+    trades = make_trades(60_000, 500)
+    _, t_first = timed(lambda: [store.record_trade("INC", *trade, 0.15, 0.25) for trade in trades[:5_000]])
+    store.record_trades("INC", trades[5_000:55_000], 0.15, 0.25)
+    _, t_last = timed(lambda: [store.record_trade("INC", *trade, 0.15, 0.25) for trade in trades[55_000:]])
+    print(f"record_trade       first 5k: {t_first / 5_000 * 1e6:7.1f} us/trade | after 55k trades: {t_last / 5_000 * 1e6:7.1f} us/trade")
+
+    batch = make_trades(1_000_000, 5_000, seed=2)
+    _, t_batch = timed(lambda: store.record_trades("BATCH", batch, 0.15, 0.25))
+    print(f"record_trades      {len(batch):,} trades in one batch: {t_batch:6.2f} s ({len(batch) / t_batch:,.0f} trades/s)")
+
+    expected = {}
+    for trade in trades:
+        apply_trade(expected, *trade, 0.15, 0.25)
+    stored = store.load_positions("INC")
+    for ticker, shares, avg in zip(stored["ticker"], stored["shares"], stored["avg"]):
+        assert shares == expected[ticker]["shares"] and abs(avg - expected[ticker]["avg"]) <= 1e-9 * avg, ticker
+
+    columns, t_load = timed(lambda: store.load_positions("BIG"))
+    compute = lambda cols: np.array([calculate_bep(a, s / 100, 0.15, 0.25) for a, s in zip(cols["avg"].tolist(), cols["shares"].tolist())])
+    _, t_cold = timed(lambda: store.metric_column("BIG", "bep", [0.15, 0.25], columns, compute))
+    _, t_warm = timed(lambda: store.metric_column("BIG", "bep", [0.15, 0.25], columns, compute))
+    print(f"load_positions     {len(columns['ticker']):,} rows: {t_load * 1000:8.1f} ms")
+    print(f"metric_column bep  cold {t_cold * 1000:8.1f} ms | cached {t_warm * 1000:8.1f} ms")
+    store.close()
+
+
+def bench_dashboard(path):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "main4.py"), default_timeout=300)
+    at.run()
+    at.text_input(key="store_account").set_value("BIG")
+    _, t_small = timed(at.run)
+    at.toggle(key="store_show").set_value(True)
+    _, t_first = timed(at.run)
+    _, t_rerun = timed(at.run)
+    assert not at.exception, at.exception
+    print(f"main4 rerun        table hidden {t_small * 1000:8.1f} ms | {N_POSITIONS:,} positions first load {t_first * 1000:8.1f} ms | rerun {t_rerun * 1000:8.1f} ms")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "portfolio.db")
+        bench_store(path)
+        # main4 opens the store named by STOCKCALC_DB
+        os.environ["STOCKCALC_DB"] = path
+        bench_dashboard(path)
+
+
+if __name__ == "__main__":
+    main()
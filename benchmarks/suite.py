@@ -0,0 +1,348 @@
+"""
+Benchmark and regression suite for the calculation functions and the apps.
+
+Covers every function in calculations.py (scalar call and bulk loop),
+calculate_metrics_batch and its fixed-point twin, fee-schedule application,
+the batched inverse solvers, the backtest engine, and a full headless rerun
+of each Streamlit app. Inputs follow realistic IDX price/lot distributions.
+
+Run from the repository root:
+    python benchmarks/suite.py              # compare against baseline.json
+    python benchmarks/suite.py --only scalar --threshold 0.5
+
+Every sample of a benchmark is taken right after a sample of reference_work,
+a fixed pure-Python workload, and each benchmark reports the median seconds
+for one unit of work (a call, a bulk pass or an app rerun) plus the median
+ratio of its samples to their reference samples. The suite makes --rounds passes
+over all groups and keeps each benchmark's median round, so its samples are
+spread over the whole run rather than a burst of a fraction of a second.
+The regression gate compares the relative time, so a host that is uniformly
+slower or faster (CPU frequency, a busy neighbour) moves it less than raw
+seconds. A relative time slower than the baseline by more than its group's
+threshold (GROUP_THRESHOLDS, sized to the spread measured between repeated
+runs on one machine) is flagged and the exit status is 1.
+
+Recording a baseline: on an otherwise idle machine, from the repository root,
+    python benchmarks/suite.py --record --rounds 5
+and commit benchmarks/baseline.json together with the change that moved it.
+Baselines are machine-specific; record them again when the hardware changes.
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batch import calculate_metrics_batch
+from calculations import (
+    calculate_bep,
+    calculate_lots_for_budget,
+    calculate_metrics,
+    calculate_new_avg,
+    calculate_percentage_change,
+    calculate_profit,
+)
+from fixedpoint import AVG_SCALE, calculate_metrics_fixed
+from solvers import IDX_TICKS
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+BULK_ROWS = 100_000
+SCALAR_SAMPLE = 10_000
+BATCH_ROWS = 1_000_000
+APPS = ("main2.py", "main3.py", "main4.py")
+BROKER_FEES = ((0.15, 0.25), (0.10, 0.20), (0.19, 0.29), (0.18, 0.28))
+REFERENCE_ROWS = 15_000
+# Allowed slowdown of the relative time per benchmark group (the part of the name before "/").
+# Sixteen default runs (two sessions) against --rounds 5 baselines on one
+# shared machine came within 1.16x (scalar), 1.24x (bulk), 1.29x (batch),
+# 1.34x (backtest) and 1.15x (app) of them, while raw seconds ranged from
+# 0.5x to 1.27x over the same runs. Each limit leaves headroom above the
+# measured spread for the host's slow phases.
+GROUP_THRESHOLDS = {"scalar": 0.30, "bulk": 0.35, "batch": 0.45, "backtest": 0.50, "app": 0.40}
+DEFAULT_THRESHOLD = 0.25
+
+
+# --- Realistic Inputs ---
+def idx_prices(rng, n):
+    """Log-uniform prices between Rp 50 and Rp 30,000, snapped down to their tick band."""
+    prices = np.exp(rng.uniform(np.log(50), np.log(30000), n))
+    ticks = np.ones(n)
+    for lower, tick in IDX_TICKS:
+        ticks[prices >= lower] = tick
+    return np.floor(prices / ticks) * ticks
+
+
+def idx_lots(rng, n):
+    """Heavy-tailed lot counts (median ~10 lots), like retail order sizes."""
+    return np.maximum(1, rng.lognormal(np.log(10), 1.2, n).astype(np.int64))
+
+
+def make_positions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    fees = np.array(BROKER_FEES)[rng.integers(0, len(BROKER_FEES), n)]
+    avg = idx_prices(rng, n)
+    return {
+        "current_avg": avg,
+        "current_lots": idx_lots(rng, n),
+        "buy_price": np.round(avg * rng.uniform(0.7, 1.1, n)),
+        "buy_lots": idx_lots(rng, n),
+        "buy_fee_pct": fees[:, 0],
+        "sell_fee_pct": fees[:, 1],
+        "target_sell_price": np.round(avg * rng.uniform(0.8, 1.5, n)),
+        "budget": np.round(rng.lognormal(np.log(10_000_000), 1.0, n), -3),
+    }
+
+
+# --- Timing ---
+def reference_work():
+    """
+    Fixed pure-Python workload (a few ms) timed before every benchmark sample.
+    It allocates small dicts as well as doing arithmetic: on a shared host
+    that tracks the slow phases of the benchmarks better than arithmetic alone.
+    """
+    rows = [{"price": i, "lots": i * 1.5} for i in range(REFERENCE_ROWS)]
+    return sum(row["price"] * row["lots"] for row in rows)
+
+
+def measure(func, repeat, units=1):
+    """
+    (median seconds per unit, median ratio to reference_work) over `repeat`
+    samples, with the garbage collector paused like timeit does.
+
+    One untimed call of each goes first: it settles the allocator (a large
+    free raises glibc's mmap threshold), so a benchmark does not depend on
+    which groups ran before it in the process.
+    """
+    reference_work()
+    func()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        seconds, relative = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            reference_work()
+            reference = time.perf_counter() - start
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            seconds.append(elapsed / units)
+            relative.append(elapsed / reference)
+        return statistics.median(seconds), statistics.median(relative)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def scalar_benchmarks(repeat):
+    """Per-call latency of each scalar function (averaged over a loop of realistic rows)."""
+    cols = {k: v.tolist() for k, v in make_positions(BULK_ROWS).items()}
+    rows = list(zip(*cols.values()))
+    keys = list(cols)
+    i = {k: keys.index(k) for k in keys}
+
+    cases = {
+        "calculate_new_avg": lambda r: calculate_new_avg(r[i["current_avg"]], r[i["buy_price"]], r[i["current_lots"]], r[i["buy_lots"]]),
+        "calculate_lots_for_budget": lambda r: calculate_lots_for_budget(r[i["budget"]], r[i["buy_price"]]),
+        "calculate_profit": lambda r: calculate_profit(r[i["target_sell_price"]], r[i["current_avg"]], r[i["current_lots"]]),
+        "calculate_percentage_change": lambda r: calculate_percentage_change(r[i["current_avg"]], r[i["target_sell_price"]]),
+        "calculate_bep": lambda r: calculate_bep(r[i["current_avg"]], r[i["current_lots"]], r[i["buy_fee_pct"]], r[i["sell_fee_pct"]]),
+        "calculate_metrics": lambda r: calculate_metrics(
+            r[i["current_avg"]], r[i["current_lots"]], r[i["buy_price"]], r[i["buy_lots"]],
+            r[i["buy_fee_pct"]], r[i["sell_fee_pct"]], r[i["target_sell_price"]],
+        ),
+    }
+    results = {}
+    for name, case in cases.items():
+        sample = rows[:SCALAR_SAMPLE]
+        # Sub-microsecond calls need more samples to get a stable median
+        results[f"scalar/{name}"] = measure(lambda: [case(r) for r in sample], repeat * 4, len(sample))
+        results[f"bulk/{name}"] = measure(lambda: [case(r) for r in rows], max(3, repeat // 2))
+    return results
+
+
+def batch_benchmarks(repeat):
+    """One vectorized pass of calculate_metrics_batch (float) and calculate_metrics_fixed (int64) over BATCH_ROWS positions."""
+    p = make_positions(BATCH_ROWS)
+    args = (p["current_avg"], p["current_lots"], p["buy_price"], p["buy_lots"], p["buy_fee_pct"], p["sell_fee_pct"], p["target_sell_price"])
+    # Flat fees: the fixed-point path takes one fee side for all rows
+    fixed_args = (np.rint(p["current_avg"] * AVG_SCALE).astype(np.int64), p["current_lots"], p["buy_price"], p["buy_lots"], 0.15, 0.25, p["target_sell_price"])
+    return {
+        "batch/calculate_metrics_batch": measure(lambda: calculate_metrics_batch(*args), repeat),
+        "batch/calculate_metrics_fixed": measure(lambda: calculate_metrics_fixed(*fixed_args), repeat),
+    }
+
+
+def fee_benchmarks(repeat):
+    """Vectorized fee-schedule application over BATCH_ROWS trades."""
+    from fees import load_fee_schedules
+
+    schedules = load_fee_schedules()
+    rng = np.random.default_rng(0)
+    brokers = rng.integers(0, len(schedules.names), BATCH_ROWS)
+    sides = rng.integers(0, 2, BATCH_ROWS)
+    values = idx_prices(rng, BATCH_ROWS) * idx_lots(rng, BATCH_ROWS) * 100
+    return {"batch/fee_schedules_apply": measure(lambda: schedules.apply(brokers, sides, values), repeat)}
+
+
+def solver_benchmarks(repeat):
+    """Batched inverse solvers (lots for a target average, max price for a target BEP) over BATCH_ROWS positions."""
+    from solvers import max_price_for_bep_batch, min_lots_to_reach_avg_batch
+
+    p = make_positions(BATCH_ROWS)
+    target = p["current_avg"] * 0.95
+    return {
+        "batch/min_lots_to_reach_avg_batch": measure(
+            lambda: min_lots_to_reach_avg_batch(p["current_avg"], p["current_lots"], p["buy_price"], target, p["buy_fee_pct"]), repeat
+        ),
+        "batch/max_price_for_bep_batch": measure(
+            lambda: max_price_for_bep_batch(p["current_avg"], p["current_lots"], p["buy_lots"], target, p["buy_fee_pct"], p["sell_fee_pct"]), repeat
+        ),
+    }
+
+
+def backtest_benchmarks(repeat):
+    """Seconds per symbol-year of the backtest engine (inverse of its throughput)."""
+    from backtest import run_backtests, write_series
+
+    rng = np.random.default_rng(0)
+    rules = [{"kind": "drop", "drop_pct": 5, "lots": 1}, {"kind": "dca", "period": "M", "lots": 1}]
+    with tempfile.TemporaryDirectory() as store:
+        start = np.datetime64("2014-01-01T00:00:00", "s")
+        times = start + (np.arange(2500) * 86400 * 365.25 / 250).astype("timedelta64[s]")
+        for t in range(20):
+            write_series(store, f"T{t:02d}", times, idx_prices(rng, 1)[0] * np.exp(np.cumsum(rng.normal(0, 0.02, len(times)))))
+        tickers = [f"T{t:02d}" for t in range(20)]
+        # Warm-up run, which also gives the symbol-years per run
+        symbol_years = sum(r["years"] for r in run_backtests(store, tickers, rules, 0.15, 0.25)[0])
+        timing = measure(lambda: run_backtests(store, tickers, rules, 0.15, 0.25), repeat, symbol_years)
+    return {"backtest/seconds_per_symbol_year": timing}
+
+
+def app_benchmarks(repeat):
+    """Wall time of one full headless rerun of each Streamlit app (after a warm-up run)."""
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    previous_db = os.environ.get("STOCKCALC_DB")
+    with tempfile.TemporaryDirectory() as tmp:
+        # main4 opens the store named by STOCKCALC_DB; keep the user's portfolio database out of it
+        os.environ["STOCKCALC_DB"] = os.path.join(tmp, "portfolio.db")
+        try:
+            for app in APPS:
+                at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=120)
+                at.run()
+                if at.exception:
+                    raise RuntimeError(f"{app} raised during warm-up: {at.exception}")
+                results[f"app/{app}"] = measure(at.run, repeat)
+        finally:
+            if previous_db is None:
+                del os.environ["STOCKCALC_DB"]
+            else:
+                os.environ["STOCKCALC_DB"] = previous_db
+    return results
+
+
+GROUPS = {
+    "scalar": scalar_benchmarks,
+    "batch": batch_benchmarks,
+    "fees": fee_benchmarks,
+    "solvers": solver_benchmarks,
+    "backtest": backtest_benchmarks,
+    "app": app_benchmarks,
+}
+
+
+def median_of_rounds(rounds):
+    """Per benchmark, the median seconds and median relative time over several passes of the suite."""
+    return {
+        name: (statistics.median(r[name][0] for r in rounds), statistics.median(r[name][1] for r in rounds))
+        for name in rounds[0]
+    }
+
+
+# --- Baseline Comparison ---
+def group_threshold(name, threshold=None):
+    """`threshold` if given, else the threshold of the benchmark's group."""
+    if threshold is not None:
+        return threshold
+    return GROUP_THRESHOLDS.get(name.split("/", 1)[0], DEFAULT_THRESHOLD)
+
+
+def compare(results, baseline, threshold=None):
+    """
+    Returns the names of benchmarks whose relative time exceeds the baseline's
+    by more than their threshold. `results` and `baseline` map names to
+    (seconds, relative) pairs.
+    """
+    regressions = []
+    for name, (seconds, relative) in results.items():
+        base = baseline.get(name)
+        if base is None:
+            status = "new"
+        else:
+            allowed = group_threshold(name, threshold)
+            ratio = relative / base[1]
+            status = f"{ratio:5.2f}x (limit {1 + allowed:.2f}x)"
+            if ratio > 1 + allowed:
+                status += "  REGRESSION"
+                regressions.append(name)
+        print(f"{name:<45} {seconds * 1e6:14.2f} us  {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and regression suite.")
+    parser.add_argument("--only", nargs="+", choices=sorted(GROUPS), help="Run only these groups")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per benchmark and round")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over all groups; each benchmark reports its median round")
+    parser.add_argument("--threshold", type=float, help="Allowed slowdown for every group (0.25 = 25%%); default GROUP_THRESHOLDS")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--record", "--update", dest="record", action="store_true", help="Write results as the new baseline")
+    args = parser.parse_args()
+
+    rounds = []
+    for _ in range(args.rounds):
+        results = {}
+        for group in args.only or GROUPS:
+            results.update(GROUPS[group](args.repeat))
+        rounds.append(results)
+    results = median_of_rounds(rounds)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            recorded = json.load(f)
+        # Baselines from before relative timing carry seconds only; treat their entries as new
+        baseline = {name: (recorded["seconds"][name], relative) for name, relative in recorded.get("relative", {}).items()}
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.record:
+        merged = {**baseline, **results}
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "repeat": args.repeat,
+                "seconds": {name: seconds for name, (seconds, _) in merged.items()},
+                "relative": {name: relative for name, (_, relative) in merged.items()},
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# Shared calculation core for the Streamlit apps, the CLI and batch jobs.
+# Keep this module free of third-party imports (no streamlit, no numpy) so it
+# stays cheap to import.
+#
+# Fee arguments are percentages, or a fee schedule side (fees.FeeSide): any
+# object with fee(value) and gross_for_net(net) methods. Percentages take the
+# plain arithmetic path; a schedule makes that arithmetic raise TypeError, which
+# switches to the schedule path at no cost to the common case.
+
+
+def calculate_new_avg(avg_price, current_price, current_lots, buy_lots):
+    """Calculates the new average price after buying additional lots."""
+    total_shares_value = (current_lots * avg_price * 100) + (buy_lots * current_price * 100)
+    total_lots = current_lots + buy_lots
+    if total_lots == 0:
+        return 0
+    new_avg = total_shares_value / (total_lots * 100)
+    return new_avg
+
+def calculate_lots_for_budget(budget, stock_price):
+    """Calculates how many lots can be bought with a given budget."""
+    if stock_price == 0:
+        return 0
+    return budget // (stock_price * 100) # Integer division for whole lots
+
+def calculate_profit(target_price, avg_price, total_lots):
+    """Calculates potential profit based on target sell price."""
+    return (target_price - avg_price) * total_lots * 100
+
+def calculate_percentage_change(current_avg_price, current_market_price):
+    """Calculates the percentage upside or downside."""
+    if current_avg_price == 0:
+        return 0
+    percentage = ((current_market_price - current_avg_price) / current_avg_price) * 100
+    return percentage
+
+def calculate_bep(avg_price, total_lots, buy_fee_percentage, sell_fee_percentage):
+    """
+    Calculates the Break-Even Price (BEP) including buy and sell transaction fees.
+    Assumes avg_price is your *current* average price per share.
+    """
+    if total_lots == 0:
+        return 0
+
+    try:
+        buy_fee_decimal = buy_fee_percentage / 100
+        sell_fee_decimal = sell_fee_percentage / 100
+    except TypeError:
+        # Treat the position as one buy of all its shares at avg_price
+        total_shares, total_cost = calculate_cost_basis(0, 0, avg_price, total_lots, buy_fee_percentage)
+        return calculate_fee_bep(total_cost / total_shares, sell_fee_percentage, total_shares)
+
+    effective_avg_cost_per_share = avg_price * (1 + buy_fee_decimal)
+
+    if (1 - sell_fee_decimal) <= 0: # Avoid division by zero or negative/zero denominator
+        return float('inf') # Indicates impossible to break even with such high fees
+
+    bep = effective_avg_cost_per_share / (1 - sell_fee_decimal)
+    return bep
+
+def calculate_cost_basis(current_avg, current_lots, buy_price, buy_lots, buy_fee_pct):
+    """Total shares and fee-inclusive cost basis after an additional buy."""
+    current_shares = current_lots * 100
+    current_cost = current_shares * current_avg
+
+    new_shares = buy_lots * 100
+    new_buy_value = new_shares * buy_price
+    try:
+        new_buy_cost_total = new_buy_value * (1 + buy_fee_pct / 100)
+    except TypeError:
+        new_buy_cost_total = new_buy_value + buy_fee_pct.fee(new_buy_value)
+
+    total_shares = current_shares + new_shares
+    total_cost_basis = current_cost + new_buy_cost_total
+    return total_shares, total_cost_basis
+
+def calculate_fee_avg(total_shares, total_cost_basis):
+    """Fee-inclusive average price per share."""
+    if total_shares == 0:
+        return 0
+    return total_cost_basis / total_shares
+
+def calculate_fee_bep(fee_avg, sell_fee_pct, total_shares=None):
+    """
+    BEP from a fee-inclusive average: the price that covers the sell fee.
+    A fee schedule needs total_shares, since minimum fees and tiers depend on trade size.
+    """
+    try:
+        return fee_avg / (1 - sell_fee_pct / 100)
+    except TypeError:
+        if not total_shares:
+            return 0
+        return sell_fee_pct.gross_for_net(fee_avg * total_shares) / total_shares
+
+def calculate_net_pnl(total_shares, total_cost_basis, sell_fee_pct, target_sell_price):
+    """Net PnL (nominal, percent) of selling the whole position at target_sell_price."""
+    if total_shares == 0:
+        return 0, 0
+    total_sell_value = total_shares * target_sell_price
+    try:
+        net_sell_proceeds = total_sell_value * (1 - sell_fee_pct / 100)
+    except TypeError:
+        net_sell_proceeds = total_sell_value - sell_fee_pct.fee(total_sell_value)
+    pnl_nominal = net_sell_proceeds - total_cost_basis
+    pnl_percent = (pnl_nominal / total_cost_basis) * 100 if total_cost_basis > 0 else 0
+    return pnl_nominal, pnl_percent
+
+def calculate_metrics(current_avg, current_lots, buy_price, buy_lots, buy_fee_pct, sell_fee_pct, target_sell_price):
+    """Menghitung metrik investasi dengan memperhitungkan biaya transaksi."""
+    try:
+        b_fee = buy_fee_pct / 100
+        s_fee = sell_fee_pct / 100
+    except TypeError:
+        total_shares, total_cost_basis = calculate_cost_basis(current_avg, current_lots, buy_price, buy_lots, buy_fee_pct)
+        if total_shares == 0: return 0, 0, 0, 0, 0
+        new_avg = calculate_fee_avg(total_shares, total_cost_basis)
+        bep = calculate_fee_bep(new_avg, sell_fee_pct, total_shares)
+        pnl_nominal, pnl_percent = calculate_net_pnl(total_shares, total_cost_basis, sell_fee_pct, target_sell_price)
+        return new_avg, bep, total_shares // 100, pnl_nominal, pnl_percent
+
+    current_shares = current_lots * 100
+    current_cost = current_shares * current_avg
+
+    new_shares = buy_lots * 100
+    new_buy_value = new_shares * buy_price
+    new_buy_cost_total = new_buy_value * (1 + b_fee)
+
+    total_shares = current_shares + new_shares
+    total_cost_basis = current_cost + new_buy_cost_total
+
+    if total_shares == 0: return 0, 0, 0, 0, 0
+
+    new_avg = total_cost_basis / total_shares
+    bep = new_avg / (1 - s_fee)
+
+    total_sell_value = total_shares * target_sell_price
+    net_sell_proceeds = total_sell_value * (1 - s_fee)
+    pnl_nominal = net_sell_proceeds - total_cost_basis
+    pnl_percent = (pnl_nominal / total_cost_basis) * 100 if total_cost_basis > 0 else 0
+
+    return new_avg, bep, total_shares // 100, pnl_nominal, pnl_percent
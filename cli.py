@@ -0,0 +1,117 @@
+"""
+Headless batch calculator: positions in on stdin, metrics out on stdout.
+
+Input is CSV with a header row, a JSON array of objects, or JSON Lines; each
+position has current_avg, current_lots and target_sell_price, and optionally
+buy_price, buy_lots, buy_fee_pct and sell_fee_pct (default 0). Output uses the
+input format unless --format is given.
+
+    python cli.py < positions.csv > metrics.csv
+    python cli.py --format json < positions.jsonl
+    python cli.py --fixed < positions.csv     # integer-rupiah mode (fixedpoint)
+
+Only the standard library and the calculations module are imported (NumPy only
+with --fixed), so start-up stays a small fraction of `import streamlit`.
+"""
+import argparse
+import csv
+import json
+import sys
+
+from calculations import calculate_metrics
+
+REQUIRED_FIELDS = ("current_avg", "current_lots", "target_sell_price")
+OPTIONAL_FIELDS = ("buy_price", "buy_lots", "buy_fee_pct", "sell_fee_pct")
+RESULT_FIELDS = ("new_avg", "bep", "total_lots", "pnl_nominal", "pnl_percent")
+
+
+def read_positions(text):
+    """Parses stdin text; returns (rows, detected_format)."""
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        return json.loads(stripped), "json"
+    if stripped.startswith("{"):
+        return [json.loads(line) for line in stripped.splitlines() if line.strip()], "jsonl"
+    return list(csv.DictReader(stripped.splitlines())), "csv"
+
+
+def number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def check_fixed_inputs(args, line_no):
+    """Fixed-point mode works in whole lots and whole rupiah; refuse fractions instead of truncating them."""
+    from fixedpoint import AVG_SCALE
+
+    for name in ("current_lots", "buy_lots"):
+        if args[name] != int(args[name]):
+            raise ValueError(f"baris {line_no}: {name} {args[name]} bukan lot bulat.")
+    for name in ("buy_price", "target_sell_price"):
+        if args[name] != int(args[name]):
+            raise ValueError(f"baris {line_no}: harga {args[name]} bukan rupiah bulat.")
+    scaled = args["current_avg"] * AVG_SCALE
+    if abs(scaled - round(scaled)) > 1e-6:
+        raise ValueError(f"baris {line_no}: rata-rata {args['current_avg']} lebih presisi dari 1/{AVG_SCALE} rupiah.")
+
+
+def fixed_point_metrics(current_avg, current_lots, buy_price, buy_lots, buy_fee_pct, sell_fee_pct, target_sell_price):
+    """calculate_metrics in integer rupiah, with broker rounding; averages keep AVG_SCALE decimals."""
+    from fixedpoint import AVG_SCALE, PCT_SCALE, calculate_metrics_fixed, to_fixed
+
+    new_avg, bep, total_lots, pnl_nominal, pnl_percent = calculate_metrics_fixed(
+        to_fixed(current_avg), current_lots, buy_price, buy_lots, buy_fee_pct, sell_fee_pct, target_sell_price,
+    )
+    return int(new_avg) / AVG_SCALE, int(bep) / AVG_SCALE, int(total_lots), int(pnl_nominal), int(pnl_percent) / PCT_SCALE
+
+
+def evaluate(row, line_no, fixed=False):
+    if not isinstance(row, dict):
+        raise ValueError(f"baris {line_no}: harus berupa objek dengan kolom posisi, bukan {type(row).__name__}")
+    missing = [name for name in REQUIRED_FIELDS if row.get(name) in (None, "")]
+    if missing:
+        raise ValueError(f"baris {line_no}: kolom wajib kosong: {', '.join(missing)}")
+    args = {name: number(row[name]) for name in REQUIRED_FIELDS}
+    for name in OPTIONAL_FIELDS:
+        args[name] = number(row[name]) if row.get(name) not in (None, "") else 0
+    if fixed:
+        check_fixed_inputs(args, line_no)
+    metrics = (fixed_point_metrics if fixed else calculate_metrics)(
+        args["current_avg"], args["current_lots"], args["buy_price"], args["buy_lots"],
+        args["buy_fee_pct"], args["sell_fee_pct"], args["target_sell_price"],
+    )
+    return {**row, **args, **dict(zip(RESULT_FIELDS, metrics))}
+
+
+def write_results(results, fmt, out):
+    if fmt == "json":
+        json.dump(results, out)
+        out.write("\n")
+    elif fmt == "jsonl":
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+    else:
+        fieldnames = list(results[0]) if results else list(REQUIRED_FIELDS + RESULT_FIELDS)
+        writer = csv.DictWriter(out, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hitung metrik posisi saham dari stdin (CSV/JSON).")
+    parser.add_argument("--format", choices=("csv", "json", "jsonl"), help="Format output (default: sama dengan input)")
+    parser.add_argument("--fixed", action="store_true", help="Hitung dalam rupiah bulat dengan pembulatan ala broker")
+    args = parser.parse_args(argv)
+
+    try:
+        rows, detected = read_positions(sys.stdin.read())
+        results = [evaluate(row, i, args.fixed) for i, row in enumerate(rows, start=1)]
+        write_results(results, args.format or detected, sys.stdout)
+    except (ValueError, TypeError, csv.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
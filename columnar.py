@@ -0,0 +1,195 @@
+"""
+Columnar results, streaming export and chart downsampling.
+
+Calculation results become Arrow record batches whose numeric columns wrap
+the NumPy result arrays without copying:
+    scenario_table(inputs, results)   one calculate_metrics scenario (one row)
+    table_from_columns(columns)       any dict of equal-length columns, e.g.
+                                      portfolio batches or store.load_positions
+    sweep_batches(grid)               a sweep.scenario_grid in long format
+                                      (one row per scenario), chunk by chunk
+
+write_batches() streams batches to Parquet, Arrow IPC or CSV one chunk at a
+time, so a multi-million-row sweep is never assembled into one long table;
+export_bytes() does the same into memory for download buttons.
+
+lttb() picks the points of a large (x, y) series worth drawing
+(Largest-Triangle-Three-Buckets), so charts send a few hundred points to the
+browser whatever the input size.
+"""
+import io
+import itertools
+from typing import NamedTuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet
+
+from cli import RESULT_FIELDS
+
+CHUNK_ROWS = 1 << 16
+# Parquet compresses and writes much faster in large row groups, so chunks are grouped up to this size
+PARQUET_ROW_GROUP = 1 << 20
+CHART_POINTS = 500
+
+
+class ExportFormat(NamedTuple):
+    label: str
+    extension: str
+    mime: str
+
+
+FORMATS = {
+    "parquet": ExportFormat("Parquet", "parquet", "application/vnd.apache.parquet"),
+    "arrow": ExportFormat("Arrow", "arrow", "application/vnd.apache.arrow.file"),
+    "csv": ExportFormat("CSV", "csv", "text/csv"),
+}
+
+
+# --- Tables ---
+def column_array(values):
+    """Arrow array over a column; contiguous numeric NumPy arrays are wrapped, not copied."""
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        return values
+    values = np.asarray(values)
+    if values.dtype.kind in "fiub":
+        return pa.array(np.ascontiguousarray(values))
+    return pa.array(values.tolist())
+
+
+def table_from_columns(columns):
+    """Arrow table from a dict of equal-length columns (NumPy arrays, lists, pandas Series)."""
+    return pa.table({name: column_array(values) for name, values in columns.items()})
+
+
+def scenario_table(inputs, results):
+    """One-row table: the scenario's inputs followed by its results (a dict, or a calculate_metrics tuple)."""
+    if not isinstance(results, dict):
+        results = dict(zip(RESULT_FIELDS, results))
+    return pa.table({name: [value] for name, value in {**inputs, **results}.items()})
+
+
+def sweep_batches(grid, chunk_rows=CHUNK_ROWS):
+    """
+    A scenario_grid as record batches of one row per (buy_price, buy_lots,
+    target_price) scenario, in grid order. PnL columns are slices of the
+    grid's own arrays; only the axis and average/BEP columns of the current
+    chunk are materialized.
+    """
+    n_prices, n_lots, n_targets = grid["pnl"].shape
+    flat = {name: grid[name].reshape(-1) for name in ("new_avg", "bep", "pnl", "pnl_pct")}
+    total = n_prices * n_lots * n_targets
+    for start in range(0, total, chunk_rows):
+        stop = min(start + chunk_rows, total)
+        index = np.arange(start, stop)
+        pair = index // n_targets
+        yield pa.record_batch({
+            "buy_price": pa.array(grid["buy_price"][pair // n_lots]),
+            "buy_lots": pa.array(grid["buy_lots"][pair % n_lots]),
+            "target_price": pa.array(grid["target_price"][index % n_targets]),
+            "new_avg": pa.array(flat["new_avg"][pair]),
+            "bep": pa.array(flat["bep"][pair]),
+            "pnl": pa.array(flat["pnl"][start:stop]),
+            "pnl_pct": pa.array(flat["pnl_pct"][start:stop]),
+        })
+
+
+def table_batches(table, chunk_rows=CHUNK_ROWS):
+    """Record batches of at most chunk_rows rows (zero-copy slices of the table)."""
+    return table.to_batches(max_chunksize=chunk_rows)
+
+
+# --- Export ---
+def write_batches(batches, sink, fmt):
+    """
+    Streams record batches to `sink` (path or binary file) as "parquet",
+    "arrow" (IPC file) or "csv". Batches are written as they come, so memory
+    stays at one chunk (one row group of PARQUET_ROW_GROUP rows for Parquet).
+    Returns the number of rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format ekspor tidak dikenal: {fmt!r}")
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        return 0
+    if fmt == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(sink, first.schema)
+    elif fmt == "arrow":
+        writer = pa.ipc.new_file(sink, first.schema)
+    else:
+        writer = pyarrow.csv.CSVWriter(sink, first.schema)
+    rows = 0
+    group, group_rows = [], 0
+    with writer:
+        for batch in itertools.chain([first], batches):
+            rows += batch.num_rows
+            if fmt != "parquet":
+                writer.write_batch(batch)
+                continue
+            group.append(batch)
+            group_rows += batch.num_rows
+            if group_rows >= PARQUET_ROW_GROUP:
+                writer.write_table(pa.Table.from_batches(group), row_group_size=group_rows)
+                group, group_rows = [], 0
+        if group:
+            writer.write_table(pa.Table.from_batches(group), row_group_size=group_rows)
+    return rows
+
+
+def export_bytes(batches, fmt):
+    """write_batches into memory; the file contents as bytes."""
+    sink = io.BytesIO()
+    write_batches(batches, sink, fmt)
+    return sink.getvalue()
+
+
+def export_buttons(make_batches, file_stem, key):
+    """
+    One Streamlit download button per format. make_batches() is only called
+    when a button is clicked, so building the page costs nothing.
+    """
+    import streamlit as st
+
+    for col, (fmt, spec) in zip(st.columns(len(FORMATS)), FORMATS.items()):
+        col.download_button(
+            f"⬇️ {spec.label}", data=lambda fmt=fmt: export_bytes(make_batches(), fmt),
+            file_name=f"{file_stem}.{spec.extension}", mime=spec.mime, key=f"{key}_{fmt}",
+            on_click="ignore", use_container_width=True,
+        )
+
+
+# --- Downsampling ---
+def lttb(x, y, n_out=CHART_POINTS):
+    """
+    Indices of n_out points of the series (x sorted ascending) chosen by
+    Largest-Triangle-Three-Buckets: the first and last points, plus, per
+    bucket, the point forming the largest triangle with the previously kept
+    point and the next bucket's mean. Peaks and kinks survive; flat runs
+    collapse. Returns all indices when the series is already small enough.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets over the points between the first and the last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[b]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[b] - ay))
+        a = lo + int(area.argmax())
+        keep[b + 1] = a
+    return keep
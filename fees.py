@@ -0,0 +1,200 @@
+"""
+Broker fee schedules.
+
+Schedules live in brokers.json, one entry per broker with a "beli" (buy) and a
+"jual" (sell) side:
+
+    tiers           [[from_value, commission_pct], ...] - rate by trade value (IDR),
+                    ascending, the first bracket starting at 0
+    min_commission  minimum commission per trade (IDR)
+    vat_pct         VAT charged on the commission
+    levy_pct        exchange levy on the trade value
+    sales_tax_pct   final income tax on the trade value (sell side)
+
+The file is loaded once and compiled into FeeSide tuples for scalar use and
+into padded NumPy arrays for vectorized fee application on bulk trades.
+"""
+import json
+import os
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "brokers.json")
+SIDES = ("beli", "jual")
+
+
+# --- Compiled Schedule (one broker, one side) ---
+class FeeSide(NamedTuple):
+    """
+    One side of a broker's fee schedule.
+
+    Hashable, and usable in place of a fee percentage wherever calculations.py
+    accepts one (calculate_metrics, calculate_bep, ...).
+    """
+    tiers_from: tuple
+    tiers_pct: tuple
+    min_commission: float = 0.0
+    vat_pct: float = 0.0
+    levy_pct: float = 0.0
+    sales_tax_pct: float = 0.0
+
+    @property
+    def flat_pct(self):
+        """All-in percentage of the first bracket, ignoring the minimum commission."""
+        return self.tiers_pct[0] * (1 + self.vat_pct / 100) + self.levy_pct + self.sales_tax_pct
+
+    def commission_pct(self, value):
+        pct = self.tiers_pct[0]
+        for start, tier_pct in zip(self.tiers_from, self.tiers_pct):
+            if value < start:
+                break
+            pct = tier_pct
+        return pct
+
+    def fee(self, value):
+        """Total fee (IDR) on a trade of the given value."""
+        if value <= 0:
+            return 0
+        commission = max(value * self.commission_pct(value) / 100, self.min_commission)
+        return commission * (1 + self.vat_pct / 100) + value * (self.levy_pct + self.sales_tax_pct) / 100
+
+    def gross_for_net(self, net):
+        """
+        Smallest trade value whose proceeds after this side's fee reach `net`.
+
+        Solved in closed form per bracket (proportional commission, or the
+        minimum commission binding); bracket starts are also candidates in case
+        the net amount jumps across a boundary. Returns inf when fees swallow
+        the whole trade value.
+        """
+        if net <= 0:
+            return 0
+        vat = 1 + self.vat_pct / 100
+        flat = (self.levy_pct + self.sales_tax_pct) / 100
+        candidates = list(self.tiers_from)
+        for pct in self.tiers_pct:
+            rate = pct / 100
+            if 1 - rate * vat - flat > 0:
+                candidates.append(net / (1 - rate * vat - flat))
+            if 1 - flat > 0:
+                candidates.append((net + self.min_commission * vat) / (1 - flat))
+        # Tolerance for the round trip through floating point
+        reached = [v for v in candidates if v > 0 and v - self.fee(v) >= net * (1 - 1e-12)]
+        return min(reached) if reached else float("inf")
+
+    # Elementwise twins of fee() and gross_for_net() for NumPy arrays, same arithmetic per element
+    def fee_array(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        pct = np.full(values.shape, self.tiers_pct[0])
+        for start, tier_pct in zip(self.tiers_from[1:], self.tiers_pct[1:]):
+            pct = np.where(values >= start, tier_pct, pct)
+        commission = np.maximum(values * pct / 100, self.min_commission)
+        fee = commission * (1 + self.vat_pct / 100) + values * (self.levy_pct + self.sales_tax_pct) / 100
+        return np.where(values > 0, fee, 0.0)
+
+    def gross_for_net_array(self, net):
+        net = np.asarray(net, dtype=np.float64)
+        vat = 1 + self.vat_pct / 100
+        flat = (self.levy_pct + self.sales_tax_pct) / 100
+        candidates = [np.full(net.shape, start) for start in self.tiers_from]
+        for pct in self.tiers_pct:
+            rate = pct / 100
+            if 1 - rate * vat - flat > 0:
+                candidates.append(net / (1 - rate * vat - flat))
+        if 1 - flat > 0:
+            candidates.append((net + self.min_commission * vat) / (1 - flat))
+        best = np.full(net.shape, np.inf)
+        for v in candidates:
+            reached = (v > 0) & (v - self.fee_array(v) >= net * (1 - 1e-12))
+            best = np.where(reached & (v < best), v, best)
+        return np.where(net > 0, best, 0.0)
+
+
+def compile_side(spec):
+    tiers = sorted((float(start), float(pct)) for start, pct in spec["tiers"])
+    if not tiers or tiers[0][0] != 0:
+        raise ValueError("Tier biaya pertama harus dimulai dari nilai transaksi 0.")
+    return FeeSide(
+        tiers_from=tuple(start for start, _ in tiers),
+        tiers_pct=tuple(pct for _, pct in tiers),
+        min_commission=float(spec.get("min_commission", 0)),
+        vat_pct=float(spec.get("vat_pct", 0)),
+        levy_pct=float(spec.get("levy_pct", 0)),
+        sales_tax_pct=float(spec.get("sales_tax_pct", 0)),
+    )
+
+
+# --- Compiled Schedules (all brokers) ---
+class FeeSchedules:
+    """
+    Every broker's schedule compiled into an indexed lookup.
+
+    `side(broker, "beli" | "jual")` returns a FeeSide for scalar use;
+    `apply(brokers, sides, values)` computes fees for many trades at once.
+    """
+
+    def __init__(self, specs):
+        self.names = list(specs)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.sides = {(name, side): compile_side(specs[name][side]) for name in self.names for side in SIDES}
+
+        n_tiers = max(len(s.tiers_from) for s in self.sides.values())
+        shape = (len(self.names), len(SIDES))
+        # Unused brackets are padded with +inf starts so they never match
+        self.tiers_from = np.full(shape + (n_tiers,), np.inf)
+        self.tiers_pct = np.zeros(shape + (n_tiers,))
+        self.min_commission = np.zeros(shape)
+        self.vat = np.zeros(shape)
+        self.flat = np.zeros(shape)
+        for (name, side), s in self.sides.items():
+            b, k = self.index[name], SIDES.index(side)
+            self.tiers_from[b, k, :len(s.tiers_from)] = s.tiers_from
+            self.tiers_pct[b, k, :len(s.tiers_pct)] = s.tiers_pct
+            self.min_commission[b, k] = s.min_commission
+            self.vat[b, k] = 1 + s.vat_pct / 100
+            self.flat[b, k] = (s.levy_pct + s.sales_tax_pct) / 100
+
+    def side(self, broker, side):
+        return self.sides[(broker, side)]
+
+    def broker_codes(self, brokers):
+        """Broker names (or already-encoded indices) as an int array."""
+        brokers = np.asarray(brokers)
+        if brokers.dtype.kind in "iu":
+            return brokers
+        return np.array([self.index[name] for name in brokers.tolist()], dtype=np.int64).reshape(brokers.shape)
+
+    def apply(self, brokers, sides, values):
+        """
+        Vectorized fees (IDR) for many trades.
+
+        `brokers` are names or indices, `sides` are "beli"/"jual" or 0/1, and
+        `values` are trade values in IDR; all broadcast against each other.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        b = self.broker_codes(brokers)
+        sides = np.asarray(sides)
+        k = np.where(sides == "jual", 1, 0) if sides.dtype.kind in "US" else sides.astype(np.int64)
+        b, k, values = np.broadcast_arrays(b, k, values)
+        row = b * len(SIDES) + k
+
+        n_tiers = self.tiers_from.shape[-1]
+        tiers_from = self.tiers_from.reshape(-1, n_tiers)
+        tiers_pct = self.tiers_pct.reshape(-1, n_tiers)
+        pct = tiers_pct[row, 0]
+        # Brackets are ascending, so later matches overwrite earlier ones
+        for t in range(1, n_tiers):
+            pct = np.where(values >= tiers_from[row, t], tiers_pct[row, t], pct)
+
+        commission = np.maximum(values * pct / 100, self.min_commission.ravel()[row])
+        fee = commission * self.vat.ravel()[row] + values * self.flat.ravel()[row]
+        return np.where(values > 0, fee, 0.0)
+
+
+@lru_cache(maxsize=4)
+def load_fee_schedules(path=DEFAULT_PATH):
+    """Loads and compiles brokers.json once per process."""
+    with open(path, encoding="utf-8") as f:
+        return FeeSchedules(json.load(f))
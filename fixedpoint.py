@@ -0,0 +1,237 @@
+"""
+Fixed-point (integer rupiah) arithmetic for averages, fees and PnL.
+
+The float path (calculations.py, batch.py) can drift in the last rupiah, so
+it does not reconcile with broker statements. In fixed-point mode:
+
+    money        int64 rupiah (trade values, fees, cost basis, PnL)
+    prices       int64 rupiah, as quoted on IDX
+    averages     int64 scaled by AVG_SCALE (AVG_SCALE=100 -> 2 decimals)
+    percentages  int64 scaled by PCT_SCALE
+    fee rates    int64 parts per million of the trade value
+
+Every division rounds with an explicit rule. The rule names are the decimal
+module's constants (decimal.ROUND_HALF_UP, ...), so a Decimal reference
+computation can use the same rules. The default Rounding follows common
+broker practice:
+
+- Each fee component (commission, VAT, levy, sales tax) is rounded half up
+  to whole rupiah on every trade.
+- Averages are rounded half up to AVG_SCALE.
+- The BEP is the smallest scaled price whose net sale proceeds cover the
+  cost basis, so it is never understated.
+
+int64 covers positions up to about 10^12 rupiah.
+"""
+from decimal import ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+PPM = 1_000_000
+AVG_SCALE = 100
+PCT_SCALE = 100
+
+
+class Rounding(NamedTuple):
+    fee: str = ROUND_HALF_UP
+    avg: str = ROUND_HALF_UP
+    pct: str = ROUND_HALF_UP
+
+
+BROKER_ROUNDING = Rounding()
+
+
+# --- Conversions ---
+def to_ppm(pct):
+    """A percentage as an integer rate in parts per million; rejects rates finer than 0.0001%."""
+    ppm = round(pct * PPM / 100)
+    if abs(pct * PPM / 100 - ppm) > 1e-6:
+        raise ValueError(f"Persentase {pct} tidak bisa dinyatakan tepat dalam ppm.")
+    return ppm
+
+
+def to_fixed(values, scale=AVG_SCALE):
+    """Float (or int) values as int64 scaled by `scale`, rounded to nearest."""
+    return np.rint(np.asarray(values, dtype=np.float64) * scale).astype(np.int64)
+
+
+def from_fixed(values, scale=AVG_SCALE):
+    """Scaled integers back to floats, for display."""
+    return np.asarray(values, dtype=np.float64) / scale
+
+
+def format_fixed(value, scale=AVG_SCALE):
+    """Exact decimal string of a scaled integer (no float round trip)."""
+    digits = len(str(scale)) - 1
+    sign = "-" if value < 0 else ""
+    whole, frac = divmod(abs(int(value)), scale)
+    return f"{sign}{whole}.{frac:0{digits}d}" if digits else f"{sign}{whole}"
+
+
+def round_div(num, den, mode=ROUND_HALF_UP):
+    """
+    num / den rounded to an integer with a decimal-module rounding rule.
+
+    Works elementwise on int64 arrays (and Python ints); den must be positive.
+    """
+    q, r = np.divmod(num, den)
+    exact = r == 0
+    if mode == ROUND_FLOOR:
+        return q
+    if mode == ROUND_CEILING:
+        return q + ~exact
+    if mode == ROUND_DOWN:
+        return np.where((num < 0) & ~exact, q + 1, q)
+    if mode == ROUND_UP:
+        return np.where((num >= 0) & ~exact, q + 1, q)
+
+    twice = 2 * r
+    if mode == ROUND_HALF_UP:
+        tie_up = num >= 0
+    elif mode == ROUND_HALF_DOWN:
+        tie_up = num < 0
+    elif mode == ROUND_HALF_EVEN:
+        tie_up = q % 2 == 1
+    else:
+        raise ValueError(f"Aturan pembulatan tidak dikenal: {mode!r}")
+    return np.where((twice > den) | ((twice == den) & tie_up), q + 1, q)
+
+
+# --- Integer Fee Schedules ---
+class FixedFee(NamedTuple):
+    """One fee side (a flat percentage or a fees.FeeSide) in integer rupiah and ppm."""
+    tiers_from: tuple
+    tiers_ppm: tuple
+    min_commission: int = 0
+    vat_ppm: int = 0
+    levy_ppm: int = 0
+    sales_tax_ppm: int = 0
+
+    def fee(self, values, rounding=BROKER_ROUNDING):
+        """Total fee (rupiah) on trade values (rupiah), each component rounded separately."""
+        values = np.asarray(values, dtype=np.int64)
+        rate = np.full(values.shape, self.tiers_ppm[0], dtype=np.int64)
+        for start, tier_ppm in zip(self.tiers_from[1:], self.tiers_ppm[1:]):
+            rate = np.where(values >= start, tier_ppm, rate)
+
+        commission = np.maximum(round_div(values * rate, PPM, rounding.fee), self.min_commission)
+        fee = commission + round_div(commission * self.vat_ppm, PPM, rounding.fee)
+        if self.levy_ppm:
+            fee = fee + round_div(values * self.levy_ppm, PPM, rounding.fee)
+        if self.sales_tax_ppm:
+            fee = fee + round_div(values * self.sales_tax_ppm, PPM, rounding.fee)
+        return np.where(values > 0, fee, 0)
+
+
+@lru_cache(maxsize=64)
+def fixed_fee(fee):
+    """Compiles a fee percentage or a fees.FeeSide into a FixedFee."""
+    if isinstance(fee, FixedFee):
+        return fee
+    try:
+        return FixedFee(tiers_from=(0,), tiers_ppm=(to_ppm(fee),))
+    except TypeError:
+        return FixedFee(
+            tiers_from=tuple(int(start) for start in fee.tiers_from),
+            tiers_ppm=tuple(to_ppm(pct) for pct in fee.tiers_pct),
+            min_commission=int(round(fee.min_commission)),
+            vat_ppm=to_ppm(fee.vat_pct),
+            levy_ppm=to_ppm(fee.levy_pct),
+            sales_tax_ppm=to_ppm(fee.sales_tax_pct),
+        )
+
+
+# --- Fixed-Point Metrics ---
+def break_even_price(total_cost, total_shares, sell_fee, rounding=BROKER_ROUNDING):
+    """
+    Smallest price (scaled by AVG_SCALE) at which selling every share nets at least the cost basis.
+
+    Net proceeds are evaluated exactly with the integer fee rules. The closed
+    form for the first bracket (proportional or minimum commission) gives the
+    answer for almost every row after checking it and the price one step
+    below; the remaining rows (rounding or bracket effects) are bisected.
+    """
+    fee = fixed_fee(sell_fee)
+    total_cost, total_shares = np.broadcast_arrays(np.asarray(total_cost, dtype=np.int64), np.asarray(total_shares, dtype=np.int64))
+    shape = total_cost.shape
+    total_cost = total_cost.ravel()
+    total_shares = np.maximum(total_shares.ravel(), 1)
+
+    def covers(price, rows=slice(None)):
+        value = round_div(total_shares[rows] * price, AVG_SCALE, rounding.fee)
+        return value - fee.fee(value, rounding) >= total_cost[rows]
+
+    # Float estimate only seeds the search; the answer itself is exact
+    vat = 1 + fee.vat_ppm / PPM
+    flat = (fee.levy_ppm + fee.sales_tax_ppm) / PPM
+    gross = np.maximum(
+        total_cost / max(1 - fee.tiers_ppm[0] / PPM * vat - flat, 1e-6),
+        (total_cost + fee.min_commission * vat) / max(1 - flat, 1e-6),
+    )
+    price = np.ceil(gross * AVG_SCALE / total_shares).astype(np.int64)
+    found = covers(price) & ~covers(price - 1)
+    if found.all():
+        return price.reshape(shape)
+
+    rows = np.flatnonzero(~found)
+    # Proceeds never exceed the sale value, so the fee-free average is a lower bound
+    lo = round_div(total_cost[rows] * AVG_SCALE, total_shares[rows], ROUND_FLOOR)
+    hi = np.maximum(price[rows], lo) + 1
+    while True:
+        short = ~covers(hi, rows)
+        if not short.any():
+            break
+        lo = np.where(short, hi + 1, lo)
+        hi = np.where(short, 2 * hi, hi)
+    while True:
+        open_ = lo < hi
+        if not open_.any():
+            break
+        mid = (lo + hi) // 2
+        ok = covers(mid, rows)
+        hi = np.where(open_ & ok, mid, hi)
+        lo = np.where(open_ & ~ok, mid + 1, lo)
+    price[rows] = hi
+    return price.reshape(shape)
+
+
+def calculate_metrics_fixed(current_avg, current_lots, buy_price, buy_lots, buy_fee, sell_fee, target_sell_price, rounding=BROKER_ROUNDING):
+    """
+    Fixed-point counterpart of batch.calculate_metrics_batch.
+
+    current_avg is scaled by AVG_SCALE (use to_fixed), prices are whole rupiah
+    and fees are percentages or fees.FeeSide. Returns int64 arrays (new_avg and
+    bep scaled by AVG_SCALE, total_lots, pnl_nominal in rupiah, pnl_percent
+    scaled by PCT_SCALE). Rows that end up holding zero shares are all zeros.
+    """
+    current_avg = np.asarray(current_avg, dtype=np.int64)
+    current_shares = np.asarray(current_lots, dtype=np.int64) * 100
+    buy_price = np.asarray(buy_price, dtype=np.int64)
+    new_shares = np.asarray(buy_lots, dtype=np.int64) * 100
+    target_sell_price = np.asarray(target_sell_price, dtype=np.int64)
+    b_fee, s_fee = fixed_fee(buy_fee), fixed_fee(sell_fee)
+
+    current_cost = round_div(current_shares * current_avg, AVG_SCALE, rounding.avg)
+    new_buy_value = new_shares * buy_price
+    total_shares = current_shares + new_shares
+    total_cost_basis = current_cost + new_buy_value + b_fee.fee(new_buy_value, rounding)
+
+    empty = total_shares == 0
+    divisor = np.where(empty, 1, total_shares)
+    new_avg = round_div(total_cost_basis * AVG_SCALE, divisor, rounding.avg)
+    bep = break_even_price(total_cost_basis, total_shares, s_fee, rounding)
+
+    total_sell_value = total_shares * target_sell_price
+    pnl_nominal = total_sell_value - s_fee.fee(total_sell_value, rounding) - total_cost_basis
+    has_cost = total_cost_basis > 0
+    pnl_percent = np.where(has_cost, round_div(pnl_nominal * 100 * PCT_SCALE, np.where(has_cost, total_cost_basis, 1), rounding.pct), 0)
+
+    return (
+        np.where(empty, 0, new_avg),
+        np.where(empty, 0, bep),
+        total_shares // 100,
+        np.where(empty, 0, pnl_nominal),
+        np.where(empty, 0, pnl_percent),
+    )
@@ -0,0 +1,281 @@
+import io
+import json
+import os
+import sys
+
+from calculations import calculate_bep
+from fixedpoint import AVG_SCALE, BROKER_ROUNDING, break_even_price, fixed_fee, format_fixed, round_div
+
+# Bytes read per chunk; memory use stays bounded by this regardless of file size
+CHUNK_SIZE = 1 << 20
+
+BUY_SIDES = {"B", "BUY", "BELI"}
+SELL_SIDES = {"S", "SELL", "JUAL"}
+
+
+# --- Running Position State ---
+def new_position():
+    return {"shares": 0, "avg": 0.0, "realized_pnl": 0.0, "fees": 0.0}
+
+
+def apply_trade(state, ticker, side, price, shares, buy_fee_pct, sell_fee_pct):
+    """
+    Replays one trade into the per-ticker running state.
+
+    Buys move the weighted average exactly like calculate_new_avg (the buy fee
+    is tracked separately, not folded into the average). Sells leave the
+    average unchanged and book realized PnL net of the buy fee on the cost and
+    the sell fee on the proceeds. Fees are percentages or fees.FeeSide
+    schedules; a schedule charges its minimum commission and tiers per trade
+    (and, like apply_trade_fixed, the buy fee of a sold portion on its cost).
+    """
+    pos = state.get(ticker)
+    if pos is None:
+        pos = state[ticker] = new_position()
+
+    if side in BUY_SIDES:
+        total_shares = pos["shares"] + shares
+        pos["avg"] = (pos["shares"] * pos["avg"] + shares * price) / total_shares
+        pos["shares"] = total_shares
+        try:
+            pos["fees"] += shares * price * buy_fee_pct / 100
+        except TypeError:
+            pos["fees"] += buy_fee_pct.fee(shares * price)
+    elif side in SELL_SIDES:
+        if shares > pos["shares"]:
+            raise ValueError(f"{ticker}: menjual {shares} lembar, padahal hanya memiliki {pos['shares']} lembar.")
+        try:
+            cost = shares * pos["avg"] * (1 + buy_fee_pct / 100)
+        except TypeError:
+            cost = shares * pos["avg"] + buy_fee_pct.fee(shares * pos["avg"])
+        try:
+            proceeds = shares * price * (1 - sell_fee_pct / 100)
+            sell_fee = shares * price * sell_fee_pct / 100
+        except TypeError:
+            sell_fee = sell_fee_pct.fee(shares * price)
+            proceeds = shares * price - sell_fee
+        pos["realized_pnl"] += proceeds - cost
+        pos["fees"] += sell_fee
+        pos["shares"] -= shares
+        if pos["shares"] == 0:
+            pos["avg"] = 0.0
+    else:
+        raise ValueError(f"{ticker}: sisi transaksi tidak dikenal: {side!r}")
+
+
+def apply_trade_fixed(state, ticker, side, price, shares, buy_fee, sell_fee, rounding=BROKER_ROUNDING):
+    """
+    Integer-rupiah counterpart of apply_trade (see fixedpoint), with the same semantics.
+
+    The position keeps its fee-exclusive cost in rupiah instead of a float
+    average. A sell removes the proportional cost (rounded) plus the buy fee on
+    that cost, and books the proceeds net of the actual rounded sell fee.
+    """
+    pos = state.get(ticker)
+    if pos is None:
+        pos = state[ticker] = {"shares": 0, "cost": 0, "realized_pnl": 0, "fees": 0}
+    if price != int(price):
+        raise ValueError(f"{ticker}: harga {price} bukan rupiah bulat.")
+    value = int(price) * shares
+
+    if side in BUY_SIDES:
+        pos["shares"] += shares
+        pos["cost"] += value
+        pos["fees"] += int(fixed_fee(buy_fee).fee(value, rounding))
+    elif side in SELL_SIDES:
+        if shares > pos["shares"]:
+            raise ValueError(f"{ticker}: menjual {shares} lembar, padahal hanya memiliki {pos['shares']} lembar.")
+        removed = int(round_div(pos["cost"] * shares, pos["shares"], rounding.avg))
+        sell_fee_paid = int(fixed_fee(sell_fee).fee(value, rounding))
+        pos["realized_pnl"] += value - sell_fee_paid - removed - int(fixed_fee(buy_fee).fee(removed, rounding))
+        pos["fees"] += sell_fee_paid
+        pos["shares"] -= shares
+        pos["cost"] -= removed
+    else:
+        raise ValueError(f"{ticker}: sisi transaksi tidak dikenal: {side!r}")
+
+
+def portfolio_snapshot(state, buy_fee_pct, sell_fee_pct):
+    """Per-ticker rows with lots, average, fee-inclusive BEP (as calculate_bep) and realized PnL."""
+    rows = []
+    for ticker in sorted(state):
+        pos = state[ticker]
+        bep = calculate_bep(pos["avg"], pos["shares"] / 100, buy_fee_pct, sell_fee_pct)
+        rows.append({
+            "ticker": ticker,
+            "lots": pos["shares"] // 100,
+            "shares": pos["shares"],
+            "avg": pos["avg"],
+            "bep": bep,
+            "realized_pnl": pos["realized_pnl"],
+            "fees": pos["fees"],
+        })
+    return rows
+
+
+def portfolio_snapshot_fixed(state, buy_fee, sell_fee, rounding=BROKER_ROUNDING):
+    """Rows like portfolio_snapshot for a fixed-point state: avg and bep scaled by AVG_SCALE, money in rupiah."""
+    rows = []
+    for ticker in sorted(state):
+        pos = state[ticker]
+        shares = pos["shares"]
+        avg = bep = 0
+        if shares:
+            avg = int(round_div(pos["cost"] * AVG_SCALE, shares, rounding.avg))
+            cost_with_fee = pos["cost"] + int(fixed_fee(buy_fee).fee(pos["cost"], rounding))
+            bep = int(break_even_price(cost_with_fee, shares, sell_fee, rounding))
+        rows.append({
+            "ticker": ticker,
+            "lots": shares // 100,
+            "shares": shares,
+            "avg": avg,
+            "bep": bep,
+            "realized_pnl": pos["realized_pnl"],
+            "fees": pos["fees"],
+        })
+    return rows
+
+
+# --- Streaming Reader ---
+def parse_header(line):
+    """Maps the required columns to their positions; lots may be given as lots or shares."""
+    columns = [c.strip().lower() for c in line.split(",")]
+    index = {name: i for i, name in enumerate(columns)}
+    missing = [name for name in ("ticker", "side", "price") if name not in index]
+    if missing or ("lots" not in index and "shares" not in index):
+        raise ValueError(f"Kolom wajib tidak ditemukan: {', '.join(missing) or 'lots/shares'}")
+    return index
+
+
+def iter_chunks(stream, offset=0, chunk_size=CHUNK_SIZE, follow=False):
+    """
+    Yields (lines, end_offset) for complete lines read from a binary stream.
+
+    `end_offset` is the byte position just after the last complete line of the
+    chunk, so it can be stored as a checkpoint. A last line without a newline
+    is yielded at end of file, unless `follow` is set (the file is still being
+    appended to): then it is held back until it is terminated.
+    """
+    stream.seek(offset)
+    pending = b""
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            if pending and not follow:
+                yield pending.decode("utf-8").splitlines(), offset + len(pending)
+            return
+        data = pending + data
+        cut = data.rfind(b"\n") + 1
+        pending = data[cut:]
+        if cut:
+            offset += cut
+            yield data[:cut].decode("utf-8").splitlines(), offset
+
+
+def iter_trades(stream, header, offset, chunk_size=CHUNK_SIZE, follow=False):
+    """Generator of (ticker, side, price, shares, end_offset) parsed from the ledger body."""
+    i_ticker, i_side, i_price = header["ticker"], header["side"], header["price"]
+    i_qty = header.get("shares", header.get("lots"))
+    qty_scale = 1 if "shares" in header else 100
+    for lines, end_offset in iter_chunks(stream, offset, chunk_size, follow):
+        for line in lines:
+            if not line.strip():
+                continue
+            fields = line.split(",")
+            yield (
+                fields[i_ticker].strip().upper(),
+                fields[i_side].strip().upper(),
+                float(fields[i_price]),
+                int(float(fields[i_qty])) * qty_scale,
+                end_offset,
+            )
+
+
+def replay_ledger(stream, buy_fee_pct, sell_fee_pct, checkpoint=None, chunk_size=CHUNK_SIZE, fixed=False, follow=False):
+    """
+    Replays a CSV trade ledger from a binary stream in constant memory.
+
+    With a checkpoint (as returned by a previous call) only rows appended since
+    then are read. Returns a new checkpoint holding the per-ticker state and the
+    byte offset reached; pass it to portfolio_snapshot via checkpoint["positions"]
+    (portfolio_snapshot_fixed when replayed with fixed=True, which keeps the
+    state in integer rupiah with apply_trade_fixed).
+
+    Set `follow` when the file may still be growing and the checkpoint will be
+    resumed: an unterminated last row is then left unread (checkpoint
+    ["unread_bytes"] counts it) instead of being replayed half-written.
+    """
+    if checkpoint is None:
+        stream.seek(0)
+        header_line = stream.readline()
+        checkpoint = {"header": header_line.decode("utf-8").strip(), "offset": len(header_line), "rows": 0, "positions": {}, "fixed": fixed}
+    else:
+        checkpoint = json.loads(json.dumps(checkpoint))
+        if checkpoint.get("fixed", False) != fixed:
+            raise ValueError("Checkpoint dibuat dengan mode perhitungan (float/fixed-point) yang berbeda.")
+        stream.seek(0, io.SEEK_END)
+        if stream.tell() < checkpoint["offset"]:
+            raise ValueError("File ledger lebih pendek dari checkpoint; file telah diganti, bukan ditambah.")
+
+    header = parse_header(checkpoint["header"])
+    state = checkpoint["positions"]
+    rows = checkpoint["rows"]
+    apply = apply_trade_fixed if fixed else apply_trade
+    for ticker, side, price, shares, end_offset in iter_trades(stream, header, checkpoint["offset"], chunk_size, follow):
+        apply(state, ticker, side, price, shares, buy_fee_pct, sell_fee_pct)
+        rows += 1
+        checkpoint["offset"] = end_offset
+
+    checkpoint["rows"] = rows
+    stream.seek(0, io.SEEK_END)
+    checkpoint["unread_bytes"] = max(stream.tell() - checkpoint["offset"], 0)
+    return checkpoint
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    # Write then rename so an interrupted save never leaves a corrupt checkpoint
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a broker trade ledger into a portfolio snapshot.")
+    parser.add_argument("ledger", help="CSV with columns ticker, side, price and lots (or shares)")
+    parser.add_argument("--checkpoint", help="JSON checkpoint to resume from and update")
+    parser.add_argument("--buy-fee", type=float, default=0.15, help="Biaya beli (%%)")
+    parser.add_argument("--sell-fee", type=float, default=0.25, help="Biaya jual (%%)")
+    parser.add_argument("--fixed", action="store_true", help="Hitung dalam rupiah bulat (fixed-point), cocok dengan laporan broker")
+    args = parser.parse_args()
+
+    checkpoint = load_checkpoint(args.checkpoint) if args.checkpoint else None
+    with open(args.ledger, "rb") as f:
+        # With a checkpoint the ledger may still be growing, so a row without its newline yet is left for the next run
+        checkpoint = replay_ledger(f, args.buy_fee, args.sell_fee, checkpoint, fixed=args.fixed, follow=bool(args.checkpoint))
+    if args.checkpoint:
+        save_checkpoint(args.checkpoint, checkpoint)
+    if checkpoint["unread_bytes"]:
+        print(f"Peringatan: {checkpoint['unread_bytes']} byte di akhir file belum dibaca (baris tanpa akhir baris).", file=sys.stderr)
+
+    writer = sys.stdout
+    writer.write("ticker,lots,avg,bep,realized_pnl\n")
+    if args.fixed:
+        for row in portfolio_snapshot_fixed(checkpoint["positions"], args.buy_fee, args.sell_fee):
+            writer.write(f"{row['ticker']},{row['lots']},{format_fixed(row['avg'])},{format_fixed(row['bep'])},{row['realized_pnl']}\n")
+        return
+    for row in portfolio_snapshot(checkpoint["positions"], args.buy_fee, args.sell_fee):
+        writer.write(f"{row['ticker']},{row['lots']},{row['avg']:.2f},{row['bep']:.2f},{row['realized_pnl']:.0f}\n")
+
+
+if __name__ == "__main__":
+    main()
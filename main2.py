@@ -1,24 +1,17 @@
 import streamlit as st
 
-def calculate_new_avg(avg_price, current_price, current_lots, buy_lots):
-  
-    total_shares_value = (current_lots * avg_price * 100) + (buy_lots * current_price * 100)
-    total_lots = current_lots + buy_lots
-    new_avg = total_shares_value / (total_lots * 100)
-    return new_avg
+from calculations import calculate_lots_for_budget, calculate_new_avg, calculate_profit
+from profiling import debug_panel, instrument, start_rerun
 
-def calculate_lots_for_budget(budget, stock_price):
-
-    return budget // (stock_price * 100)
-
-def calculate_profit(target_price, avg_price, total_lots):
-   
-    return (target_price - avg_price) * total_lots * 100
+# Mengukur waktu setiap calculate_* jika STOCKCALC_PROFILE diset
+instrument(globals())
 
 def main():
+    rerun = start_rerun("main2")
     st.set_page_config(layout="centered") 
     st.title("Kalkulator Averaging Saham")
     st.markdown("---")
+    rerun.lap("header")
 
 
     st.subheader("Pilih jenis kalkulasi:")
@@ -28,6 +21,7 @@ def main():
     )
 
     st.markdown("---")
+    rerun.lap("menu")
 
     if calculation_type == "Hitung Harga Rata-rata Baru":
         st.subheader("📈 Hitung Harga Rata-rata Baru Saham")
@@ -43,6 +37,7 @@ def main():
                 new_avg = calculate_new_avg(avg_price, current_price, current_lots, buy_lots)
                 st.success(f"Harga rata-rata baru Anda adalah: **Rp {new_avg:,.2f}** per lembar")
                 st.info(f"Total lot Anda setelah pembelian: **{current_lots + buy_lots} lot**")
+        rerun.lap("new_avg")
 
     elif calculation_type == "Hitung Lot untuk Anggaran":
         st.subheader("💰 Hitung Jumlah Lot yang Bisa Dibeli")
@@ -63,6 +58,7 @@ def main():
                     st.info(f"Total biaya pembelian **{possible_lots} lot** adalah **IDR {(possible_lots * cost_per_lot):,.0f}**.")
                 else:
                     st.warning("Anggaran Anda tidak cukup untuk membeli 1 lot saham.")
+        rerun.lap("budget")
 
     elif calculation_type == "Hitung Potensi Keuntungan":
         st.subheader("💸 Hitung Potensi Keuntungan")
@@ -77,6 +73,10 @@ def main():
                 profit = calculate_profit(target_price, avg_price, total_lots)
                 st.success(f"Potensi keuntungan Anda jika harga mencapai **Rp {target_price}** adalah: **IDR {profit:,.0f}**")
                 st.info(f"Keuntungan per lembar saham: **IDR {target_price - avg_price:,.0f}**")
+        rerun.lap("profit")
+
+    rerun.end()
+    debug_panel(rerun)
 
 
 if __name__ == "__main__":
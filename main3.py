@@ -1,57 +1,26 @@
 import streamlit as st
 
+from calculations import (
+    calculate_bep,
+    calculate_lots_for_budget,
+    calculate_new_avg,
+    calculate_percentage_change,
+    calculate_profit,
+)
+from columnar import export_buttons, scenario_table, sweep_batches, table_batches
+from profiling import debug_panel, instrument, start_rerun
+from sweep import grid_slice, heatmap_chart, scenario_grid
+
+# Mengukur waktu setiap calculate_* jika STOCKCALC_PROFILE diset
+instrument(globals())
 
-# --- Existing Functions ---
-def calculate_new_avg(avg_price, current_price, current_lots, buy_lots):
-    """Calculates the new average price after buying additional lots."""
-    total_shares_value = (current_lots * avg_price * 100) + (buy_lots * current_price * 100)
-    total_lots = current_lots + buy_lots
-    if total_lots == 0:
-        return 0
-    new_avg = total_shares_value / (total_lots * 100)
-    return new_avg
-
-def calculate_lots_for_budget(budget, stock_price):
-    """Calculates how many lots can be bought with a given budget."""
-    if stock_price == 0:
-        return 0
-    return budget // (stock_price * 100) # Integer division for whole lots
-
-def calculate_profit(target_price, avg_price, total_lots):
-    """Calculates potential profit based on target sell price."""
-    return (target_price - avg_price) * total_lots * 100
-
-def calculate_percentage_change(current_avg_price, current_market_price):
-    """Calculates the percentage upside or downside."""
-    if current_avg_price == 0:
-        return 0
-    percentage = ((current_market_price - current_avg_price) / current_avg_price) * 100
-    return percentage
-
-# --- New Functions ---
-def calculate_bep(avg_price, total_lots, buy_fee_percentage, sell_fee_percentage):
-    """
-    Calculates the Break-Even Price (BEP) including buy and sell transaction fees.
-    Assumes avg_price is your *current* average price per share.
-    """
-    if total_lots == 0:
-        return 0
-
-    buy_fee_decimal = buy_fee_percentage / 100
-    sell_fee_decimal = sell_fee_percentage / 100
-
-    effective_avg_cost_per_share = avg_price * (1 + buy_fee_decimal)
-
-    if (1 - sell_fee_decimal) <= 0: # Avoid division by zero or negative/zero denominator
-        return float('inf') # Indicates impossible to break even with such high fees
-
-    bep = effective_avg_cost_per_share / (1 - sell_fee_decimal)
-    return bep
 
 def main():
+    rerun = start_rerun("main3")
     st.set_page_config(layout="centered")
     st.title("Kalkulator Averaging Saham")
     st.markdown("---")
+    rerun.lap("header")
 
     # --- Reorganized Menu ---
     st.sidebar.header("Pilih Alat Kalkulasi")
@@ -61,6 +30,7 @@ def main():
     )
 
     st.markdown("---")
+    rerun.lap("menu")
 
     if tool_category == "Analisis Posisi Saat Ini":
         st.subheader("📊 Analisis Posisi Saham Anda Saat Ini")
@@ -106,6 +76,7 @@ def main():
                     new_avg = calculate_new_avg(avg_price, current_price, current_lots, buy_lots)
                     st.success(f"Harga rata-rata baru Anda adalah: **Rp {new_avg:,.2f}** per lembar")
                     st.info(f"Total lot Anda setelah pembelian: **{current_lots + buy_lots} lot**")
+            rerun.lap("new_avg")
 
         elif analysis_type == "Hitung Harga Break-Even (BEP)":
             st.markdown("### 🎯 Hitung Harga Break-Even (BEP) Saham")
@@ -133,6 +104,7 @@ def main():
                         st.info(f"Anda perlu menjual di atas harga rata-rata Anda karena adanya biaya transaksi. Selisih: Rp {(bep_price - avg_price_bep):,.2f}")
                     else:
                         st.info("BEP Anda kurang dari atau sama dengan harga rata-rata Anda (ini mengindikasikan perhitungan mungkin tidak mempertimbangkan semua biaya atau biaya sangat rendah).")
+            rerun.lap("bep")
 
     elif tool_category == "Simulasi & Perencanaan Pembelian":
         st.subheader("🧪 Simulasi & Perencanaan Pembelian Saham")
@@ -166,6 +138,7 @@ def main():
                 help="Berapa banyak lot tambahan yang ingin Anda beli pada harga simulasi.",
                 key="add_lots_sim"
             )
+            rerun.lap("simulation_inputs")
 
             # Automatically run simulation as inputs are changed, no button needed for dynamic updates
             if current_avg_price_sim > 0 and current_lots_sim > 0 and simulated_buy_price > 0:
@@ -198,6 +171,36 @@ def main():
                     st.metric(label="Persentase Perubahan Harga", value=f"{percentage_change_at_sim_price:,.2f}%", delta="Rugi", delta_color="inverse")
                 else:
                     st.metric(label="Persentase Perubahan Harga", value=f"{percentage_change_at_sim_price:,.2f}%", delta="Impas")
+
+                st.caption("Ekspor hasil simulasi:")
+                sim_inputs = {"current_avg": current_avg_price_sim, "current_lots": current_lots_sim, "buy_price": simulated_buy_price, "buy_lots": additional_lots_sim}
+                sim_results = {"new_avg": new_avg_simulated, "total_lots": total_new_lots, "pnl_nominal": profit_loss_at_sim_price, "change_percent": percentage_change_at_sim_price}
+                export_buttons(lambda: table_batches(scenario_table(sim_inputs, sim_results)), "simulasi", "exp_sim")
+
+                st.markdown("---")
+                rerun.lap("simulation_results")
+                if st.checkbox("Tampilkan Sweep Skenario (Heatmap)", key="sweep_sim"):
+                    st.caption("Semua kombinasi harga beli × lot tambahan × harga jual dihitung sekaligus dan disimpan.")
+                    sweep_width = st.number_input("Rentang Harga (± Rp)", min_value=1, step=1, value=max(1, simulated_buy_price // 5), key="sweep_width")
+                    sweep_step = st.number_input("Langkah Harga", min_value=1, step=1, value=max(1, sweep_width // 20), key="sweep_step")
+                    sweep_max_lots = st.number_input("Lot Tambahan Maksimal", min_value=1, step=1, value=max(10, additional_lots_sim), key="sweep_max_lots")
+
+                    price_range = (max(1, simulated_buy_price - sweep_width), simulated_buy_price + sweep_width, sweep_step)
+                    try:
+                        grid = scenario_grid(float(current_avg_price_sim), int(current_lots_sim), price_range, (0, sweep_max_lots, 1), price_range)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        st.caption(f"{grid['pnl'].size:,} skenario dihitung. Ekspor semua skenario:")
+                        export_buttons(lambda: sweep_batches(grid), "sweep_skenario", "exp_sweep")
+
+                        # Slicing the cached grid does not recompute any scenario
+                        pnl_view = grid_slice(grid, buy_lots=additional_lots_sim)
+                        st.write(f"**Potensi Keuntungan/Kerugian dengan {additional_lots_sim} lot tambahan (Harga Beli × Harga Jual)**")
+                        st.altair_chart(heatmap_chart(pnl_view["target_price"], pnl_view["buy_price"], pnl_view["pnl"], "Harga Jual", "Harga Beli", "PnL", domain_mid=0), use_container_width=True)
+                        st.write("**Harga Rata-rata Baru (Harga Beli × Lot Tambahan)**")
+                        st.altair_chart(heatmap_chart(grid["buy_lots"], grid["buy_price"], grid["new_avg"], "Lot Tambahan", "Harga Beli", "Rata-rata Baru", scheme="blues"), use_container_width=True)
+                rerun.lap("sweep")
             else:
                 st.warning("Mohon masukkan harga rata-rata dan jumlah lot Anda saat ini, serta harga simulasi pembelian.")
 
@@ -221,6 +224,10 @@ def main():
                         st.info(f"Total biaya pembelian **{possible_lots} lot** adalah **IDR {(possible_lots * cost_per_lot):,.0f}**.")
                     else:
                         st.warning("Anggaran Anda tidak cukup untuk membeli 1 lot saham.")
+            rerun.lap("budget")
+
+    rerun.end()
+    debug_panel(rerun)
 
 
 if __name__ == "__main__":
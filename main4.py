@@ -1,38 +1,165 @@
+import io
+import os
+
+import altair as alt
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+from allocator import allocate_budget
+from columnar import CHART_POINTS, export_buttons, lttb, scenario_table, sweep_batches, table_batches, table_from_columns
+from calculations import (
+    calculate_bep,
+    calculate_cost_basis,
+    calculate_fee_avg,
+    calculate_fee_bep,
+    calculate_net_pnl,
+)
+from fees import load_fee_schedules
+from fixedpoint import AVG_SCALE, PCT_SCALE, calculate_metrics_fixed
+from ledger import portfolio_snapshot, portfolio_snapshot_fixed, replay_ledger
+from marktomarket import MarkToMarket, positions_from_columns, replay_ticks, socket_ticks
+from montecarlo import PERCENTILES, simulate_averaging
+from profiling import debug_panel, instrument, start_rerun
+from rerun_cache import DerivedCache
+from service import client_from_env
+from solvers import PRICE_LADDER, cheapest_buy_ladder, ladder_levels, max_price_for_bep, min_lots_to_reach_avg
+from store import PortfolioStore
+from sweep import MAX_GRID_CELLS, grid_cells, grid_slice, heatmap_chart, scenario_grid
+
+# Mengukur waktu setiap calculate_* jika STOCKCALC_PROFILE diset
+instrument(globals())
+
+MTM_TABLE_ROWS = 50
+
 # --- Fungsi Logika ---
-def calculate_metrics(current_avg, current_lots, buy_price, buy_lots, buy_fee_pct, sell_fee_pct, target_sell_price):
-    """Menghitung metrik investasi dengan memperhitungkan biaya transaksi."""
-    b_fee = buy_fee_pct / 100
-    s_fee = sell_fee_pct / 100
+@st.cache_data(max_entries=4, show_spinner="Memproses riwayat transaksi...")
+def replay_uploaded_ledger(data, buy_fee, sell_fee, fixed=False):
+    """Memutar ulang file riwayat transaksi dan mengembalikan ringkasan per saham."""
+    checkpoint = replay_ledger(io.BytesIO(data), buy_fee, sell_fee, fixed=fixed)
+    if not fixed:
+        return portfolio_snapshot(checkpoint["positions"], buy_fee, sell_fee)
+    rows = portfolio_snapshot_fixed(checkpoint["positions"], buy_fee, sell_fee)
+    for row in rows:
+        row["avg"], row["bep"] = row["avg"] / AVG_SCALE, row["bep"] / AVG_SCALE
+    return rows
+
+def fixed_point_metrics(curr_avg, curr_lots, buy_p, buy_l, buy_fee, sell_fee, target_s):
+    """Metrik dalam rupiah bulat (fixed-point), dikonversi ke angka biasa untuk ditampilkan."""
+    new_avg, bep, total_lots, pnl_nom, pnl_pct = calculate_metrics_fixed(curr_avg * AVG_SCALE, curr_lots, buy_p, buy_l, buy_fee, sell_fee, target_s)
+    return int(new_avg) / AVG_SCALE, int(bep) / AVG_SCALE, int(total_lots), int(pnl_nom), int(pnl_pct) / PCT_SCALE
 
-    current_shares = current_lots * 100
-    current_cost = current_shares * current_avg
+def lot_cost_with_fee(price, buy_fee, lots=1):
+    """Harga pembelian sejumlah lot termasuk fee beli (persen atau jadwal fee)."""
+    return calculate_cost_basis(0, 0, price, lots, buy_fee)[1]
 
-    new_shares = buy_lots * 100
-    new_buy_value = new_shares * buy_price
-    new_buy_cost_total = new_buy_value * (1 + b_fee)
+def max_lots_for_budget(budget, price, buy_fee):
+    """Jumlah lot maksimal yang terbeli dengan modal tertentu (fee minimum & berjenjang ikut dihitung)."""
+    if price <= 0:
+        return 0
+    low, high = 0, int(budget // (price * 100))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if lot_cost_with_fee(price, buy_fee, mid) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return low
 
-    total_shares = current_shares + new_shares
-    total_cost_basis = current_cost + new_buy_cost_total
+def pnl_curve(total_shares, total_cost_basis, broker, low, high):
+    """
+    PnL bersih (seperti calculate_net_pnl) di setiap harga jual valid (fraksi BEI) antara low dan high.
+    Mengembalikan (kolom, indeks titik grafik hasil LTTB).
+    """
+    targets = PRICE_LADDER[(PRICE_LADDER >= low) & (PRICE_LADDER <= high)]
+    sell_value = total_shares * targets
+    schedules = load_fee_schedules()
+    pnl = sell_value - schedules.apply(schedules.index[broker], "jual", sell_value) - total_cost_basis
+    pnl_pct = pnl / total_cost_basis * 100 if total_cost_basis > 0 else np.zeros_like(pnl)
+    for values in (targets, pnl, pnl_pct):
+        values.setflags(write=False)
+    return {"target_price": targets, "pnl": pnl, "pnl_pct": pnl_pct}, lttb(targets, pnl, CHART_POINTS)
 
-    if total_shares == 0: return 0, 0, 0, 0, 0
+def stored_position_beps(columns, buy_fee, sell_fee):
+    """BEP tiap posisi tersimpan (calculate_bep per baris; hasilnya di-cache di database)."""
+    return np.array([calculate_bep(avg, shares / 100, buy_fee, sell_fee) for avg, shares in zip(columns["avg"].tolist(), columns["shares"].tolist())])
 
-    new_avg = total_cost_basis / total_shares
-    bep = new_avg / (1 - s_fee)
+def stored_positions_table(store, account, version, buy_fee, sell_fee):
+    """Tabel posisi tersimpan satu akun; `version` (store.version()) hanya untuk kunci cache."""
+    stored = store.load_positions(account)
+    stored_bep = store.metric_column(
+        account, "bep", {"beli": buy_fee, "jual": sell_fee}, stored,
+        lambda columns: stored_position_beps(columns, buy_fee, sell_fee),
+    )
+    return pd.DataFrame({
+        "Kode": stored["ticker"],
+        "Lot": stored["shares"] // 100,
+        "Avg": stored["avg"],
+        "BEP": stored_bep,
+        "Realisasi (Rp)": stored["realized_pnl"],
+    })
+
+def live_mtm_panel(live):
+    """Tampilan mark-to-market dari snapshot terakhir mesin; dijalankan ulang otomatis selama `live`."""
+    engine = st.session_state.get("mtm_engine")
+    snap = engine.latest if engine is not None else None
+    if engine is not None and engine.error is not None:
+        st.error(f"Aliran kuotasi terhenti: {engine.error}")
+    if snap is None:
+        st.caption("Menunggu kuotasi pertama...")
+        return
+    if live and not snap["running"]:
+        # Aliran selesai: muat ulang sekali agar penyegaran otomatis berhenti
+        st.rerun()
+
+    lv_col1, lv_col2, lv_col3, lv_col4 = st.columns(4)
+    lv_col1.metric("Nilai Pasar", f"Rp {snap['market_value']:,.0f}", help=f"{snap['quoted']:,} dari {len(snap['ticker']):,} posisi sudah mendapat kuotasi.")
+    pnl_pct = snap["total_pnl"] / snap["total_cost"] * 100 if snap["total_cost"] > 0 else 0
+    lv_col2.metric("PnL Belum Terealisasi", f"Rp {snap['total_pnl']:,.0f}", delta=f"{pnl_pct:.2f}%", delta_color="normal" if snap["total_pnl"] >= 0 else "inverse")
+    lv_col3.metric("Tick Diproses", f"{snap['ticks']:,}", help=f"{snap['ignored']:,} tick untuk saham yang tidak dimiliki diabaikan.")
+    lv_col4.metric("Tick/detik", f"{snap['ticks_per_sec']:,.0f}")
 
-    total_sell_value = total_shares * target_sell_price
-    net_sell_proceeds = total_sell_value * (1 - s_fee)
-    pnl_nominal = net_sell_proceeds - total_cost_basis
-    pnl_percent = (pnl_nominal / total_cost_basis) * 100 if total_cost_basis > 0 else 0
+    # Hanya posisi dengan PnL terburuk yang dikirim ke browser
+    order = np.argsort(np.where(np.isnan(snap["price"]), np.inf, snap["pnl"]))[:MTM_TABLE_ROWS]
+    st.dataframe(pd.DataFrame({
+        "Akun": [snap["account"][i] for i in order],
+        "Kode": [snap["ticker"][i] for i in order],
+        "Lot": snap["shares"][order] // 100,
+        "Avg": snap["avg"][order],
+        "Harga": snap["price"][order],
+        "Perubahan (%)": snap["change_pct"][order],
+        "PnL (Rp)": snap["pnl"][order],
+        "Jarak ke BEP (Rp)": snap["bep_gap"][order],
+        "Jarak ke BEP (%)": snap["bep_gap_pct"][order],
+        "Riwayat": [engine.history(snap["ticker"][i]) for i in order],
+    }), hide_index=True, use_container_width=True, column_config={"Riwayat": st.column_config.LineChartColumn("Riwayat Harga")})
+    st.caption(f"{min(MTM_TABLE_ROWS, len(order)):,} posisi dengan PnL terendah ditampilkan.")
 
-    return new_avg, bep, total_shares // 100, pnl_nominal, pnl_percent
+def apply_ledger_position(position):
+    """Callback: isi Avg & Lot di sidebar dari hasil impor."""
+    st.session_state.curr_avg = int(round(position["avg"]))
+    st.session_state.curr_lots = int(position["lots"])
 
 def main():
+    rerun = start_rerun("main4")
     st.set_page_config(page_title="Stock Master Pro", layout="wide")
 
     if 'buy_lots' not in st.session_state:
         st.session_state.buy_lots = 0
+    if 'curr_avg' not in st.session_state:
+        st.session_state.curr_avg = 1000
+    if 'curr_lots' not in st.session_state:
+        st.session_state.curr_lots = 10
+    if 'derived_cache' not in st.session_state:
+        st.session_state.derived_cache = DerivedCache()
+    if 'portfolio_store' not in st.session_state:
+        # Posisi, transaksi & metrik tersimpan permanen (SQLite); satu koneksi per sesi
+        st.session_state.portfolio_store = PortfolioStore()
+    if 'calc_client' not in st.session_state:
+        # Layanan kalkulasi bersama (service.py) jika STOCKCALC_SERVICE_URL diset; satu koneksi per sesi
+        st.session_state.calc_client = client_from_env()
+    # Nilai turunan hanya dihitung ulang jika inputnya berubah sejak rerun sebelumnya
+    cache = st.session_state.derived_cache
 
     # --- HEADER & INSTRUKSI ---
     st.title("📈 Stock Calculator")
@@ -45,35 +172,58 @@ def main():
     """)
 
     st.markdown("---")
+    rerun.lap("header")
 
     # --- SIDEBAR: DATA PORTOFOLIO & SEKURITAS ---
     with st.sidebar:
         st.header("📂 Portfolio")
-        curr_avg = st.number_input("Harga Rata-rata (Avg)", min_value=0, step=1, value=1000)
-        curr_lots = st.number_input("Jumlah Lot", min_value=0, step=1, value=10)
+        curr_avg = st.number_input("Harga Rata-rata (Avg)", min_value=0, step=1, key="curr_avg")
+        curr_lots = st.number_input("Jumlah Lot", min_value=0, step=1, key="curr_lots")
 
         st.header("🏢 Pilih Sekuritas")
-        # Kamus data sekuritas
-        broker_data = {
-            "XL (Stockbit)": {"beli": 0.15, "jual": 0.25},
-            "XC (Ajaib)": {"beli": 0.10, "jual": 0.20},
-            "PD (IPOT)": {"beli": 0.19, "jual": 0.29},
-            "CP (Valbury)": {"beli": 0.15, "jual": 0.25},
-            "SQ (BCA)": {"beli": 0.18, "jual": 0.28},
-            "YP (Mirae Asset)": {"beli": 0.15, "jual": 0.25},
-            "YB (Yakin Bertumbuh)": {"beli": 0.15, "jual": 0.25}
-        }
+        # Jadwal fee sekuritas (brokers.json), dimuat & dikompilasi sekali per proses
+        fee_schedules = load_fee_schedules()
 
-        selected_broker = st.selectbox("Sekuritas Anda:", list(broker_data.keys()))
+        selected_broker = st.selectbox("Sekuritas Anda:", fee_schedules.names)
 
         # Ambil fee berdasarkan pilihan
-        fee_buy = broker_data[selected_broker]["beli"]
-        fee_sell = broker_data[selected_broker]["jual"]
+        buy_schedule = fee_schedules.side(selected_broker, "beli")
+        sell_schedule = fee_schedules.side(selected_broker, "jual")
+        fee_buy = buy_schedule.flat_pct
+        fee_sell = sell_schedule.flat_pct
 
         # Tampilkan fee (hanya baca)
-        st.write(f"Fee Beli: **{fee_buy}%**")
-        st.write(f"Fee Jual: **{fee_sell}%**")
+        st.write(f"Fee Beli: **{fee_buy:g}%**")
+        st.write(f"Fee Jual: **{fee_sell:g}%**")
+        for label, schedule in (("beli", buy_schedule), ("jual", sell_schedule)):
+            if schedule.min_commission > 0 or len(schedule.tiers_pct) > 1:
+                st.caption(f"Fee {label} berjenjang / minimum komisi Rp {schedule.min_commission:,.0f} ikut diperhitungkan.")
         st.caption("Fee di atas sudah otomatis digunakan dalam perhitungan.")
+        fixed_mode = st.toggle("Presisi Rupiah Bulat", key="fixed_mode", help="Hitung dengan bilangan bulat & pembulatan per transaksi seperti laporan broker (fee dibulatkan ke rupiah, rata-rata ke 2 desimal).")
+
+        st.header("📥 Impor Riwayat Transaksi")
+        ledger_file = st.file_uploader("File CSV (ticker, side, price, lots)", type="csv")
+        ledger_rows = []
+        if ledger_file is not None:
+            try:
+                if fixed_mode:
+                    ledger_rows = replay_uploaded_ledger(ledger_file.getvalue(), buy_schedule, sell_schedule, fixed=True)
+                else:
+                    ledger_rows = replay_uploaded_ledger(ledger_file.getvalue(), buy_schedule, sell_schedule)
+            except ValueError as e:
+                st.error(f"Gagal membaca riwayat transaksi: {e}")
+            if ledger_rows:
+                ledger_pick = st.selectbox("Saham:", ledger_rows, format_func=lambda r: f"{r['ticker']} ({r['lots']} lot)")
+                st.caption(f"Avg: Rp {ledger_pick['avg']:,.2f} | BEP: Rp {ledger_pick['bep']:,.2f} | Realisasi: Rp {ledger_pick['realized_pnl']:,.0f}")
+                st.button("Gunakan Posisi Ini", on_click=apply_ledger_position, args=(ledger_pick,), use_container_width=True)
+
+        st.header("🗄️ Portofolio Tersimpan")
+        store = st.session_state.portfolio_store
+        store_account = st.text_input("Akun", value="default", key="store_account").strip() or "default"
+        if ledger_rows and st.button(f"Simpan Hasil Impor ke Akun '{store_account}'", use_container_width=True):
+            store.upsert_positions(store_account, ledger_rows)
+            st.success(f"{len(ledger_rows)} posisi disimpan.")
+    rerun.lap("sidebar")
 
     # --- AREA 1: KALKULATOR BUDGET ---
     with st.expander("💰 Kalkulator Budget", expanded=False):
@@ -83,8 +233,8 @@ def main():
         with bg_col2:
             est_price = st.number_input("Asumsi Harga Beli", min_value=1, value=1000)
 
-        price_per_lot_with_fee = (est_price * 100) * (1 + (fee_buy/100))
-        max_lots_possible = int(my_budget // price_per_lot_with_fee) if price_per_lot_with_fee > 0 else 0
+        price_per_lot_with_fee = cache.get("price_per_lot_with_fee", lot_cost_with_fee, est_price, buy_schedule)
+        max_lots_possible = cache.get("max_lots_possible", max_lots_for_budget, my_budget, est_price, buy_schedule)
 
         with bg_col3:
             st.write("")
@@ -92,7 +242,28 @@ def main():
                 st.session_state.buy_lots = max_lots_possible
 
         if my_budget > 0:
-            st.success(f"Maksimal Pembelian: **{max_lots_possible} Lot** (Total Biaya: Rp {max_lots_possible * price_per_lot_with_fee:,.0f})")
+            st.success(f"Maksimal Pembelian: **{max_lots_possible} Lot** (Total Biaya: Rp {lot_cost_with_fee(est_price, buy_schedule, max_lots_possible):,.0f})")
+
+        st.markdown("---")
+        st.write("**Alokasi Multi-Saham** — bagi modal ke beberapa saham (dalam lot utuh) sesuai bobot target.")
+        alloc_input = st.data_editor(
+            pd.DataFrame({"Kode": ["BBCA", "TLKM", "ASII"], "Harga": [9000, 3000, 5000], "Bobot (%)": [40.0, 30.0, 30.0]}),
+            num_rows="dynamic",
+            use_container_width=True,
+            key="alloc_table",
+        ).dropna()
+        alloc_input = alloc_input[(alloc_input["Harga"] > 0) & (alloc_input["Bobot (%)"] > 0)]
+
+        if my_budget > 0 and len(alloc_input) > 0:
+            alloc_lots, alloc_cost = allocate_budget(
+                my_budget, alloc_input["Harga"].tolist(), alloc_input["Bobot (%)"].tolist(), buy_fee_pct=buy_schedule
+            )
+            alloc_result = alloc_input.assign(Lot=alloc_lots)
+            alloc_result["Biaya (Rp)"] = [lot_cost_with_fee(price, buy_schedule, lots) for price, lots in zip(alloc_result["Harga"], alloc_result["Lot"])]
+            alloc_result["Bobot Aktual (%)"] = alloc_result["Biaya (Rp)"] / alloc_cost * 100 if alloc_cost > 0 else 0.0
+            st.dataframe(alloc_result, hide_index=True, use_container_width=True)
+            st.info(f"Total Biaya: **Rp {alloc_cost:,.0f}** | Sisa Modal: **Rp {my_budget - alloc_cost:,.0f}**")
+    rerun.lap("budget")
 
     # --- AREA 2: SIMULASI & HASIL ---
     col_left, col_right = st.columns([1, 1], gap="large")
@@ -104,11 +275,31 @@ def main():
 
         st.markdown("---")
         target_s = st.number_input("Target Harga Jual", min_value=1, step=1, value=buy_p + 100)
+    rerun.lap("simulation_inputs")
 
     # Hitung metrik akhir
-    new_avg, bep, total_lots, pnl_nom, pnl_pct = calculate_metrics(
-        curr_avg, curr_lots, buy_p, buy_l, fee_buy, fee_sell, target_s
-    )
+    calc_client = st.session_state.calc_client
+    flat_fees = all(s.min_commission == 0 and len(s.tiers_pct) == 1 for s in (buy_schedule, sell_schedule))
+    service_metrics = None
+    if calc_client is not None and flat_fees and not fixed_mode:
+        try:
+            service_metrics = cache.get("metrics_service", calc_client.calculate_metrics, curr_avg, curr_lots, buy_p, buy_l, fee_buy, fee_sell, target_s)
+        except (OSError, ValueError) as e:
+            st.caption(f"Layanan kalkulasi tidak tersedia ({e}); dihitung lokal.")
+    elif calc_client is not None and not flat_fees:
+        st.caption("Layanan kalkulasi hanya mendukung fee persen tetap; fee berjenjang / minimum komisi dihitung lokal.")
+
+    if fixed_mode:
+        new_avg, bep, total_lots, pnl_nom, pnl_pct = cache.get("metrics_fixed", fixed_point_metrics, curr_avg, curr_lots, buy_p, buy_l, buy_schedule, sell_schedule, target_s)
+    elif service_metrics is not None:
+        new_avg, bep, total_lots, pnl_nom, pnl_pct = service_metrics
+    else:
+        total_shares, total_cost_basis = cache.get("cost_basis", calculate_cost_basis, curr_avg, curr_lots, buy_p, buy_l, buy_schedule)
+        new_avg = cache.get("new_avg", calculate_fee_avg, total_shares, total_cost_basis)
+        bep = cache.get("bep", calculate_fee_bep, new_avg, sell_schedule, total_shares) if total_shares else 0
+        pnl_nom, pnl_pct = cache.get("pnl", calculate_net_pnl, total_shares, total_cost_basis, sell_schedule, target_s)
+        total_lots = total_shares // 100
+    rerun.lap("metrics")
 
     with col_right:
         st.subheader("📊 Hasil Analisis")
@@ -124,5 +315,266 @@ def main():
 
         st.info(f"Total Kepemilikan: **{total_lots} Lot** | Estimasi Nilai: **Rp {total_lots * new_avg * 100:,.0f}**")
 
+        scenario_inputs = {
+            "current_avg": curr_avg, "current_lots": curr_lots, "buy_price": buy_p, "buy_lots": buy_l,
+            "broker": selected_broker, "target_sell_price": target_s, "fixed_point": fixed_mode,
+        }
+        scenario_results = (new_avg, bep, total_lots, pnl_nom, pnl_pct)
+        st.caption("Ekspor skenario ini:")
+        export_buttons(lambda: table_batches(scenario_table(scenario_inputs, scenario_results)), "skenario", "exp_scenario")
+    rerun.lap("results")
+
+    with st.expander("📉 Kurva PnL vs Harga Jual", expanded=False):
+        st.caption(f"PnL bersih di setiap harga jual sesuai fraksi BEI. Grafik memakai paling banyak {CHART_POINTS} titik terpilih (LTTB); ekspor berisi semua titik.")
+        if st.toggle("Tampilkan kurva", key="cv_show"):
+            cv_col1, cv_col2 = st.columns(2)
+            cv_low = cv_col1.number_input("Harga Jual dari", min_value=1, step=1, value=max(1, int(new_avg * 0.5)), key="cv_low")
+            cv_high = cv_col2.number_input("Harga Jual sampai", min_value=1, step=1, value=max(2, int(new_avg * 3)), key="cv_high")
+            curve_shares, curve_cost = calculate_cost_basis(curr_avg, curr_lots, buy_p, buy_l, buy_schedule)
+            curve, keep = cache.get("pnl_curve", pnl_curve, curve_shares, curve_cost, selected_broker, cv_low, cv_high)
+            if curve_shares == 0 or len(curve["target_price"]) == 0:
+                st.info("Isi posisi atau rencana beli, dan rentang harga jual yang valid.")
+            else:
+                chart_data = pd.DataFrame({"Harga Jual": curve["target_price"][keep], "PnL (Rp)": curve["pnl"][keep]})
+                marks = pd.DataFrame({"Harga": [bep, target_s], "Keterangan": ["BEP", "Target"]})
+                st.altair_chart(
+                    alt.Chart(chart_data).mark_line().encode(x="Harga Jual:Q", y="PnL (Rp):Q")
+                    + alt.Chart(marks).mark_rule(strokeDash=[4, 4]).encode(x="Harga:Q", color="Keterangan:N"),
+                    use_container_width=True,
+                )
+                st.caption(f"{len(curve['target_price']):,} harga dihitung, {len(keep):,} titik dikirim ke grafik.")
+                export_buttons(lambda: table_batches(table_from_columns(curve)), "kurva_pnl", "exp_curve")
+    rerun.lap("pnl_curve")
+
+    if ledger_rows:
+        with st.expander(f"📋 Portofolio Hasil Impor ({len(ledger_rows)} saham)", expanded=False):
+            portfolio_table = pd.DataFrame([
+                {
+                    "Kode": row["ticker"],
+                    "Lot": row["lots"],
+                    "Avg": row["avg"],
+                    "BEP": cache.get("position_bep", calculate_bep, row["avg"], row["shares"] / 100, buy_schedule, sell_schedule),
+                    "Realisasi (Rp)": row["realized_pnl"],
+                }
+                for row in ledger_rows
+            ])
+            st.dataframe(portfolio_table, hide_index=True, use_container_width=True)
+            export_buttons(lambda: table_batches(table_from_columns(portfolio_table)), "portofolio_impor", "exp_imported")
+    rerun.lap("imported_portfolio")
+
+    with st.expander(f"🗄️ Portofolio Tersimpan: {store_account} ({store.count_positions(store_account):,} saham)", expanded=False):
+        if st.toggle("Muat semua posisi", key="store_show"):
+            # Dibaca ulang dari database hanya jika isinya berubah sejak rerun sebelumnya
+            stored_table = cache.get("stored_table", stored_positions_table, store, store_account, store.version(), buy_schedule, sell_schedule)
+            st.dataframe(stored_table, hide_index=True, use_container_width=True)
+            export_buttons(lambda: table_batches(table_from_columns(stored_table)), f"portofolio_{store_account}", "exp_stored")
+
+        st_col1, st_col2 = st.columns(2)
+        with st_col1:
+            st.write("**Ambil Posisi**")
+            pick_ticker = st.text_input("Kode Saham", key="store_pick").strip().upper()
+            picked = store.position(store_account, pick_ticker) if pick_ticker else None
+            if picked and picked["shares"]:
+                st.caption(f"{picked['shares'] // 100} lot @ Rp {picked['avg']:,.2f} | Realisasi: Rp {picked['realized_pnl']:,.0f}")
+                st.button("Gunakan Posisi Ini", key="store_use", on_click=apply_ledger_position, args=({"avg": picked["avg"], "lots": picked["shares"] // 100},))
+            elif pick_ticker:
+                st.caption(f"Tidak ada posisi {pick_ticker} di akun ini.")
+        with st_col2:
+            with st.form("store_trade", clear_on_submit=True):
+                st.write("**Catat Transaksi**")
+                tr_ticker = st.text_input("Kode Saham")
+                tr_side = st.radio("Sisi", ["Beli", "Jual"], horizontal=True)
+                tr_price = st.number_input("Harga", min_value=1, step=1, value=1000)
+                tr_lots = st.number_input("Lot", min_value=1, step=1, value=1)
+                if st.form_submit_button("Catat") and tr_ticker.strip():
+                    try:
+                        pos = store.record_trade(store_account, tr_ticker, "B" if tr_side == "Beli" else "S", tr_price, tr_lots * 100, buy_schedule, sell_schedule)
+                        st.success(f"{tr_ticker.upper()}: {pos['shares'] // 100} lot @ Rp {pos['avg']:,.2f}")
+                    except ValueError as e:
+                        st.error(str(e))
+    rerun.lap("stored_portfolio")
+
+    # --- AREA 3: MARK-TO-MARKET LIVE ---
+    with st.expander("📡 Mark-to-Market Live", expanded=False):
+        st.caption("Nilai portofolio diperbarui dari aliran kuotasi (file replay atau socket). Tampilan disegarkan berkala, bukan setiap tick.")
+        mtm_sources = [f"Portofolio Tersimpan ({store_account})"] + (["Hasil Impor"] if ledger_rows else [])
+        mtm_col1, mtm_col2, mtm_col3 = st.columns(3)
+        with mtm_col1:
+            mtm_positions = st.radio("Posisi", mtm_sources, key="mtm_positions")
+        with mtm_col2:
+            mtm_feed = st.radio("Sumber Kuotasi", ["File Replay", "Socket"], horizontal=True, key="mtm_feed")
+            if mtm_feed == "File Replay":
+                mtm_file = st.file_uploader("CSV (time, ticker, price)", type="csv", key="mtm_file")
+            else:
+                mtm_url = st.text_input("Alamat", value="tcp://127.0.0.1:8770", key="mtm_url")
+        with mtm_col3:
+            mtm_speed = st.number_input("Kecepatan Replay (x)", min_value=0.0, step=1.0, value=1.0, key="mtm_speed", help="Kelipatan waktu pada kolom time. 0 = secepatnya.")
+            mtm_interval = st.number_input("Interval Tampilan (detik)", min_value=0.2, step=0.1, value=1.0, key="mtm_interval")
+
+        engine = st.session_state.get("mtm_engine")
+        run_col1, run_col2 = st.columns(2)
+        if run_col1.button("▶️ Mulai", use_container_width=True, key="mtm_start"):
+            if mtm_positions == "Hasil Impor":
+                positions = ledger_rows
+            else:
+                positions = positions_from_columns(store.load_positions(store_account), store_account)
+            if mtm_feed == "File Replay" and mtm_file is None:
+                st.warning("Unggah file replay kuotasi terlebih dahulu.")
+            elif not positions:
+                st.warning("Tidak ada posisi terbuka untuk dinilai.")
+            else:
+                if engine is not None:
+                    engine.stop()
+                engine = st.session_state.mtm_engine = MarkToMarket(positions, buy_schedule, sell_schedule, interval=mtm_interval)
+                if mtm_feed == "File Replay":
+                    engine.start(replay_ticks(mtm_file.getvalue(), speed=mtm_speed or None, stop=engine.stop_event))
+                else:
+                    engine.start(socket_ticks(mtm_url, stop=engine.stop_event))
+        if run_col2.button("⏹️ Berhenti", use_container_width=True, key="mtm_stop", disabled=engine is None or not engine.running):
+            engine.stop()
+
+        if engine is not None:
+            st.fragment(live_mtm_panel, run_every=engine.interval if engine.running else None)(engine.running)
+    rerun.lap("mark_to_market")
+
+    # --- AREA 4: TARGET RATA-RATA & BEP ---
+    with st.expander("🎯 Cari Lot & Harga untuk Target", expanded=False):
+        st.caption("Kebalikan dari simulasi: tentukan targetnya, hitung lot atau harga yang dibutuhkan. Harga mengikuti fraksi harga BEI.")
+        tg_col1, tg_col2 = st.columns(2)
+        with tg_col1:
+            target_avg = st.number_input("Target Rata-rata", min_value=1, step=1, value=max(1, int(curr_avg * 0.95)), key="tg_avg")
+            need_lots = min_lots_to_reach_avg(curr_avg, curr_lots, buy_p, target_avg, buy_schedule)
+            if curr_lots == 0:
+                st.info("Isi Jumlah Lot posisi Anda untuk mencari lot yang dibutuhkan.")
+            elif need_lots is None:
+                st.warning(f"Rata-rata Rp {target_avg:,} tidak tercapai dengan membeli di Rp {buy_p:,} (harga beli + fee harus di bawah target).")
+            else:
+                st.metric(f"Lot Minimal di Rp {buy_p:,}", f"{need_lots:,} Lot", help="Fee beli ikut dihitung dalam rata-rata.")
+                st.caption(f"Modal: Rp {lot_cost_with_fee(buy_p, buy_schedule, need_lots):,.0f}")
+        with tg_col2:
+            target_bep = st.number_input("Target BEP", min_value=1, step=1, value=max(1, int(curr_avg)), key="tg_bep")
+            max_price = max_price_for_bep(curr_avg, curr_lots, buy_l, target_bep, buy_schedule, sell_schedule)
+            if buy_l == 0:
+                st.info("Isi Jumlah Lot Baru untuk mencari harga beli maksimal.")
+            elif max_price is None:
+                st.warning(f"BEP Rp {target_bep:,} tidak tercapai dengan {buy_l} lot di harga berapa pun.")
+            else:
+                st.metric(f"Harga Beli Maksimal ({buy_l} Lot)", f"Rp {max_price:,.0f}", help="Harga tertinggi sesuai fraksi BEI yang masih membuat BEP ≤ target.")
+
+        st.write("**Tangga Beli Termurah**")
+        ld_col1, ld_col2, ld_col3 = st.columns(3)
+        rungs = ld_col1.number_input("Jumlah Level", min_value=1, max_value=20, step=1, value=4, key="ld_rungs")
+        rung_step = ld_col2.number_input("Jarak Antar Level (%)", min_value=0.5, step=0.5, value=5.0, key="ld_step")
+        rung_lots = ld_col3.number_input("Lot Maks per Level", min_value=1, step=1, value=max(1, curr_lots), key="ld_lots")
+        plan = cheapest_buy_ladder(curr_avg, curr_lots, target_avg, ladder_levels(buy_p, rungs, rung_step, rung_lots), buy_schedule)
+        if plan is None:
+            st.warning("Level yang tersedia belum cukup untuk mencapai target rata-rata. Tambah level, jarak, atau lot per level.")
+        elif not plan[0]:
+            st.success("Rata-rata sudah di bawah target.")
+        else:
+            orders, plan_cost = plan
+            st.dataframe(pd.DataFrame(orders, columns=["Harga", "Lot"]), hide_index=True, use_container_width=True)
+            st.caption(f"Total modal: Rp {plan_cost:,.0f} untuk {sum(lots for _, lots in orders):,} lot.")
+    rerun.lap("targets")
+
+    # --- AREA 5: SWEEP SKENARIO ---
+    with st.expander("🗺️ Sweep Skenario (Heatmap)", expanded=False):
+        st.caption("Hitung semua kombinasi harga beli × lot tambahan × target jual sekaligus. Hasil disimpan, jadi menggeser slider tidak menghitung ulang.")
+        sw_col1, sw_col2, sw_col3 = st.columns(3)
+        with sw_col1:
+            p_start = st.number_input("Harga Beli dari", min_value=1, step=1, value=max(1, buy_p - 200), key="sw_p_start")
+            p_stop = st.number_input("Harga Beli sampai", min_value=1, step=1, value=buy_p + 200, key="sw_p_stop")
+            p_step = st.number_input("Langkah Harga Beli", min_value=1, step=1, value=10, key="sw_p_step")
+        with sw_col2:
+            l_start = st.number_input("Lot Tambahan dari", min_value=0, step=1, value=0, key="sw_l_start")
+            l_stop = st.number_input("Lot Tambahan sampai", min_value=0, step=1, value=max(10, curr_lots), key="sw_l_stop")
+            l_step = st.number_input("Langkah Lot", min_value=1, step=1, value=1, key="sw_l_step")
+        with sw_col3:
+            t_start = st.number_input("Target Jual dari", min_value=1, step=1, value=max(1, target_s - 200), key="sw_t_start")
+            t_stop = st.number_input("Target Jual sampai", min_value=1, step=1, value=target_s + 200, key="sw_t_stop")
+            t_step = st.number_input("Langkah Target", min_value=1, step=1, value=10, key="sw_t_step")
+
+        sweep_ranges = ((p_start, p_stop, p_step), (l_start, l_stop, l_step), (t_start, t_stop, t_step))
+        st.caption(f"{grid_cells(*sweep_ranges):,} skenario (maksimal {MAX_GRID_CELLS:,}).")
+        grid = None
+        # Built only on request, like the PnL curve: a large grid costs seconds and tens of MB per rerun
+        if st.toggle("Hitung sweep", key="sw_show"):
+            try:
+                grid = scenario_grid(float(curr_avg), int(curr_lots), *sweep_ranges, buy_schedule, sell_schedule)
+            except ValueError as e:
+                st.error(str(e))
+
+        if grid is not None:
+            export_buttons(lambda: sweep_batches(grid), "sweep_skenario", "exp_sweep")
+
+            lots_axis = grid["buy_lots"]
+            sel_lots = st.select_slider("Lot Tambahan untuk Heatmap PnL", options=lots_axis.tolist(), value=int(lots_axis[0]), key="sw_sel_lots")
+            pnl_view = grid_slice(grid, buy_lots=sel_lots)
+
+            hm_col1, hm_col2 = st.columns(2)
+            with hm_col1:
+                st.write("**PnL Bersih (Harga Beli × Target Jual)**")
+                st.altair_chart(heatmap_chart(pnl_view["target_price"], pnl_view["buy_price"], pnl_view["pnl"], "Target Jual", "Harga Beli", "PnL", domain_mid=0), use_container_width=True)
+            with hm_col2:
+                st.write("**BEP (Harga Beli × Lot Tambahan)**")
+                st.altair_chart(heatmap_chart(grid["buy_lots"], grid["buy_price"], grid["bep"], "Lot Tambahan", "Harga Beli", "BEP", scheme="blues"), use_container_width=True)
+    rerun.lap("sweep")
+
+    # --- AREA 6: SIMULASI MONTE CARLO ---
+    with st.expander("🎲 Simulasi Monte Carlo Averaging", expanded=False):
+        st.caption("Ribuan kemungkinan jalur harga (GBM) untuk melihat sebaran hasil rencana averaging, bukan satu angka saja.")
+        mc_col1, mc_col2, mc_col3 = st.columns(3)
+        with mc_col1:
+            mc_price = st.number_input("Harga Pasar Saat Ini", min_value=1, step=1, value=buy_p, key="mc_price")
+            mc_buy_lots = st.number_input("Lot per Averaging", min_value=0, step=1, value=max(1, buy_l), key="mc_buy_lots")
+            mc_drop = st.number_input("Beli Lagi Setiap Turun (%)", min_value=0.5, max_value=90.0, step=0.5, value=10.0, key="mc_drop")
+        with mc_col2:
+            mc_max_buys = st.number_input("Maksimal Averaging", min_value=0, step=1, value=3, key="mc_max_buys")
+            mc_days = st.number_input("Horizon (hari bursa)", min_value=1, step=1, value=250, key="mc_days")
+            mc_paths = st.number_input("Jumlah Jalur", min_value=1000, max_value=2_000_000, step=10000, value=50000, key="mc_paths")
+        with mc_col3:
+            mc_mu = st.number_input("Drift Tahunan (%)", step=1.0, value=5.0, key="mc_mu")
+            mc_sigma = st.number_input("Volatilitas Tahunan (%)", min_value=1.0, step=1.0, value=35.0, key="mc_sigma")
+            mc_workers = st.number_input("Jumlah Proses", min_value=1, max_value=os.cpu_count() or 1, step=1, value=1, key="mc_workers")
+
+        if st.button("Jalankan Simulasi", type="primary", key="mc_run"):
+            mc_plan = {
+                "current_avg": curr_avg, "current_lots": curr_lots, "start_price": mc_price,
+                "buy_lots": mc_buy_lots, "drop_pct": mc_drop, "max_buys": mc_max_buys, "days": mc_days,
+                "mu": mc_mu / 100, "sigma": mc_sigma / 100, "buy_fee_pct": buy_schedule, "sell_fee_pct": sell_schedule,
+            }
+            with st.spinner("Menjalankan simulasi..."):
+                mc = simulate_averaging(mc_plan, int(mc_paths), seed=0, workers=int(mc_workers))
+
+            mc_res1, mc_res2, mc_res3 = st.columns(3)
+            mc_res1.metric("Peluang Menyentuh BEP", f"{mc['prob_reach_bep'] * 100:.1f}%")
+            mc_res2.metric("Peluang Untung di Akhir", f"{mc['prob_profit_at_end'] * 100:.1f}%")
+            mc_res3.metric("Rata-rata Modal Tambahan", f"Rp {mc['mean_capital_deployed']:,.0f}")
+
+            st.dataframe(pd.DataFrame({
+                "Persentil": [f"P{p}" for p in PERCENTILES],
+                "PnL (Rp)": [mc["pnl_percentiles"][p] for p in PERCENTILES],
+                "PnL (%)": [mc["pnl_pct_percentiles"][p] for p in PERCENTILES],
+            }), hide_index=True, use_container_width=True)
+
+            # Kirim histogram yang sudah dikelompokkan, bukan jutaan titik mentah
+            counts, edges = np.histogram(mc["pnl"], bins=60)
+            hist = pd.DataFrame({"PnL": (edges[:-1] + edges[1:]) / 2, "Jumlah Jalur": counts})
+            st.altair_chart(alt.Chart(hist).mark_bar().encode(x=alt.X("PnL:Q", title="PnL (Rp)"), y="Jumlah Jalur:Q"), use_container_width=True)
+    rerun.lap("montecarlo")
+
+    # --- DEBUG: STATISTIK CACHE ---
+    with st.expander("🧮 Statistik Cache Perhitungan", expanded=False):
+        st.caption(f"{len(cache)} nilai tersimpan. Hit = dipakai ulang dari rerun sebelumnya, Miss = dihitung ulang.")
+        st.dataframe(
+            pd.DataFrame(cache.stats(), columns=["Nilai", "Hit", "Miss", "Hit Rate"]),
+            hide_index=True, use_container_width=True,
+        )
+    cache.end_rerun()
+    rerun.lap("cache_stats")
+    rerun.end()
+    debug_panel(rerun)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
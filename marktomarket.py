@@ -0,0 +1,388 @@
+"""
+Live mark-to-market of a portfolio from a stream of quote ticks.
+
+A tick is (ticker, price). For every position holding the ticker the engine
+updates, in constant time:
+    pnl, pnl_pct       unrealized PnL if sold at the tick price, net of fees
+                       (calculate_net_pnl on the fee-inclusive cost basis)
+    change_pct         price vs. average, as calculate_percentage_change
+    bep_gap, bep_gap_pct  price minus BEP (calculate_bep), in rupiah and percent
+and appends the price to the ticker's ring buffer of recent history (for
+sparklines). Ticks for tickers that are not held are counted and dropped.
+
+Consumers do not see every tick: while running, the engine publishes an
+immutable snapshot at most once per `interval` seconds (engine.latest), which
+the main4 dashboard re-renders on a timer.
+
+Tick sources:
+    replay_ticks(file)    CSV "time,ticker,price" (time in seconds, optional),
+                          as fast as possible or paced at `speed` x real time
+    socket_ticks(url)     "ticker,price" lines from tcp://host:port or unix:///path
+    serve_ticks(...)      stand-in quote server that streams a replay file
+
+    python marktomarket.py generate ticks.csv --tickers 5000 --ticks 1000000
+    python marktomarket.py serve ticks.csv --port 8770 --speed 1
+"""
+import argparse
+import csv
+import io
+import os
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import numpy as np
+
+from calculations import calculate_bep, calculate_net_pnl, calculate_percentage_change
+
+DEFAULT_QUOTE_PORT = 8770
+HISTORY_LEN = 120
+PUBLISH_INTERVAL = 0.5
+
+
+# --- Engine ---
+class MarkToMarket:
+    """
+    Positions are dicts with ticker, shares, avg (fee-exclusive, as the ledger
+    and the store keep it) and optionally account, so several accounts may
+    hold the same ticker. Fees are percentages or fees.FeeSide schedules.
+    """
+
+    def __init__(self, positions, buy_fee_pct, sell_fee_pct, history=HISTORY_LEN, interval=PUBLISH_INTERVAL):
+        self.sell_fee_pct = sell_fee_pct
+        self.interval = interval
+        self.accounts, self.tickers, self.shares, self.avg, self.cost, self.bep = [], [], [], [], [], []
+        # ticker -> (position indices, ring buffer of recent prices)
+        self._book = {}
+        for pos in positions:
+            shares = int(pos["shares"])
+            if shares <= 0:
+                continue
+            ticker, avg = pos["ticker"], float(pos["avg"])
+            value = shares * avg
+            try:
+                cost = value * (1 + buy_fee_pct / 100)
+            except TypeError:
+                cost = value + buy_fee_pct.fee(value)
+            indices, _ = self._book.setdefault(ticker, ([], deque(maxlen=history)))
+            indices.append(len(self.tickers))
+            self.accounts.append(pos.get("account", ""))
+            self.tickers.append(ticker)
+            self.shares.append(shares)
+            self.avg.append(avg)
+            self.cost.append(cost)
+            self.bep.append(calculate_bep(avg, shares / 100, buy_fee_pct, sell_fee_pct))
+
+        n = len(self.tickers)
+        self.price = [float("nan")] * n
+        self.pnl = [0.0] * n
+        self.pnl_pct = [0.0] * n
+        self.change_pct = [0.0] * n
+        self.bep_gap = [0.0] * n
+        self.bep_gap_pct = [0.0] * n
+        self.ticks = 0
+        self.ignored = 0
+        self.latest = None
+        self.error = None
+        # Set by stop(); pass it to replay_ticks/socket_ticks so a waiting source returns promptly
+        self.stop_event = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def on_tick(self, ticker, price):
+        """Applies one quote; work is proportional to the positions holding `ticker` (normally one)."""
+        self.ticks += 1
+        entry = self._book.get(ticker)
+        if entry is None:
+            self.ignored += 1
+            return
+        indices, history = entry
+        history.append(price)
+        for i in indices:
+            self.price[i] = price
+            self.pnl[i], self.pnl_pct[i] = calculate_net_pnl(self.shares[i], self.cost[i], self.sell_fee_pct, price)
+            self.change_pct[i] = calculate_percentage_change(self.avg[i], price)
+            self.bep_gap[i] = price - self.bep[i]
+            self.bep_gap_pct[i] = calculate_percentage_change(self.bep[i], price)
+
+    def history(self, ticker):
+        """Recent prices of `ticker`, oldest first (safe to call while the engine runs)."""
+        entry = self._book.get(ticker)
+        return list(entry[1]) if entry else []
+
+    def snapshot(self):
+        """Copy of the current state: per-position NumPy columns plus portfolio totals."""
+        price = np.array(self.price)
+        shares = np.array(self.shares, dtype=np.int64)
+        pnl = np.array(self.pnl)
+        cost = np.array(self.cost)
+        quoted = ~np.isnan(price)
+        return {
+            "time": time.time(),
+            "ticks": self.ticks,
+            "ignored": self.ignored,
+            "account": list(self.accounts),
+            "ticker": list(self.tickers),
+            "shares": shares,
+            "avg": np.array(self.avg),
+            "bep": np.array(self.bep),
+            "price": price,
+            "pnl": pnl,
+            "pnl_pct": np.array(self.pnl_pct),
+            "change_pct": np.array(self.change_pct),
+            "bep_gap": np.array(self.bep_gap),
+            "bep_gap_pct": np.array(self.bep_gap_pct),
+            "quoted": int(quoted.sum()),
+            "market_value": float((shares * price)[quoted].sum()),
+            "total_pnl": float(pnl[quoted].sum()),
+            "total_cost": float(cost[quoted].sum()),
+        }
+
+    def publish(self):
+        snap = self.snapshot()
+        previous = self.latest
+        if previous is not None and snap["time"] > previous["time"]:
+            snap["ticks_per_sec"] = (snap["ticks"] - previous["ticks"]) / (snap["time"] - previous["time"])
+        else:
+            snap["ticks_per_sec"] = 0.0
+        snap["running"] = self.running
+        self.latest = snap
+
+    def run(self, ticks):
+        """Consumes an iterable of (ticker, price) until it ends or stop() is called, publishing every `interval`."""
+        on_tick = self.on_tick
+        stopped = self.stop_event.is_set
+        clock = time.perf_counter
+        next_publish = clock() + self.interval
+        # Checked on every tick: a slow feed (socket, paced replay) may deliver only a few ticks per interval
+        for ticker, price in ticks:
+            on_tick(ticker, price)
+            if stopped():
+                break
+            now = clock()
+            if now >= next_publish:
+                self.publish()
+                next_publish = now + self.interval
+        self.publish()
+
+    # --- Background Thread ---
+    def start(self, ticks):
+        """Runs the engine on a daemon thread; read engine.latest for throttled snapshots."""
+        self.stop_event.clear()
+        self._thread = threading.Thread(target=self._run_safely, args=(ticks,), daemon=True, name="mark-to-market")
+        self._thread.start()
+
+    def _run_safely(self, ticks):
+        try:
+            self.run(ticks)
+        except Exception as e:
+            # Anything that kills the feed thread is surfaced through engine.error
+            self.error = e
+        finally:
+            self._thread = None
+            self.latest = {**(self.latest or self.snapshot()), "running": False}
+
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+
+def positions_from_columns(columns, account=""):
+    """Position dicts from store.load_positions columns."""
+    return [
+        {"account": account, "ticker": ticker, "shares": shares, "avg": avg}
+        for ticker, shares, avg in zip(columns["ticker"], columns["shares"].tolist(), columns["avg"].tolist())
+    ]
+
+
+# --- Tick Sources ---
+def replay_ticks(source, speed=None, stop=None):
+    """
+    (ticker, price) from a CSV replay (path, text file or bytes) with a ticker
+    and price column and an optional time column in seconds. With `speed`,
+    ticks are paced at speed x the recorded time; otherwise as fast as read.
+    Blank rows and rows too short to hold every column are skipped.
+    """
+    if isinstance(source, bytes):
+        source = io.StringIO(source.decode())
+    elif isinstance(source, (str, os.PathLike)):
+        source = open(source, newline="")
+    with source:
+        reader = csv.reader(source)
+        header = [name.strip().lower() for name in next(reader, [])]
+        try:
+            t_col = header.index("time") if "time" in header else None
+            k_col, p_col = header.index("ticker"), header.index("price")
+        except ValueError:
+            raise ValueError("file replay harus memiliki kolom ticker dan price") from None
+        if speed and t_col is not None:
+            yield from _paced(reader, t_col, k_col, p_col, speed, stop)
+            return
+        width = max(k_col, p_col) + 1
+        for row in reader:
+            if len(row) >= width:
+                yield row[k_col], float(row[p_col])
+
+
+def _paced(reader, t_col, k_col, p_col, speed, stop):
+    start = first = None
+    width = max(t_col, k_col, p_col) + 1
+    for row in reader:
+        if len(row) < width:
+            continue
+        t = float(row[t_col])
+        if first is None:
+            first, start = t, time.perf_counter()
+        delay = start + (t - first) / speed - time.perf_counter()
+        if delay > 0:
+            if stop is None:
+                time.sleep(delay)
+            elif stop.wait(delay):
+                return
+        yield row[k_col], float(row[p_col])
+
+
+def quote_address(url):
+    """("unix", path) for unix:///path, otherwise ("tcp", (host, port))."""
+    parsed = urlparse(url if "://" in url else f"tcp://{url}")
+    if parsed.scheme == "unix":
+        return "unix", parsed.path
+    return "tcp", (parsed.hostname or "127.0.0.1", parsed.port or DEFAULT_QUOTE_PORT)
+
+
+def socket_ticks(url, timeout=10, stop=None):
+    """(ticker, price) from "ticker,price" lines sent by a quote server, until it closes the connection or `stop` is set."""
+    kind, address = quote_address(url)
+    if kind == "unix":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(address)
+    else:
+        sock = socket.create_connection(address, timeout=timeout)
+    # Short timeout so an idle feed still notices `stop`
+    sock.settimeout(0.2)
+    pending = b""
+    with sock:
+        while stop is None or not stop.is_set():
+            try:
+                chunk = sock.recv(1 << 16)
+            except socket.timeout:
+                continue
+            if not chunk:
+                break
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                ticker, _, price = line.partition(b",")
+                if price:
+                    yield ticker.decode(), float(price)
+
+
+def serve_ticks(path, url, speed=None, ready=None, stop=None):
+    """Stand-in quote server: streams the replay file to every client that connects, one thread per client."""
+    kind, address = quote_address(url)
+    if kind == "unix":
+        if os.path.exists(address):
+            os.unlink(address)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(address)
+    server.listen()
+    server.settimeout(0.2)
+    if ready is not None:
+        ready.set()
+
+    def stream(conn):
+        try:
+            with conn, conn.makefile("w", encoding="ascii", newline="\n", buffering=1 << 16) as out:
+                for ticker, price in replay_ticks(path, speed, stop):
+                    out.write(f"{ticker},{price:g}\n")
+                    if speed:
+                        out.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away
+            pass
+
+    with server:
+        while stop is None or not stop.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            threading.Thread(target=stream, args=(conn,), daemon=True).start()
+
+
+def generate_ticks(n_ticks, n_tickers, seed=0, rate=10_000):
+    """
+    Random-walk quotes on IDX tick sizes for T0000..T{n_tickers-1}:
+    (time, ticker, price) rows, `rate` ticks per second of recorded time.
+    """
+    from solvers import snap_price
+
+    rng = np.random.default_rng(seed)
+    base = snap_price(np.exp(rng.uniform(np.log(50), np.log(30000), n_tickers)))
+    which = rng.integers(0, n_tickers, n_ticks)
+    drift = rng.normal(0, 0.002, n_ticks)
+    prices = np.empty(n_ticks)
+    for k, (t, d) in enumerate(zip(which.tolist(), drift.tolist())):
+        base[t] = max(50.0, base[t] * (1 + d))
+        prices[k] = base[t]
+    prices = snap_price(prices)
+    times = np.arange(n_ticks) / rate
+    return [(t, f"T{k:04d}", p) for t, k, p in zip(times.tolist(), which.tolist(), prices.tolist())]
+
+
+def write_ticks(rows, out):
+    out.write("time,ticker,price\n")
+    for t, ticker, price in rows:
+        out.write(f"{t:.6f},{ticker},{price:g}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mark-to-market live dari aliran kuotasi.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_gen = sub.add_parser("generate", help="Buat file replay kuotasi acak")
+    p_gen.add_argument("path")
+    p_gen.add_argument("--tickers", type=int, default=5_000)
+    p_gen.add_argument("--ticks", type=int, default=1_000_000)
+    p_gen.add_argument("--rate", type=int, default=10_000, help="Tick per detik pada kolom time")
+    p_gen.add_argument("--seed", type=int, default=0)
+
+    p_serve = sub.add_parser("serve", help="Server kuotasi tiruan yang memutar ulang file replay")
+    p_serve.add_argument("path")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_QUOTE_PORT)
+    p_serve.add_argument("--unix", help="Path Unix socket (menggantikan host/port)")
+    p_serve.add_argument("--speed", type=float, help="Kecepatan x waktu rekaman (default: secepatnya)")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        with open(args.path, "w") as out:
+            write_ticks(generate_ticks(args.ticks, args.tickers, args.seed, args.rate), out)
+        return 0
+
+    url = f"unix://{args.unix}" if args.unix else f"tcp://{args.host}:{args.port}"
+    print(f"Server kuotasi di {url}", file=sys.stderr)
+    try:
+        serve_ticks(args.path, url, args.speed)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Paths per work unit. Each chunk gets its own seed, so results depend only on
+# the seed and path count, never on how many workers share the chunks.
+CHUNK_PATHS = 50_000
+TRADING_DAYS = 250
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+# --- Return Models ---
+def load_returns(path, column="close"):
+    """Daily log returns from a local CSV of closing prices (for bootstrapping)."""
+    with open(path) as f:
+        header = [c.strip().lower() for c in f.readline().split(",")]
+    closes = np.loadtxt(path, delimiter=",", skiprows=1, usecols=header.index(column), dtype=np.float64)
+    return np.diff(np.log(closes))
+
+
+def draw_log_returns(rng, n_paths, mu, sigma, returns):
+    """One day of log returns for every path: GBM, or bootstrapped from `returns` when given."""
+    if returns is not None:
+        return rng.choice(returns, size=n_paths)
+    dt = 1 / TRADING_DAYS
+    return (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * rng.standard_normal(n_paths)
+
+
+# --- Simulation ---
+def simulate_chunk(seed, n_paths, plan):
+    """
+    Simulates one chunk of price paths under an averaging-down plan.
+
+    Every time the price closes `drop_pct` below the last buy price, `buy_lots`
+    more lots are bought (up to `max_buys` times). Cost basis, BEP and final PnL
+    follow calculate_metrics: buys carry the buy fee, the exit pays the sell fee.
+    Fees are percentages or fees.FeeSide schedules, charged per buy and on the exit.
+    Returns (final_pnl, final_pnl_pct, reached_bep, capital_deployed) arrays.
+    """
+    rng = np.random.default_rng(seed)
+    buy_fee, sell_fee = plan["buy_fee_pct"], plan["sell_fee_pct"]
+    try:
+        b_fee = buy_fee / 100
+        buy_cost = lambda value: value * (1 + b_fee)
+    except TypeError:
+        buy_cost = lambda value: value + buy_fee.fee_array(value)
+    try:
+        s_fee = sell_fee / 100
+        bep_of = lambda cost, shares: cost / shares / (1 - s_fee)
+        net_proceeds = lambda value: value * (1 - s_fee)
+    except TypeError:
+        bep_of = lambda cost, shares: sell_fee.gross_for_net_array(cost) / shares
+        net_proceeds = lambda value: value - sell_fee.fee_array(value)
+    drop = plan["drop_pct"] / 100
+    buy_shares = plan["buy_lots"] * 100
+    returns = plan.get("returns")
+
+    price = np.full(n_paths, float(plan["start_price"]))
+    shares = np.full(n_paths, plan["current_lots"] * 100, dtype=np.int64)
+    cost = shares * float(plan["current_avg"])
+    last_buy = price.copy()
+    n_buys = np.zeros(n_paths, dtype=np.int64)
+    deployed = np.zeros(n_paths)
+    reached = np.zeros(n_paths, dtype=bool)
+    # BEP only moves when a buy happens, so it is updated there instead of every day
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bep = np.where(shares > 0, bep_of(cost, shares), np.inf)
+
+    for _ in range(plan["days"]):
+        price *= np.exp(draw_log_returns(rng, n_paths, plan["mu"], plan["sigma"], returns))
+
+        buy = (price <= last_buy * (1 - drop)) & (n_buys < plan["max_buys"])
+        if buy_shares and buy.any():
+            spend = buy_cost(buy_shares * price[buy])
+            shares[buy] += buy_shares
+            cost[buy] += spend
+            deployed[buy] += spend
+            last_buy[buy] = price[buy]
+            n_buys[buy] += 1
+            bep[buy] = bep_of(cost[buy], shares[buy])
+
+        reached |= price >= bep
+
+    pnl = net_proceeds(shares * price) - cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl_pct = np.where(cost > 0, pnl / cost * 100, 0.0)
+    return pnl, pnl_pct, reached, deployed
+
+
+def _run_chunk(args):
+    return simulate_chunk(*args)
+
+
+def simulate_averaging(plan, n_paths, seed=0, workers=1, chunk_paths=CHUNK_PATHS):
+    """
+    Monte Carlo distribution of outcomes for an averaging-down plan.
+
+    `plan` holds current_avg, current_lots, start_price, buy_lots, drop_pct,
+    max_buys, days, mu, sigma, buy_fee_pct, sell_fee_pct and optionally
+    `returns` (an array of daily log returns to bootstrap instead of GBM).
+    Chunks run in a process pool when workers > 1.
+    """
+    sizes = [chunk_paths] * (n_paths // chunk_paths)
+    if n_paths % chunk_paths:
+        sizes.append(n_paths % chunk_paths)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(s, size, plan) for s, size in zip(seeds, sizes)]
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_chunk, jobs))
+    else:
+        results = [_run_chunk(job) for job in jobs]
+
+    pnl, pnl_pct, reached, deployed = (np.concatenate(parts) for parts in zip(*results))
+    return {
+        "paths": n_paths,
+        "pnl": pnl,
+        "pnl_percentiles": dict(zip(PERCENTILES, np.percentile(pnl, PERCENTILES))),
+        "pnl_pct_percentiles": dict(zip(PERCENTILES, np.percentile(pnl_pct, PERCENTILES))),
+        "mean_pnl": float(pnl.mean()),
+        "prob_reach_bep": float(reached.mean()),
+        "prob_profit_at_end": float((pnl > 0).mean()),
+        "mean_capital_deployed": float(deployed.mean()),
+    }
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of an averaging-down plan.")
+    parser.add_argument("--avg", type=float, default=1000, help="Harga rata-rata saat ini")
+    parser.add_argument("--lots", type=int, default=10, help="Jumlah lot saat ini")
+    parser.add_argument("--price", type=float, default=900, help="Harga pasar saat ini")
+    parser.add_argument("--buy-lots", type=int, default=10, help="Lot per pembelian averaging")
+    parser.add_argument("--drop", type=float, default=10, help="Beli lagi setiap turun X%% dari pembelian terakhir")
+    parser.add_argument("--max-buys", type=int, default=3)
+    parser.add_argument("--days", type=int, default=TRADING_DAYS)
+    parser.add_argument("--mu", type=float, default=0.05, help="Drift tahunan (GBM)")
+    parser.add_argument("--sigma", type=float, default=0.35, help="Volatilitas tahunan (GBM)")
+    parser.add_argument("--returns-file", help="CSV harga penutupan untuk bootstrap, bukan GBM")
+    parser.add_argument("--buy-fee", type=float, default=0.15)
+    parser.add_argument("--sell-fee", type=float, default=0.25)
+    parser.add_argument("--paths", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    plan = {
+        "current_avg": args.avg, "current_lots": args.lots, "start_price": args.price,
+        "buy_lots": args.buy_lots, "drop_pct": args.drop, "max_buys": args.max_buys, "days": args.days,
+        "mu": args.mu, "sigma": args.sigma, "buy_fee_pct": args.buy_fee, "sell_fee_pct": args.sell_fee,
+        "returns": load_returns(args.returns_file) if args.returns_file else None,
+    }
+    start = time.perf_counter()
+    result = simulate_averaging(plan, args.paths, seed=args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.paths:,} paths x {args.days} days in {elapsed:.2f} s ({args.workers} workers)")
+    for p, value in result["pnl_percentiles"].items():
+        print(f"  P{p:<3} PnL Rp {value:>15,.0f} ({result['pnl_pct_percentiles'][p]:+.2f}%)")
+    print(f"  Peluang menyentuh BEP: {result['prob_reach_bep'] * 100:.2f}%")
+    print(f"  Peluang untung di akhir: {result['prob_profit_at_end'] * 100:.2f}%")
+    print(f"  Rata-rata modal tambahan: Rp {result['mean_capital_deployed']:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Opt-in timing of the Streamlit apps: the sections of main2/main3/main4.main,
+every calculate_* call they make, and each rerun as a whole.
+
+Set STOCKCALC_PROFILE=1 to turn it on. Timings are aggregated into
+fixed-bucket histograms shared by all sessions of the process, shown in a
+debug panel at the bottom of each app and exportable as JSON or Prometheus
+text. When the variable is unset nothing is wrapped, start_rerun returns a
+shared no-op and the panel is not rendered, so the cost is one attribute call
+per section.
+
+    instrument(globals())        # after the imports: time every calculate_*
+    rerun = start_rerun("main4")
+    ...                          # sidebar widgets
+    rerun.lap("sidebar")         # time since the previous lap
+    ...
+    rerun.end()
+    debug_panel(rerun)
+"""
+import bisect
+import functools
+import json
+import os
+import threading
+from time import perf_counter
+
+ENV_VAR = "STOCKCALC_PROFILE"
+METRIC = "stockcalc_duration_seconds"
+# Bucket upper bounds in seconds: 1 us .. 10 s, 1-2.5-5 per decade (calculate_* calls take ~1 us)
+BUCKETS = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)) + (10.0,)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+# --- Histograms ---
+class Histogram:
+    """Counts per bucket (the last one is +Inf) plus sum, count and max, Prometheus style."""
+
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimate interpolated linearly inside the bucket, as Prometheus' histogram_quantile."""
+        if not self.count:
+            return float("nan")
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class Profiler:
+    """Histograms keyed by (app, kind, name); kind is "rerun", "section" or "call". Thread-safe."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, app, kind, name, seconds):
+        key = (app, kind, name)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def summary(self):
+        """One dict per series: labels, count, sum, mean, max, p50/p95/p99 and cumulative bucket counts."""
+        with self._lock:
+            items = sorted((key, hist.counts[:], hist.sum, hist.count, hist.max) for key, hist in self._histograms.items())
+        rows = []
+        for (app, kind, name), counts, total, count, peak in items:
+            hist = Histogram()
+            hist.counts, hist.sum, hist.count, hist.max = counts, total, count, peak
+            row = {"app": app, "kind": kind, "name": name, "count": count, "sum": total, "mean": total / count, "max": peak}
+            for q in QUANTILES:
+                row[f"p{round(q * 100)}"] = hist.quantile(q)
+            cumulative, row["buckets"] = 0, {}
+            for bound, n in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += n
+                row["buckets"][format_bound(bound)] = cumulative
+            rows.append(row)
+        return rows
+
+    def to_json(self):
+        return json.dumps({"unit": "seconds", "series": self.summary()}, indent=1)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (one histogram metric, labelled by app/kind/name)."""
+        lines = [
+            f"# HELP {METRIC} Wall time of app reruns, app sections and calculate_* calls.",
+            f"# TYPE {METRIC} histogram",
+        ]
+        for row in self.summary():
+            labels = f'app="{row["app"]}",kind="{row["kind"]}",name="{row["name"]}"'
+            for bound, cumulative in row["buckets"].items():
+                lines.append(f'{METRIC}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{METRIC}_sum{{{labels}}} {row['sum']!r}")
+            lines.append(f"{METRIC}_count{{{labels}}} {row['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def format_bound(bound):
+    return "+Inf" if bound == float("inf") else f"{bound:g}"
+
+
+PROFILER = Profiler() if os.environ.get(ENV_VAR, "") not in ("", "0") else None
+# The rerun running on this thread, so calculate_* wrappers know which app called them
+_local = threading.local()
+
+
+def enable():
+    """Turns profiling on for this process (as STOCKCALC_PROFILE=1 does at import)."""
+    global PROFILER
+    if PROFILER is None:
+        PROFILER = Profiler()
+    return PROFILER
+
+
+def disable():
+    global PROFILER
+    PROFILER = None
+
+
+# --- Reruns ---
+class Rerun:
+    """
+    Timings of one script run. Sections are timed as laps (time since the
+    previous lap), calculate_* calls are totalled per function; both are also
+    fed to the process-wide histograms.
+    """
+
+    def __init__(self, profiler, app):
+        self.profiler = profiler
+        self.app = app
+        self.sections = []
+        self.calls = {}
+        self.total = None
+        _local.rerun = self
+        self._start = self._last = perf_counter()
+
+    def lap(self, name):
+        elapsed = perf_counter() - self._last
+        self.sections.append((name, elapsed))
+        self.profiler.observe(self.app, "section", name, elapsed)
+        self._last = perf_counter()
+
+    def call(self, name, seconds):
+        stats = self.calls.get(name)
+        if stats is None:
+            self.calls[name] = [1, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+        self.profiler.observe(self.app, "call", name, seconds)
+
+    def end(self):
+        self.total = perf_counter() - self._start
+        self.profiler.observe(self.app, "rerun", "total", self.total)
+        if getattr(_local, "rerun", None) is self:
+            _local.rerun = None
+
+
+class _NullRerun:
+    """What start_rerun returns while profiling is off."""
+
+    def lap(self, name):
+        pass
+
+    def end(self):
+        pass
+
+
+NULL_RERUN = _NullRerun()
+
+
+def start_rerun(app):
+    """Starts timing a rerun of `app`; call .lap(section) after each section and .end() at the end."""
+    if PROFILER is None:
+        return NULL_RERUN
+    return Rerun(PROFILER, app)
+
+
+# --- Call Timing ---
+def timed(name, func):
+    """Wraps func so each call is recorded under `name` for the rerun running on this thread."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            rerun = getattr(_local, "rerun", None)
+            if rerun is not None:
+                rerun.call(name, elapsed)
+            elif PROFILER is not None:
+                PROFILER.observe("-", "call", name, elapsed)
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def instrument(namespace, prefix="calculate_"):
+    """Replaces every function named prefix* in `namespace` (a module's globals()) by a timed wrapper; no-op when off."""
+    if PROFILER is None:
+        return
+    for name, value in list(namespace.items()):
+        if name.startswith(prefix) and callable(value) and not getattr(value, "profiled", False):
+            namespace[name] = timed(name, value)
+
+
+# --- Debug Panel ---
+def debug_panel(rerun):
+    """Streamlit expander with the rerun's breakdown and the process histograms; renders nothing when off."""
+    if PROFILER is None or not isinstance(rerun, Rerun):
+        return
+    import altair as alt
+    import pandas as pd
+    import streamlit as st
+
+    with st.expander(f"⏱️ Profil Rerun (debug): {rerun.total * 1000:,.1f} ms", expanded=False):
+        st.caption(f"Aktif karena {ENV_VAR} diset. Waktu panel ini sendiri tidak ikut diukur.")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("**Bagian (rerun ini)**")
+            st.dataframe(pd.DataFrame(
+                [(name, seconds * 1000, seconds / rerun.total * 100) for name, seconds in rerun.sections],
+                columns=["Bagian", "ms", "% Rerun"],
+            ), hide_index=True, use_container_width=True)
+        with col2:
+            st.write("**Panggilan calculate_* (rerun ini)**")
+            st.dataframe(pd.DataFrame(
+                [(name, count, seconds * 1000) for name, (count, seconds) in sorted(rerun.calls.items())],
+                columns=["Fungsi", "Panggilan", "Total ms"],
+            ), hide_index=True, use_container_width=True)
+
+        st.write("**Histogram (semua rerun & sesi proses ini)**")
+        summary = [row for row in PROFILER.summary() if row["app"] == rerun.app]
+        st.dataframe(pd.DataFrame([
+            {"Jenis": row["kind"], "Nama": row["name"], "Jumlah": row["count"], "Rata-rata ms": row["mean"] * 1000,
+             **{f"P{round(q * 100)} ms": row[f"p{round(q * 100)}"] * 1000 for q in QUANTILES}, "Maks ms": row["max"] * 1000}
+            for row in summary
+        ]), hide_index=True, use_container_width=True)
+        if summary:
+            pick = st.selectbox("Histogram", summary, format_func=lambda row: f"{row['kind']}: {row['name']}", key="profile_series")
+            counts, previous = [], 0
+            for bound, cumulative in pick["buckets"].items():
+                counts.append((f"≤ {bound}", cumulative - previous))
+                previous = cumulative
+            first = next((i for i, (_, n) in enumerate(counts) if n), 0)
+            last = max((i for i, (_, n) in enumerate(counts) if n), default=0)
+            hist = pd.DataFrame(counts[first:last + 1], columns=["Batas (detik)", "Jumlah"])
+            st.altair_chart(alt.Chart(hist).mark_bar().encode(x=alt.X("Batas (detik):N", sort=None), y="Jumlah:Q"), use_container_width=True)
+
+        dl_col1, dl_col2 = st.columns(2)
+        dl_col1.download_button("Unduh JSON", PROFILER.to_json(), file_name="profile.json", mime="application/json", use_container_width=True)
+        dl_col2.download_button("Unduh Prometheus", PROFILER.to_prometheus(), file_name="profile.prom", mime="text/plain", use_container_width=True)
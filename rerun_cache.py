@@ -0,0 +1,50 @@
+from collections import Counter
+
+
+# --- Incremental Recomputation ---
+class DerivedCache:
+    """
+    Memoizes derived values across Streamlit reruns, keyed on their exact inputs.
+
+    Each value is identified by a name plus the tuple of inputs it was computed
+    from; when a downstream value takes an upstream value as input, it is only
+    recomputed if the upstream result actually changed. Entries not requested
+    during a rerun are dropped by `end_rerun`, so memory follows the working set
+    (e.g. the positions currently in the portfolio) instead of growing forever.
+    Inputs must be hashable.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._used = set()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def get(self, name, func, *inputs):
+        """Returns func(*inputs), reusing the stored result when the inputs are unchanged."""
+        key = (name, inputs)
+        try:
+            value = self._values[key]
+            self.hits[name] += 1
+        except KeyError:
+            value = self._values[key] = func(*inputs)
+            self.misses[name] += 1
+        self._used.add(key)
+        return value
+
+    def end_rerun(self):
+        """Evicts every entry that was not requested since the previous call."""
+        for key in self._values.keys() - self._used:
+            del self._values[key]
+        self._used = set()
+
+    def stats(self):
+        """Rows of (name, hits, misses, hit_rate) for tuning."""
+        rows = []
+        for name in sorted(self.hits.keys() | self.misses.keys()):
+            hits, misses = self.hits[name], self.misses[name]
+            rows.append((name, hits, misses, hits / (hits + misses)))
+        return rows
+
+    def __len__(self):
+        return len(self._values)
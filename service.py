@@ -0,0 +1,451 @@
+"""
+Local calculation service with micro-batching.
+
+Serves calculate_metrics over HTTP (TCP or a Unix socket) with the standard
+library's asyncio. Requests that arrive together are coalesced into one
+micro-batch and evaluated with a single calculate_metrics_batch call, which
+gives bit-identical results to the scalar function. Lot counts must be whole
+numbers; requests with fractional lots are rejected with 400, and bodies
+larger than MAX_BODY bytes with 413.
+
+A batch is evaluated as soon as it holds --batch-size rows, or --batch-window-ms
+after its first row arrived, whichever comes first. A window of 0 evaluates
+whatever is queued immediately.
+
+    python service.py serve --port 8765
+    python service.py serve --unix /tmp/stockcalc.sock --batch-window-ms 2 --batch-size 512
+    python service.py bench --concurrency 64 --requests 20000          # spawns a server
+    python service.py bench --url unix:///tmp/stockcalc.sock
+
+Endpoints:
+    POST /metrics   body: one position object or a list of them (fields as in
+                    cli.py: current_avg, current_lots, target_sell_price, and
+                    optionally buy_price, buy_lots, buy_fee_pct, sell_fee_pct)
+                    -> {"results": [{new_avg, bep, total_lots, pnl_nominal, pnl_percent}, ...]}
+    GET  /stats     batches, rows and mean batch size so far
+    GET  /health
+
+Scripts and the Streamlit app use CalcClient (synchronous, keep-alive).
+main4 uses the service when STOCKCALC_SERVICE_URL is set.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from batch import calculate_metrics_batch
+from cli import OPTIONAL_FIELDS, REQUIRED_FIELDS, RESULT_FIELDS
+
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_WINDOW_MS = 1.0
+SERVICE_URL_ENV = "STOCKCALC_SERVICE_URL"
+# Largest request body accepted (bytes); roughly 50k positions
+MAX_BODY = 8 << 20
+
+
+# --- Micro-Batching ---
+def validate_rows(rows):
+    """
+    Raises ValueError for a request evaluate_rows cannot take as given: rows
+    that are not objects, missing required fields, or fractional lot counts
+    (the batch engine works in whole lots and would truncate them).
+    """
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"posisi {i}: harus berupa objek JSON, bukan {type(row).__name__}")
+        missing = [name for name in REQUIRED_FIELDS if row.get(name) is None]
+        if missing:
+            raise ValueError(f"posisi {i}: kolom wajib kosong: {', '.join(missing)}")
+        for name in ("current_lots", "buy_lots"):
+            if not float(row.get(name) or 0).is_integer():
+                raise ValueError(f"posisi {i}: {name} harus bilangan bulat, bukan {row[name]!r}")
+
+
+def evaluate_rows(rows):
+    """calculate_metrics_batch over a list of position dicts; one result dict per row."""
+    validate_rows(rows)
+    columns = {name: np.array([row[name] for row in rows], dtype=np.float64) for name in REQUIRED_FIELDS}
+    for name in OPTIONAL_FIELDS:
+        columns[name] = np.array([row.get(name) or 0 for row in rows], dtype=np.float64)
+    metrics = calculate_metrics_batch(
+        columns["current_avg"], columns["current_lots"], columns["buy_price"], columns["buy_lots"],
+        columns["buy_fee_pct"], columns["sell_fee_pct"], columns["target_sell_price"],
+    )
+    return [dict(zip(RESULT_FIELDS, values)) for values in zip(*(m.tolist() for m in metrics))]
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent submissions into batches of at most max_rows rows.
+
+    submit() queues a request's rows and awaits its slice of the batch result.
+    A request is never split across batches, so one larger than max_rows is
+    evaluated on its own.
+    """
+
+    def __init__(self, evaluate=evaluate_rows, max_rows=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW_MS / 1000):
+        self.evaluate = evaluate
+        self.max_rows = max_rows
+        self.window = window
+        self.batches = 0
+        self.rows = 0
+        self._pending = []
+        self._pending_rows = 0
+        self._arrived = asyncio.Event()
+        self._full = asyncio.Event()
+
+    async def submit(self, rows):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((rows, future))
+        self._pending_rows += len(rows)
+        self._arrived.set()
+        if self._pending_rows >= self.max_rows:
+            self._full.set()
+        return await future
+
+    def _take_batch(self):
+        batch, size = [], 0
+        while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_rows):
+            rows, future = self._pending.pop(0)
+            batch.append((rows, future))
+            size += len(rows)
+        self._pending_rows -= size
+        if self._pending_rows < self.max_rows:
+            self._full.clear()
+        if not self._pending:
+            self._arrived.clear()
+        return batch, size
+
+    async def run(self):
+        while True:
+            await self._arrived.wait()
+            if self.window > 0 and not self._full.is_set():
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+            batch, size = self._take_batch()
+            live = [(rows, future) for rows, future in batch if not future.done()]
+            if not live:
+                continue
+            try:
+                results = self.evaluate([row for rows, _ in live for row in rows])
+            except Exception:
+                # Re-run per request so one bad request does not fail its neighbours;
+                # whatever it raises goes to its own caller and the loop keeps serving
+                for rows, future in live:
+                    try:
+                        future.set_result(self.evaluate(rows))
+                    except Exception as request_error:
+                        future.set_exception(request_error)
+                continue
+            start = 0
+            for rows, future in live:
+                future.set_result(results[start:start + len(rows)])
+                start += len(rows)
+            self.batches += 1
+            self.rows += size
+
+    def stats(self):
+        return {"batches": self.batches, "rows": self.rows, "mean_batch_rows": self.rows / self.batches if self.batches else 0}
+
+
+# --- HTTP Server ---
+def http_response(status, payload):
+    body = json.dumps(payload).encode()
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}[status]
+    head = f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    return head.encode() + body
+
+
+async def handle_connection(batcher, reader, writer):
+    """Serves keep-alive HTTP/1.1 requests on one connection until the client closes it."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+            except ValueError:
+                # Framing is lost, so answer and drop the connection
+                writer.write(http_response(400, {"error": "permintaan HTTP tidak valid"}))
+                await writer.drain()
+                break
+            if not 0 <= length <= MAX_BODY:
+                # The body is left unread, so framing is lost here too
+                if length > MAX_BODY:
+                    writer.write(http_response(413, {"error": f"isi permintaan melebihi {MAX_BODY} byte"}))
+                else:
+                    writer.write(http_response(400, {"error": "Content-Length tidak valid"}))
+                await writer.drain()
+                break
+            body = await reader.readexactly(length) if length else b""
+
+            if method == "POST" and path == "/metrics":
+                try:
+                    payload = json.loads(body)
+                    rows = payload if isinstance(payload, list) else [payload]
+                    validate_rows(rows)
+                    response = http_response(200, {"results": await batcher.submit(rows)})
+                except (ValueError, TypeError, AttributeError) as e:
+                    response = http_response(400, {"error": str(e)})
+            elif method == "GET" and path == "/stats":
+                response = http_response(200, batcher.stats())
+            elif method == "GET" and path == "/health":
+                response = http_response(200, {"ok": True})
+            else:
+                response = http_response(404, {"error": f"{method} {path} tidak dikenal"})
+            writer.write(response)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, unix=None, max_rows=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW_MS / 1000, ready=None):
+    batcher = MicroBatcher(max_rows=max_rows, window=window)
+    worker = asyncio.create_task(batcher.run())
+    handler = lambda reader, writer: handle_connection(batcher, reader, writer)
+    if unix:
+        if os.path.exists(unix):
+            os.unlink(unix)
+        server = await asyncio.start_unix_server(handler, path=unix)
+    else:
+        server = await asyncio.start_server(handler, host, port)
+    if ready is not None:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        worker.cancel()
+
+
+# --- Client ---
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=10):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def parse_url(url):
+    """("unix", path) for unix:///path, otherwise ("tcp", (host, port))."""
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return "unix", parsed.path
+    return "tcp", (parsed.hostname or "127.0.0.1", parsed.port or DEFAULT_PORT)
+
+
+class CalcClient:
+    """Synchronous client over one keep-alive connection (not thread-safe; use one per thread)."""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self._conn = None
+
+    def _connect(self):
+        kind, address = parse_url(self.url)
+        if kind == "unix":
+            return UnixHTTPConnection(address, timeout=self.timeout)
+        return http.client.HTTPConnection(*address, timeout=self.timeout)
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = self._connect()
+            try:
+                self._conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+                response = self._conn.getresponse()
+                data = json.loads(response.read())
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # The server may have dropped an idle keep-alive connection; retry once on a fresh one
+                self.close()
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise ValueError(data.get("error", f"HTTP {response.status}"))
+        return data
+
+    def metrics(self, positions):
+        """Results for a list of position dicts, in order."""
+        return self._request("POST", "/metrics", positions)["results"]
+
+    def calculate_metrics(self, current_avg, current_lots, buy_price, buy_lots, buy_fee_pct, sell_fee_pct, target_sell_price):
+        """Same signature and return tuple as calculations.calculate_metrics."""
+        position = dict(zip(REQUIRED_FIELDS + OPTIONAL_FIELDS, (current_avg, current_lots, target_sell_price, buy_price, buy_lots, buy_fee_pct, sell_fee_pct)))
+        result = self.metrics([position])[0]
+        return tuple(result[name] for name in RESULT_FIELDS)
+
+    def stats(self):
+        return self._request("GET", "/stats")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# --- Load Generator ---
+async def open_connection(url):
+    kind, address = parse_url(url)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(address)
+    return await asyncio.open_connection(*address)
+
+
+async def load_client(url, positions, latencies, deadline_count):
+    """One keep-alive connection sending single-position requests back to back."""
+    reader, writer = await open_connection(url)
+    try:
+        i = 0
+        while deadline_count():
+            body = json.dumps(positions[i % len(positions)]).encode()
+            start = time.perf_counter()
+            writer.write(b"POST /metrics HTTP/1.1\r\nHost: calc\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+            await writer.drain()
+            length = 0
+            status = await reader.readline()
+            while True:
+                header = await reader.readline()
+                if header == b"\r\n":
+                    break
+                if header.lower().startswith(b"content-length:"):
+                    length = int(header.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not status.startswith(b"HTTP/1.1 200"):
+                raise RuntimeError(f"Server menjawab {status.decode().strip()}")
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run_load(url, concurrency, total_requests, seed=0):
+    rng = np.random.default_rng(seed)
+    avg = np.round(np.exp(rng.uniform(np.log(50), np.log(30000), 1000)))
+    positions = [
+        {"current_avg": a, "current_lots": int(rng.integers(1, 500)), "buy_price": float(np.round(a * rng.uniform(0.7, 1.1))),
+         "buy_lots": int(rng.integers(0, 200)), "buy_fee_pct": 0.15, "sell_fee_pct": 0.25, "target_sell_price": float(np.round(a * 1.1))}
+        for a in avg.tolist()
+    ]
+    remaining = [total_requests]
+
+    def take():
+        remaining[0] -= 1
+        return remaining[0] >= 0
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(load_client(url, positions[c::concurrency] or positions, latencies, take) for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+    }
+
+
+def wait_until_up(url, timeout=10):
+    deadline = time.monotonic() + timeout
+    client = CalcClient(url, timeout=1)
+    while True:
+        try:
+            client._request("GET", "/health")
+            client.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def client_from_env():
+    """CalcClient for STOCKCALC_SERVICE_URL, or None when the service is not configured."""
+    url = os.environ.get(SERVICE_URL_ENV)
+    return CalcClient(url) if url else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan kalkulasi dengan micro-batching.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Jalankan layanan")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--unix", help="Path Unix socket (menggantikan host/port)")
+    p_serve.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Baris maksimum per batch")
+    p_serve.add_argument("--batch-window-ms", type=float, default=DEFAULT_WINDOW_MS, help="Waktu tunggu maksimum untuk mengisi batch")
+
+    p_bench = sub.add_parser("bench", help="Load generator: p50/p99 latensi dan request/s")
+    p_bench.add_argument("--url", help="Layanan yang diuji (default: jalankan layanan sementara)")
+    p_bench.add_argument("--concurrency", type=int, default=64)
+    p_bench.add_argument("--requests", type=int, default=20_000)
+    p_bench.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Untuk layanan sementara")
+    p_bench.add_argument("--batch-window-ms", type=float, default=DEFAULT_WINDOW_MS, help="Untuk layanan sementara")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        where = args.unix or f"{args.host}:{args.port}"
+        print(f"Layanan kalkulasi di {where} (batch <= {args.batch_size} baris, jendela {args.batch_window_ms:g} ms)", file=sys.stderr)
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.batch_size, args.batch_window_ms / 1000))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    server = None
+    url = args.url
+    if url is None:
+        # Separate process so the load generator does not share the server's event loop
+        port = DEFAULT_PORT + 1
+        url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen([
+            sys.executable, os.path.abspath(__file__), "serve", "--port", str(port),
+            "--batch-size", str(args.batch_size), "--batch-window-ms", str(args.batch_window_ms),
+        ])
+    try:
+        wait_until_up(url)
+        report = asyncio.run(run_load(url, args.concurrency, args.requests))
+        client = CalcClient(url)
+        report.update(client.stats())
+        client.close()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+import math
+
+import numpy as np
+
+from calculations import calculate_metrics
+
+# IDX tick-size bands: (lower bound of the band, tick)
+IDX_TICKS = ((0, 1), (200, 2), (500, 5), (2000, 10), (5000, 25))
+MIN_PRICE = 1
+MAX_PRICE = 1_000_000
+MAX_LOTS = 10 ** 9
+
+
+# --- Price Ladder ---
+def build_price_ladder(ticks=IDX_TICKS, min_price=MIN_PRICE, max_price=MAX_PRICE):
+    """Every valid price from min_price to max_price, ascending."""
+    parts = []
+    bounds = [lower for lower, _ in ticks[1:]] + [max_price + 1]
+    for (lower, tick), upper in zip(ticks, bounds):
+        start = max(lower, min_price)
+        start += (-start) % tick
+        if start < upper:
+            parts.append(np.arange(start, min(upper, max_price + 1), tick, dtype=np.float64))
+    return np.concatenate(parts)
+
+
+PRICE_LADDER = build_price_ladder()
+
+
+def tick_size(price):
+    """Tick of the band the price falls in."""
+    size = IDX_TICKS[0][1]
+    for lower, tick in IDX_TICKS:
+        if price >= lower:
+            size = tick
+    return size
+
+
+def snap_price(price, direction="down"):
+    """
+    Snaps prices (scalar or array) onto the ladder: "down" to the highest valid
+    price <= price, "up" to the lowest valid price >= price. Prices outside the
+    ladder come back as nan.
+    """
+    prices = np.asarray(price, dtype=np.float64)
+    if direction == "down":
+        idx = np.searchsorted(PRICE_LADDER, prices, side="right") - 1
+    else:
+        idx = np.searchsorted(PRICE_LADDER, prices, side="left")
+    valid = (idx >= 0) & (idx < len(PRICE_LADDER))
+    snapped = np.where(valid, PRICE_LADDER[np.clip(idx, 0, len(PRICE_LADDER) - 1)], np.nan)
+    return snapped if snapped.ndim else float(snapped)
+
+
+def _first_true(predicate, lo, hi):
+    """Smallest n in [lo, hi] where a monotone predicate holds (doubling, then bisection), or None."""
+    step = 1
+    while not predicate(min(lo + step - 1, hi)):
+        if lo + step - 1 >= hi:
+            return None
+        lo, step = lo + step, step * 2
+    hi = min(lo + step - 1, hi)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if predicate(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+# --- Inverse Solvers ---
+def min_lots_to_reach_avg(current_avg, current_lots, buy_price, target_avg, buy_fee_pct=0.0):
+    """
+    Fewest whole lots to buy at buy_price so the average drops to target_avg or below.
+
+    Uses the calculate_metrics cost basis (the buy fee is added to the new lots;
+    with buy_fee_pct=0 this is exactly calculate_new_avg). With a percentage fee
+    the answer is closed form: each lot lowers the excess cost over target by
+    100 x (target - effective price). A fee schedule is searched by doubling
+    then bisecting the lot count. Returns 0 when already at or below target and
+    None when unreachable (the effective buy price is not below the target).
+    An empty position also gives None: it has no average to lower, and any buy
+    simply sets it to the effective buy price.
+    """
+    if current_lots == 0:
+        return None
+    if current_avg <= target_avg:
+        return 0
+
+    def avg_after(lots):
+        return calculate_metrics(current_avg, current_lots, buy_price, lots, buy_fee_pct, 0, 0)[0]
+
+    try:
+        effective_price = buy_price * (1 + buy_fee_pct / 100)
+    except TypeError:
+        return _first_true(lambda lots: avg_after(lots) <= target_avg, 1, MAX_LOTS)
+
+    if effective_price >= target_avg:
+        return None
+    lots = math.ceil(current_lots * (current_avg - target_avg) / (target_avg - effective_price))
+    # Guard against float rounding at the boundary
+    while lots > 0 and avg_after(lots - 1) <= target_avg:
+        lots -= 1
+    while avg_after(lots) > target_avg:
+        lots += 1
+    return lots
+
+
+def max_price_for_bep(current_avg, current_lots, buy_lots, target_bep, buy_fee_pct, sell_fee_pct):
+    """
+    Highest valid (tick-snapped) price at which buying buy_lots brings the BEP to target_bep or below.
+
+    With percentage fees the BEP after the buy is linear in the buy price, so
+    the bound is solved in closed form, snapped down to the ladder and checked
+    against calculate_metrics one tick at a time. A fee schedule is
+    binary-searched over the ladder instead. Returns None when even the lowest
+    price on the ladder is not enough.
+    """
+    if buy_lots == 0:
+        return None
+
+    def bep_at(i):
+        return calculate_metrics(current_avg, current_lots, PRICE_LADDER[i], buy_lots, buy_fee_pct, sell_fee_pct, 0)[1]
+
+    try:
+        b_fee = buy_fee_pct / 100
+        s_fee = sell_fee_pct / 100
+    except TypeError:
+        # BEP rises with the buy price, so the last fitting index is one before the first miss
+        first_miss = _first_true(lambda i: bep_at(i) > target_bep, 0, len(PRICE_LADDER) - 1)
+        idx = len(PRICE_LADDER) - 1 if first_miss is None else first_miss - 1
+        return float(PRICE_LADDER[idx]) if idx >= 0 else None
+
+    total_shares = (current_lots + buy_lots) * 100
+    bound = (target_bep * (1 - s_fee) * total_shares - current_lots * 100 * current_avg) / (buy_lots * 100 * (1 + b_fee))
+    if bound < PRICE_LADDER[0]:
+        return None
+    idx = int(np.searchsorted(PRICE_LADDER, min(bound, PRICE_LADDER[-1]), side="right")) - 1
+
+    while idx >= 0 and bep_at(idx) > target_bep:
+        idx -= 1
+    while idx + 1 < len(PRICE_LADDER) and bep_at(idx + 1) <= target_bep:
+        idx += 1
+    return float(PRICE_LADDER[idx]) if idx >= 0 else None
+
+
+def cheapest_buy_ladder(current_avg, current_lots, target_avg, levels, buy_fee_pct=0.0):
+    """
+    Cheapest set of buys across price levels that brings the average to target_avg.
+
+    `levels` is a list of (price, max_lots) rungs the user is willing to buy at;
+    prices are snapped down to the tick ladder. A lower rung both costs less per
+    lot and lowers the average more, so filling from the lowest rung upward is
+    optimal (exactly so for percentage fees; with a minimum commission the
+    per-rung lot count is still the smallest that suffices). Returns
+    (orders, total_cost) with orders as [(price, lots), ...], or None when the
+    rungs cannot reach the target.
+    """
+    try:
+        b_fee = buy_fee_pct / 100
+        order_cost = lambda value: value * (1 + b_fee)
+    except TypeError:
+        order_cost = lambda value: value + buy_fee_pct.fee(value)
+
+    # Excess cost above target that the buys must offset, in IDR
+    needed = current_lots * 100 * (current_avg - target_avg)
+    orders = []
+    total_cost = 0.0
+    rungs = sorted((price, max_lots) for price, max_lots in ((snap_price(p), m) for p, m in levels) if not math.isnan(price))
+    for price, max_lots in rungs:
+        if needed <= 0:
+            break
+        if max_lots <= 0:
+            continue
+
+        def gain(lots):
+            return target_avg * lots * 100 - order_cost(lots * 100 * price)
+
+        if gain(max_lots) <= 0:
+            continue
+        lots = max_lots if gain(max_lots) < needed else _first_true(lambda n: gain(n) >= needed, 1, max_lots)
+        orders.append((price, lots))
+        total_cost += order_cost(lots * 100 * price)
+        needed -= gain(lots)
+    if needed > 1e-6:
+        return None
+    return orders, total_cost
+
+
+def ladder_levels(price, rungs, step_pct, max_lots):
+    """Evenly spaced rungs every step_pct below price, snapped down to valid ticks."""
+    levels = []
+    for i in range(rungs):
+        rung_price = snap_price(price * (1 - step_pct / 100) ** i)
+        if not math.isnan(rung_price):
+            levels.append((rung_price, max_lots))
+    return levels
+
+
+# --- Batched Solvers ---
+def min_lots_to_reach_avg_batch(current_avg, current_lots, buy_price, target_avg, buy_fee_pct=0.0):
+    """
+    Vectorized min_lots_to_reach_avg over many positions.
+
+    Returns a float array of lots: 0 where already at target, nan where the
+    target is unreachable at that price or the position is empty.
+    """
+    current_avg, current_lots, buy_price, target_avg, b_fee = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (current_avg, current_lots, buy_price, target_avg, buy_fee_pct))
+    )
+    b_fee = b_fee / 100
+    effective_price = buy_price * (1 + b_fee)
+    solved = (current_lots > 0) & (current_avg > target_avg) & (effective_price < target_avg)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exact = current_lots * (current_avg - target_avg) / (target_avg - effective_price)
+    lots = np.where(solved, np.ceil(exact), 0.0)
+
+    # Float rounding can only put the ceiling a lot off where the closed form is
+    # within rounding distance of a whole lot; settle those rows in both
+    # directions with the same cost-basis arithmetic as calculate_metrics
+    near = np.flatnonzero(solved & (np.abs(exact - np.rint(exact)) <= 1e-6 * (1 + current_lots + np.abs(exact))))
+    if len(near):
+        c_avg, c_lots, price, fee, target = current_avg[near], current_lots[near], buy_price[near], b_fee[near], target_avg[near]
+
+        def fits(n):
+            return (c_lots * 100 * c_avg + n * 100 * price * (1 + fee)) / ((c_lots + n) * 100) <= target
+
+        n = lots[near]
+        while True:
+            down = (n > 0) & fits(n - 1)
+            up = ~fits(n)
+            if not (down.any() or up.any()):
+                break
+            n = n - down + up
+        lots[near] = n
+
+    lots = np.where(effective_price >= target_avg, np.nan, lots)
+    lots = np.where(current_avg <= target_avg, 0.0, lots)
+    return np.where(current_lots == 0, np.nan, lots)
+
+
+def max_price_for_bep_batch(current_avg, current_lots, buy_lots, target_bep, buy_fee_pct, sell_fee_pct):
+    """Vectorized max_price_for_bep; nan where no price on the ladder is low enough."""
+    current_avg = np.asarray(current_avg, dtype=np.float64)
+    current_lots = np.asarray(current_lots, dtype=np.float64)
+    buy_lots = np.asarray(buy_lots, dtype=np.float64)
+    target_bep = np.asarray(target_bep, dtype=np.float64)
+    b_fee = np.asarray(buy_fee_pct, dtype=np.float64) / 100
+    s_fee = np.asarray(sell_fee_pct, dtype=np.float64) / 100
+
+    total_shares = (current_lots + buy_lots) * 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bound = (target_bep * (1 - s_fee) * total_shares - current_lots * 100 * current_avg) / (buy_lots * 100 * (1 + b_fee))
+    idx = np.searchsorted(PRICE_LADDER, np.minimum(bound, PRICE_LADDER[-1]), side="right") - 1
+
+    def bep_at(i):
+        price = PRICE_LADDER[np.clip(i, 0, len(PRICE_LADDER) - 1)]
+        new_avg = (current_lots * 100 * current_avg + buy_lots * 100 * price * (1 + b_fee)) / total_shares
+        return new_avg / (1 - s_fee)
+
+    # One-tick corrections for float rounding at the boundary
+    idx = np.where((idx >= 0) & (bep_at(idx) > target_bep), idx - 1, idx)
+    idx = np.where((idx + 1 < len(PRICE_LADDER)) & (bep_at(idx + 1) <= target_bep), idx + 1, idx)
+    price = PRICE_LADDER[np.clip(idx, 0, len(PRICE_LADDER) - 1)]
+    return np.where((idx >= 0) & (buy_lots > 0) & ~np.isnan(bound), price, np.nan)
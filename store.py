@@ -0,0 +1,212 @@
+"""
+Persistent portfolio store on embedded SQLite.
+
+Holds positions, the trades behind them and cached per-position metrics for
+any number of accounts, so portfolio state survives Streamlit sessions. The
+database runs in WAL mode (readers never block the writer) and every table is
+keyed by (account, ticker).
+
+Positions are maintained incrementally: recording a trade reads one position
+row by primary key, applies ledger.apply_trade (same semantics as a ledger
+replay) and writes it back, so the cost per trade does not grow with history.
+Cached metrics of a position are dropped whenever it changes.
+
+    store = PortfolioStore("portfolio.db")
+    store.record_trades("ACC1", [("BBCA", "B", 9000, 1000), ...], 0.15, 0.25)
+    store.upsert_positions("ACC1", ledger.portfolio_snapshot(...))
+    columns = store.load_positions("ACC1")
+"""
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from ledger import apply_trade
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".stockcalc", "portfolio.db")
+POSITION_FIELDS = ("shares", "avg", "realized_pnl", "fees")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    account      TEXT NOT NULL,
+    ticker       TEXT NOT NULL,
+    shares       INTEGER NOT NULL DEFAULT 0,
+    avg          REAL NOT NULL DEFAULT 0,
+    realized_pnl REAL NOT NULL DEFAULT 0,
+    fees         REAL NOT NULL DEFAULT 0,
+    updated_at   REAL NOT NULL,
+    PRIMARY KEY (account, ticker)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS trades (
+    id          INTEGER PRIMARY KEY,
+    account     TEXT NOT NULL,
+    ticker      TEXT NOT NULL,
+    side        TEXT NOT NULL,
+    price       REAL NOT NULL,
+    shares      INTEGER NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_account_ticker ON trades (account, ticker, id);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    account TEXT NOT NULL,
+    ticker  TEXT NOT NULL,
+    name    TEXT NOT NULL,
+    params  TEXT NOT NULL,
+    value   REAL NOT NULL,
+    PRIMARY KEY (account, ticker, name, params)
+) WITHOUT ROWID;
+"""
+
+UPSERT_POSITION = """
+INSERT INTO positions (account, ticker, shares, avg, realized_pnl, fees, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (account, ticker) DO UPDATE SET
+    shares = excluded.shares, avg = excluded.avg, realized_pnl = excluded.realized_pnl,
+    fees = excluded.fees, updated_at = excluded.updated_at
+"""
+
+
+class PortfolioStore:
+    """
+    One SQLite connection. Open one store per thread or Streamlit session;
+    WAL lets several stores on the same file read while one writes.
+    """
+
+    def __init__(self, path=None):
+        # STOCKCALC_DB overrides the default location
+        path = path or os.environ.get("STOCKCALC_DB", DEFAULT_PATH)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        # Streamlit may run a session's reruns on different threads, never concurrently
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._writes = 0
+
+    def close(self):
+        self.conn.close()
+
+    # --- Writes ---
+    def upsert_positions(self, account, rows):
+        """
+        Bulk insert-or-replace of position rows (dicts with ticker plus
+        shares/avg/realized_pnl/fees, e.g. ledger.portfolio_snapshot rows) in one
+        transaction. Only the cached metrics of the written tickers are dropped.
+        """
+        now = time.time()
+        values = [
+            (account, row["ticker"], int(row["shares"]), float(row["avg"]), float(row.get("realized_pnl", 0)), float(row.get("fees", 0)), now)
+            for row in rows
+        ]
+        with self.conn:
+            self.conn.executemany(UPSERT_POSITION, values)
+            self.conn.executemany("DELETE FROM metrics WHERE account = ? AND ticker = ?", ((account, row[1]) for row in values))
+        self._writes += 1
+
+    def record_trades(self, account, trades, buy_fee_pct, sell_fee_pct):
+        """
+        Appends trades (ticker, side, price, shares) and updates their positions in one transaction.
+
+        Each touched position is read once, updated in memory per trade with
+        ledger.apply_trade and written back once, so a batch costs O(trades +
+        touched positions). Invalid trades (e.g. overselling) roll back the whole batch.
+        """
+        state = {}
+        rows = []
+        now = time.time()
+        with self.conn:
+            for ticker, side, price, shares in trades:
+                ticker, side = ticker.strip().upper(), side.strip().upper()
+                if ticker not in state:
+                    state[ticker] = self.position(account, ticker) or {"shares": 0, "avg": 0.0, "realized_pnl": 0.0, "fees": 0.0}
+                apply_trade(state, ticker, side, price, shares, buy_fee_pct, sell_fee_pct)
+                rows.append((account, ticker, side, price, shares, now))
+            self.conn.executemany("INSERT INTO trades (account, ticker, side, price, shares, recorded_at) VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.executemany(UPSERT_POSITION, (
+                (account, ticker, pos["shares"], pos["avg"], pos["realized_pnl"], pos["fees"], now) for ticker, pos in state.items()
+            ))
+            self.conn.executemany("DELETE FROM metrics WHERE account = ? AND ticker = ?", ((account, ticker) for ticker in state))
+        self._writes += 1
+        return state
+
+    def record_trade(self, account, ticker, side, price, shares, buy_fee_pct, sell_fee_pct):
+        """One trade; returns the updated position."""
+        return self.record_trades(account, [(ticker, side, price, shares)], buy_fee_pct, sell_fee_pct)[ticker.strip().upper()]
+
+    def delete_position(self, account, ticker):
+        with self.conn:
+            for table in ("positions", "trades", "metrics"):
+                self.conn.execute(f"DELETE FROM {table} WHERE account = ? AND ticker = ?", (account, ticker))
+        self._writes += 1
+
+    # --- Reads ---
+    def version(self):
+        """
+        Cache key that changes when positions change through this store or
+        when any other connection commits (cached-metric writes here do not count).
+        """
+        return self.conn.execute("PRAGMA data_version").fetchone()[0], self._writes
+
+    def accounts(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT account FROM positions ORDER BY account")]
+
+    def position(self, account, ticker):
+        row = self.conn.execute(
+            "SELECT shares, avg, realized_pnl, fees FROM positions WHERE account = ? AND ticker = ?", (account, ticker)
+        ).fetchone()
+        return dict(zip(POSITION_FIELDS, row)) if row else None
+
+    def count_positions(self, account):
+        return self.conn.execute("SELECT COUNT(*) FROM positions WHERE account = ? AND shares > 0", (account,)).fetchone()[0]
+
+    def load_positions(self, account, include_closed=False):
+        """Open positions of an account as columns: {"ticker": list, "shares"/"avg"/...: NumPy arrays}, sorted by ticker."""
+        query = "SELECT ticker, shares, avg, realized_pnl, fees FROM positions WHERE account = ?"
+        if not include_closed:
+            query += " AND shares > 0"
+        rows = self.conn.execute(query + " ORDER BY ticker", (account,)).fetchall()
+        tickers, shares, avg, realized_pnl, fees = zip(*rows) if rows else ((),) * 5
+        return {
+            "ticker": list(tickers),
+            "shares": np.array(shares, dtype=np.int64),
+            "avg": np.array(avg, dtype=np.float64),
+            "realized_pnl": np.array(realized_pnl, dtype=np.float64),
+            "fees": np.array(fees, dtype=np.float64),
+        }
+
+    def trades(self, account, ticker):
+        return self.conn.execute(
+            "SELECT side, price, shares, recorded_at FROM trades WHERE account = ? AND ticker = ? ORDER BY id", (account, ticker)
+        ).fetchall()
+
+    # --- Cached Metrics ---
+    def metric_column(self, account, name, params, columns, compute):
+        """
+        Values of a per-position metric aligned with `columns` (from load_positions).
+
+        Cached values are keyed by (account, ticker, name, params) where params
+        is any JSON-serializable description of the inputs (e.g. the fee
+        schedule). Only positions without a cached value are passed to
+        compute(subset_columns) -> array, and the new values are stored.
+        """
+        key = json.dumps(params, sort_keys=True)
+        cached = dict(self.conn.execute(
+            "SELECT ticker, value FROM metrics WHERE account = ? AND name = ? AND params = ?", (account, name, key)
+        ).fetchall())
+        values = np.array([cached.get(ticker, np.nan) for ticker in columns["ticker"]], dtype=np.float64)
+        missing = np.flatnonzero(np.isnan(values))
+        if len(missing):
+            subset = {field: (np.asarray(col)[missing] if field != "ticker" else [col[i] for i in missing]) for field, col in columns.items()}
+            values[missing] = compute(subset)
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO metrics (account, ticker, name, params, value) VALUES (?, ?, ?, ?, ?)",
+                    ((account, subset["ticker"][i], name, key, float(v)) for i, v in enumerate(values[missing])),
+                )
+        return values
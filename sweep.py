@@ -0,0 +1,132 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from batch import calculate_metrics_batch, calculate_metrics_batch_schedule
+
+# Largest grid scenario_grid will evaluate: ~64 MB of PnL results, so the 8 cached grids stay bounded
+MAX_GRID_CELLS = 1 << 22
+
+
+# --- Scenario Grid ---
+def grid_axis(start, stop, step):
+    """Inclusive axis of values from start to stop (e.g. prices in rupiah or lots)."""
+    if step <= 0 or stop < start:
+        return np.array([start], dtype=np.float64)
+    return np.arange(start, stop + step / 2, step, dtype=np.float64)
+
+
+def axis_length(start, stop, step):
+    """len(grid_axis(start, stop, step)) without building the axis."""
+    if step <= 0 or stop < start:
+        return 1
+    return math.ceil((stop + step / 2 - start) / step)
+
+
+def grid_cells(price_range, lots_range, target_range):
+    """Number of scenarios a scenario_grid call would evaluate."""
+    return axis_length(*price_range) * axis_length(*lots_range) * axis_length(*target_range)
+
+
+@lru_cache(maxsize=8)
+def scenario_grid(current_avg, current_lots, price_range, lots_range, target_range, buy_fee_pct=0.0, sell_fee_pct=0.0):
+    """
+    Evaluates every (buy price x additional lots x target sell price) scenario at once.
+
+    The ranges are (start, stop, step) tuples so the call is hashable; results
+    are cached by their exact parameters and the least recently used grids are
+    evicted once more than `maxsize` are held. The returned arrays are shared
+    with the cache and marked read-only:
+        new_avg, bep      -> shape (prices, lots)
+        pnl, pnl_pct      -> shape (prices, lots, targets)
+
+    Raises ValueError, before allocating anything, when the grid would hold
+    more than MAX_GRID_CELLS scenarios. Fees are percentages or fees.FeeSide
+    schedules (minimum commission and tiers charged per scenario's trade).
+    """
+    cells = grid_cells(price_range, lots_range, target_range)
+    if cells > MAX_GRID_CELLS:
+        raise ValueError(f"Sweep terlalu besar: {cells:,} skenario (maksimal {MAX_GRID_CELLS:,}). Perkecil rentang atau perbesar langkah.")
+    buy_prices = grid_axis(*price_range)
+    buy_lots = grid_axis(*lots_range).astype(np.int64)
+    targets = grid_axis(*target_range)
+
+    try:
+        buy_fee_pct / 100
+        sell_fee_pct / 100
+        metrics_batch = calculate_metrics_batch
+    except TypeError:
+        metrics_batch = calculate_metrics_batch_schedule
+    new_avg, bep, _, pnl, pnl_pct = metrics_batch(
+        current_avg,
+        current_lots,
+        buy_prices[:, None, None],
+        buy_lots[None, :, None],
+        buy_fee_pct,
+        sell_fee_pct,
+        targets[None, None, :],
+    )
+
+    grid = {
+        "buy_price": buy_prices,
+        "buy_lots": buy_lots,
+        "target_price": targets,
+        # Average and BEP do not depend on the target price
+        "new_avg": np.ascontiguousarray(np.broadcast_to(new_avg, pnl.shape)[:, :, 0]),
+        "bep": np.ascontiguousarray(np.broadcast_to(bep, pnl.shape)[:, :, 0]),
+        "pnl": pnl,
+        "pnl_pct": pnl_pct,
+    }
+    for values in grid.values():
+        values.setflags(write=False)
+    return grid
+
+
+def nearest_index(axis, value):
+    """Index of the axis entry closest to value."""
+    return int(np.abs(axis - value).argmin())
+
+
+def grid_slice(grid, buy_price=None, buy_lots=None, target_price=None):
+    """
+    Cuts a lower-dimensional view out of an already computed grid.
+
+    Each fixed parameter snaps to the nearest point on its axis, so moving a
+    slider inside the swept range is served by indexing alone.
+    """
+    index = [slice(None), slice(None), slice(None)]
+    axes = {}
+    for dim, (name, value) in enumerate((("buy_price", buy_price), ("buy_lots", buy_lots), ("target_price", target_price))):
+        if value is None:
+            axes[name] = grid[name]
+        else:
+            index[dim] = nearest_index(grid[name], value)
+
+    result = dict(axes)
+    for name in ("pnl", "pnl_pct"):
+        result[name] = grid[name][tuple(index)]
+    for name in ("new_avg", "bep"):
+        result[name] = grid[name][tuple(index[:2])]
+    return result
+
+
+# --- Heatmap Output ---
+def heatmap_chart(x_axis, y_axis, values, x_title, y_title, value_title, scheme="redyellowgreen", domain_mid=None):
+    """Builds an Altair heatmap for a 2-D slice (rows follow y_axis, columns x_axis)."""
+    import altair as alt
+    import pandas as pd
+
+    xx, yy = np.meshgrid(x_axis, y_axis)
+    frame = pd.DataFrame({x_title: xx.ravel(), y_title: yy.ravel(), value_title: np.asarray(values).ravel()})
+    scale = alt.Scale(scheme=scheme) if domain_mid is None else alt.Scale(scheme=scheme, domainMid=domain_mid)
+    return (
+        alt.Chart(frame)
+        .mark_rect()
+        .encode(
+            x=alt.X(f"{x_title}:O"),
+            y=alt.Y(f"{y_title}:O", sort="descending"),
+            color=alt.Color(f"{value_title}:Q", scale=scale),
+            tooltip=[x_title, y_title, alt.Tooltip(f"{value_title}:Q", format=",.2f")],
+        )
+    )
@@ -0,0 +1,55 @@
+import itertools
+import random
+
+import pytest
+
+from allocator import allocate_budget, allocate_exact, allocate_greedy, allocation_error, lot_costs
+from calculations import calculate_cost_basis
+from fees import FeeSide
+
+
+def brute_force(budget, costs, targets):
+    """Lowest allocation error over every affordable lot combination."""
+    ranges = [range(int(budget // c) + 1) for c in costs]
+    return min(
+        allocation_error(lots, costs, targets)
+        for lots in itertools.product(*ranges)
+        if sum(c * x for c, x in zip(costs, lots)) <= budget
+    )
+
+
+def small_cases(n_cases=40, seed=3):
+    rng = random.Random(seed)
+    for _ in range(n_cases):
+        n = rng.randint(2, 3)
+        # Few enough affordable lots per ticker to enumerate every combination
+        prices = [rng.choice((482, 1000, 2750, 9000)) for _ in range(n)]
+        budget = rng.choice((500_000, 1_000_000, 1_500_000))
+        weights = [rng.uniform(0.1, 1) for _ in range(n)]
+        yield budget, prices, weights
+
+
+@pytest.mark.parametrize("budget, prices, weights", list(small_cases()))
+def test_exact_is_optimal_and_never_worse_than_greedy(budget, prices, weights):
+    costs = lot_costs(prices, 0.15)
+    targets = [w / sum(weights) * budget for w in weights]
+    exact = allocate_exact(budget, costs, targets)
+    greedy = allocate_greedy(budget, costs, targets)
+    for lots in (exact, greedy):
+        assert sum(c * x for c, x in zip(costs, lots)) <= budget
+    assert allocation_error(exact, costs, targets) == pytest.approx(brute_force(budget, costs, targets))
+    assert allocation_error(exact, costs, targets) <= allocation_error(greedy, costs, targets) * (1 + 1e-12)
+
+
+@pytest.mark.parametrize("method", ["exact", "greedy"])
+def test_fee_schedule_allocation_stays_within_budget(method):
+    # The minimum commission dominates small orders, so the flat-rate solution overspends
+    schedule = FeeSide((0, 50_000_000), (0.15, 0.10), min_commission=25_000, vat_pct=11)
+    rng = random.Random(5)
+    for _ in range(30):
+        prices = [rng.choice((50, 120, 482, 1000, 2750)) for _ in range(rng.randint(2, 6))]
+        budget = rng.choice((300_000, 1_000_000, 5_000_000))
+        lots, total = allocate_budget(budget, prices, buy_fee_pct=schedule, method=method)
+        orders = [calculate_cost_basis(0, 0, price, x, schedule)[1] for price, x in zip(prices, lots)]
+        assert total == pytest.approx(sum(orders))
+        assert total <= budget
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from backtest import backtest_series, run_backtests, write_series
+
+START = np.datetime64("2020-01-01T00:00:00", "s")
+
+
+def daily(n):
+    return START + (np.arange(n) * 86400).astype("timedelta64[s]")
+
+
+def test_drop_rule_buys_on_each_further_drop():
+    close = np.array([100.0, 95.0, 89.0, 85.0, 80.0, 79.0, 120.0])
+    result = backtest_series(daily(len(close)), close, {"kind": "drop", "drop_pct": 10, "lots": 1}, 0.15, 0.25)
+    # Entry at 100, then <= 90 (89), then <= 80.1 (80)
+    assert result["buys"] == 3
+    cost = (100 + 89 + 80) * 100 * 1.0015
+    assert result["capital_deployed"] == pytest.approx(cost)
+    assert result["final_pnl"] == pytest.approx(300 * 120 * 0.9975 - cost)
+
+
+def test_blocks_do_not_change_the_result():
+    rng = np.random.default_rng(2)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, 2_000)))
+    times = daily(len(close))
+    for rule in ({"kind": "drop", "drop_pct": 5, "lots": 2, "max_buys": 12}, {"kind": "dca", "period": "M", "lots": 1}):
+        whole = backtest_series(times, close, rule, 0.15, 0.25, block_bars=len(close))
+        for block_bars in (1, 7, 250):
+            blocked = backtest_series(times, close, rule, 0.15, 0.25, block_bars=block_bars)
+            for key in ("buys", "lots", "capital_deployed", "final_pnl", "max_drawdown"):
+                assert blocked[key] == pytest.approx(whole[key])
+            np.testing.assert_allclose(blocked["equity_curve"], whole["equity_curve"])
+
+
+def test_dca_buys_once_per_period(tmp_path):
+    times = daily(90)
+    write_series(str(tmp_path), "BBCA", times, np.full(90, 1000.0))
+    (result,), _ = run_backtests(str(tmp_path), ["BBCA"], [{"kind": "dca", "period": "M", "lots": 1}], 0.15, 0.25)
+    # January, February and March 2020
+    assert result["buys"] == 3
+    assert result["ticker"] == "BBCA"
@@ -0,0 +1,56 @@
+import io
+import json
+
+import pytest
+
+from cli import main
+
+
+def run_cli(monkeypatch, capsys, text, *argv):
+    monkeypatch.setattr("sys.stdin", io.StringIO(text))
+    status = main(list(argv))
+    out, err = capsys.readouterr()
+    return status, out, err
+
+
+@pytest.mark.parametrize("text", [
+    "[1]",
+    '["BBCA"]',
+    "[{\"current_avg\": 1000}",
+    '{"current_avg": 1000, "current_lots": 1, "target_sell_price": 1100}\n5\n',
+    "current_avg,current_lots,target_sell_price\n1000,x,1100\n",
+])
+def test_malformed_input_reports_error(monkeypatch, capsys, text):
+    status, out, err = run_cli(monkeypatch, capsys, text)
+    assert status == 2
+    assert out == ""
+    assert err.startswith("error: ")
+
+
+def test_valid_json(monkeypatch, capsys):
+    status, out, _ = run_cli(monkeypatch, capsys, '[{"current_avg": 1000, "current_lots": 10, "target_sell_price": 1100}]')
+    assert status == 0
+    (result,) = json.loads(out)
+    assert result["pnl_nominal"] == 100_000
+
+
+@pytest.mark.parametrize("row", [
+    "1000,1.5,0,0,1100",
+    "1000,10,900,2.5,1100",
+    "1000,10,900.5,5,1100",
+    "1000,10,900,5,1100.5",
+    "1000.125,10,900,5,1100",
+])
+def test_fixed_rejects_fractions(monkeypatch, capsys, row):
+    text = f"current_avg,current_lots,buy_price,buy_lots,target_sell_price\n{row}\n"
+    status, out, err = run_cli(monkeypatch, capsys, text, "--fixed")
+    assert status == 2
+    assert out == ""
+    assert "bulat" in err or "presisi" in err
+
+
+def test_fixed_matches_float_on_whole_inputs(monkeypatch, capsys):
+    text = "current_avg,current_lots,buy_price,buy_lots,target_sell_price\n1000.5,10,900,5,1100\n"
+    _, fixed_out, _ = run_cli(monkeypatch, capsys, text, "--fixed", "--format", "json")
+    _, float_out, _ = run_cli(monkeypatch, capsys, text, "--format", "json")
+    assert json.loads(fixed_out)[0]["pnl_nominal"] == round(json.loads(float_out)[0]["pnl_nominal"])
@@ -0,0 +1,27 @@
+import numpy as np
+
+from columnar import lttb
+
+
+def test_lttb_keeps_endpoints_and_point_count():
+    rng = np.random.default_rng(0)
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.cumsum(rng.normal(0, 1, len(x)))
+    for n_out in (3, 10, 500, 9_999):
+        keep = lttb(x, y, n_out)
+        assert len(keep) == n_out
+        assert keep[0] == 0 and keep[-1] == len(x) - 1
+        assert np.all(np.diff(keep) > 0)
+
+
+def test_lttb_keeps_a_lone_spike():
+    x = np.arange(1_000, dtype=np.float64)
+    y = np.zeros(len(x))
+    y[537] = 100.0
+    assert 537 in lttb(x, y, 50)
+
+
+def test_lttb_returns_everything_for_small_series():
+    x = np.arange(20, dtype=np.float64)
+    assert lttb(x, x, 50).tolist() == list(range(20))
+    assert lttb(x, x, 2).tolist() == list(range(20))
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from fees import FeeSide, compile_side
+
+SCHEDULE = FeeSide((0, 100_000_000), (0.20, 0.15), min_commission=10_000, vat_pct=11, levy_pct=0.04)
+
+
+def test_minimum_commission_applies_to_small_trades():
+    # 0.20% of 1,000,000 is 2,000, below the minimum
+    assert SCHEDULE.fee(1_000_000) == pytest.approx(10_000 * 1.11 + 400)
+    assert SCHEDULE.fee(0) == 0
+
+
+def test_tier_rate_applies_from_its_start():
+    assert SCHEDULE.fee(99_999_999) == pytest.approx(99_999_999 * 0.0020 * 1.11 + 99_999_999 * 0.0004)
+    assert SCHEDULE.fee(100_000_000) == pytest.approx(100_000_000 * 0.0015 * 1.11 + 100_000_000 * 0.0004)
+
+
+def test_flat_pct_ignores_minimum():
+    assert SCHEDULE.flat_pct == pytest.approx(0.20 * 1.11 + 0.04)
+
+
+def test_gross_for_net_is_smallest_trade_reaching_net():
+    for net in (1_000, 500_000, 5_000_000, 99_000_000, 250_000_000):
+        gross = SCHEDULE.gross_for_net(net)
+        assert gross - SCHEDULE.fee(gross) >= net * (1 - 1e-12)
+        assert (gross * (1 - 1e-9)) - SCHEDULE.fee(gross * (1 - 1e-9)) < net
+
+
+def test_array_twins_match_scalar():
+    values = np.array([0, 1, 1_000_000, 5_000_000, 99_999_999, 100_000_000, 3e9])
+    assert SCHEDULE.fee_array(values).tolist() == [SCHEDULE.fee(v) for v in values]
+    assert SCHEDULE.gross_for_net_array(values).tolist() == [SCHEDULE.gross_for_net(v) for v in values]
+
+
+def test_compile_side_sorts_tiers_and_requires_zero_start():
+    side = compile_side({"tiers": [[100_000_000, 0.15], [0, 0.20]], "min_commission": 10_000})
+    assert side.tiers_from == (0.0, 100_000_000.0)
+    assert side.tiers_pct == (0.20, 0.15)
+    with pytest.raises(ValueError):
+        compile_side({"tiers": [[1_000, 0.15]]})
@@ -0,0 +1,46 @@
+from decimal import ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP, Decimal
+
+import numpy as np
+import pytest
+
+from fees import FeeSide
+from fixedpoint import FixedFee, fixed_fee, format_fixed, round_div, to_ppm
+
+MODES = [ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP]
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_round_div_matches_decimal(mode):
+    # Every numerator in range, including exact quotients and ties (den 2, 4, 10)
+    num = np.arange(-60, 61, dtype=np.int64)
+    for den in (1, 2, 3, 4, 7, 10):
+        got = round_div(num, den, mode)
+        expected = [int((Decimal(int(n)) / Decimal(den)).quantize(Decimal(1), rounding=mode)) for n in num]
+        assert got.tolist() == expected
+        assert [int(round_div(int(n), den, mode)) for n in num] == expected
+
+
+def test_round_div_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        round_div(5, 2, "ROUND_SIDEWAYS")
+
+
+def test_fixed_fee_rounds_each_component_and_applies_minimum():
+    side = fixed_fee(FeeSide((0, 1_000_000), (0.15, 0.10), min_commission=5000, vat_pct=11, levy_pct=0.03))
+    # Below the tier: 0.15% is 1499.9985 -> 1500, lifted to the 5000 minimum; levy 299.9997 -> 300
+    assert int(side.fee(999_999)) == 5000 + 550 + 300
+    # Above it: 0.10% of 9,000,009 is 9000.009 -> 9000; VAT 990; levy 2700.0027 -> 2700
+    assert int(side.fee(9_000_009)) == 9000 + 990 + 2700
+    assert int(side.fee(0)) == 0
+
+
+def test_fixed_fee_from_percentage():
+    assert fixed_fee(0.15) == FixedFee(tiers_from=(0,), tiers_ppm=(1500,))
+    with pytest.raises(ValueError):
+        to_ppm(0.000015)
+
+
+def test_format_fixed_is_exact():
+    assert format_fixed(123456) == "1234.56"
+    assert format_fixed(-5) == "-0.05"
+    assert format_fixed(7, scale=1) == "7"
@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+from fees import FeeSide
+from ledger import replay_ledger
+
+LEDGER = b"ticker,side,price,lots\nBBCA,B,1000,10\nBBCA,B,900,10"
+
+
+def test_last_row_without_newline_is_replayed():
+    checkpoint = replay_ledger(io.BytesIO(LEDGER), 0.15, 0.25)
+    assert checkpoint["rows"] == 2
+    assert checkpoint["positions"]["BBCA"]["shares"] == 2000
+    assert checkpoint["positions"]["BBCA"]["avg"] == 950
+    assert checkpoint["offset"] == len(LEDGER)
+    assert checkpoint["unread_bytes"] == 0
+
+
+def test_last_row_without_newline_matches_small_chunks():
+    for chunk_size in (1, 7, 16):
+        checkpoint = replay_ledger(io.BytesIO(LEDGER), 0.15, 0.25, chunk_size=chunk_size)
+        assert checkpoint["rows"] == 2
+        assert checkpoint["positions"]["BBCA"]["shares"] == 2000
+
+
+def test_follow_holds_back_partial_row_until_terminated():
+    checkpoint = replay_ledger(io.BytesIO(LEDGER), 0.15, 0.25, follow=True)
+    assert checkpoint["rows"] == 1
+    assert checkpoint["unread_bytes"] == len(b"BBCA,B,900,10")
+
+    checkpoint = replay_ledger(io.BytesIO(LEDGER + b"0\n"), 0.15, 0.25, checkpoint, follow=True)
+    assert checkpoint["rows"] == 2
+    assert checkpoint["positions"]["BBCA"]["shares"] == 1000 + 10_000
+    assert checkpoint["unread_bytes"] == 0
+
+
+def test_fee_schedule_charges_minimum_commission_per_trade():
+    buy = FeeSide((0,), (0.15,), min_commission=5000)
+    sell = FeeSide((0,), (0.25,), min_commission=5000)
+    flat = replay_ledger(io.BytesIO(LEDGER), buy.flat_pct, sell.flat_pct)
+    schedule = replay_ledger(io.BytesIO(LEDGER), buy, sell)
+    assert schedule["positions"]["BBCA"]["avg"] == flat["positions"]["BBCA"]["avg"]
+    assert schedule["positions"]["BBCA"]["fees"] == 2 * 5000
+
+
+def test_flat_fee_schedule_matches_percentage():
+    sold = LEDGER + b"\nBBCA,S,1200,5\n"
+    flat = replay_ledger(io.BytesIO(sold), 0.15, 0.25)
+    schedule = replay_ledger(io.BytesIO(sold), FeeSide((0,), (0.15,)), FeeSide((0,), (0.25,)))
+    for key in ("shares", "avg", "fees", "realized_pnl"):
+        assert schedule["positions"]["BBCA"][key] == pytest.approx(flat["positions"]["BBCA"][key])
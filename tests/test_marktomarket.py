@@ -0,0 +1,27 @@
+import threading
+
+from marktomarket import MarkToMarket, replay_ticks
+
+POSITIONS = [{"ticker": "BBCA", "shares": 1000, "avg": 1000}]
+
+
+def test_replay_skips_short_rows():
+    data = b"time,ticker,price\n0,BBCA,1000\n1,BBCA\n\n2\n3,BBCA,1100\n"
+    assert list(replay_ticks(data)) == [("BBCA", 1000.0), ("BBCA", 1100.0)]
+    stop = threading.Event()
+    assert list(replay_ticks(data, speed=1000, stop=stop)) == [("BBCA", 1000.0), ("BBCA", 1100.0)]
+
+
+def test_unexpected_feed_error_is_surfaced():
+    def ticks():
+        yield "BBCA", 1100.0
+        raise KeyError("price")
+
+    engine = MarkToMarket(POSITIONS, 0.15, 0.25)
+    engine.start(ticks())
+    thread = engine._thread
+    if thread is not None:
+        thread.join(5)
+    assert isinstance(engine.error, KeyError)
+    assert engine.latest["running"] is False
+    assert engine.ticks == 1
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from fees import FeeSide
+from montecarlo import simulate_averaging
+
+PLAN = {
+    "current_avg": 1000, "current_lots": 10, "start_price": 900, "buy_lots": 5, "drop_pct": 5,
+    "max_buys": 3, "days": 60, "mu": 0.0, "sigma": 0.4, "buy_fee_pct": 0.15, "sell_fee_pct": 0.25,
+}
+
+
+def test_results_do_not_depend_on_workers():
+    serial = simulate_averaging(PLAN, 3_000, seed=7, workers=1, chunk_paths=1_000)
+    pooled = simulate_averaging(PLAN, 3_000, seed=7, workers=2, chunk_paths=1_000)
+    np.testing.assert_array_equal(serial["pnl"], pooled["pnl"])
+    assert serial["prob_reach_bep"] == pooled["prob_reach_bep"]
+
+
+def test_flat_price_path_matches_calculate_metrics_exit():
+    # No volatility and no drift: the price never moves, so no buy triggers
+    result = simulate_averaging({**PLAN, "sigma": 0.0}, 100, seed=1)
+    cost = 10 * 100 * 1000
+    assert result["pnl"] == pytest.approx(np.full(100, 10 * 100 * 900 * (1 - 0.0025) - cost))
+    assert result["mean_capital_deployed"] == 0
+    assert result["prob_reach_bep"] == 0
+
+
+def test_flat_fee_schedule_matches_percentage():
+    schedule = simulate_averaging({**PLAN, "buy_fee_pct": FeeSide((0,), (0.15,)), "sell_fee_pct": FeeSide((0,), (0.25,))}, 2_000, seed=3)
+    flat = simulate_averaging(PLAN, 2_000, seed=3)
+    np.testing.assert_allclose(schedule["pnl"], flat["pnl"], rtol=1e-12)
+    assert schedule["prob_reach_bep"] == flat["prob_reach_bep"]
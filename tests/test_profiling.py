@@ -0,0 +1,33 @@
+import math
+
+import pytest
+
+from profiling import BUCKETS, Histogram, Profiler
+
+
+def test_histogram_buckets_and_quantiles():
+    hist = Histogram()
+    assert math.isnan(hist.quantile(0.5))
+    for seconds in (0.5e-6, 2e-6, 2e-6, 3e-3, 20.0):
+        hist.observe(seconds)
+    assert hist.count == 5 and hist.max == 20.0
+    assert hist.counts[0] == 1 and hist.counts[-1] == 1
+    assert sum(hist.counts) == 5
+    # The median falls in the (1 us, 2.5 us] bucket
+    assert BUCKETS[0] < hist.quantile(0.5) <= BUCKETS[1]
+    assert hist.quantile(1.0) == 20.0
+
+
+def test_prometheus_buckets_are_cumulative():
+    profiler = Profiler()
+    for seconds in (1e-6, 1e-3, 1e-3, 2.0):
+        profiler.observe("main4", "call", "calculate_metrics", seconds)
+    (row,) = profiler.summary()
+    counts = list(row["buckets"].values())
+    assert counts == sorted(counts) and counts[-1] == 4
+    assert row["mean"] == pytest.approx((1e-6 + 2e-3 + 2.0) / 4)
+    text = profiler.to_prometheus()
+    assert 'le="+Inf"} 4' in text
+    assert 'stockcalc_duration_seconds_count{app="main4",kind="call",name="calculate_metrics"} 4' in text
+    profiler.reset()
+    assert profiler.summary() == []
@@ -0,0 +1,29 @@
+from rerun_cache import DerivedCache
+
+
+def test_reuses_value_while_inputs_are_unchanged():
+    cache = DerivedCache()
+    calls = []
+
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert cache.get("square", square, 3) == 9
+    assert cache.get("square", square, 3) == 9
+    assert cache.get("square", square, 4) == 16
+    assert calls == [3, 4]
+    assert cache.stats() == [("square", 1, 2, 1 / 3)]
+
+
+def test_end_rerun_evicts_entries_not_requested():
+    cache = DerivedCache()
+    cache.get("a", int, "1")
+    cache.get("b", int, "2")
+    cache.end_rerun()
+    assert len(cache) == 2
+    cache.get("a", int, "1")
+    cache.end_rerun()
+    assert len(cache) == 1
+    cache.get("b", int, "2")
+    assert cache.misses["b"] == 2
@@ -0,0 +1,90 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+from calculations import calculate_metrics
+from service import MAX_BODY, CalcClient, MicroBatcher, serve
+
+GOOD = {"current_avg": 1000, "current_lots": 10, "buy_price": 900, "buy_lots": 5,
+        "buy_fee_pct": 0.15, "sell_fee_pct": 0.25, "target_sell_price": 1100}
+
+
+@pytest.fixture(scope="module")
+def server_address():
+    ready = threading.Event()
+    address = []
+
+    def on_ready(server):
+        address.append(server.sockets[0].getsockname()[:2])
+        ready.set()
+
+    thread = threading.Thread(target=asyncio.run, args=(serve("127.0.0.1", 0, ready=on_ready),), daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    return address[0]
+
+
+def expected(row):
+    return calculate_metrics(row["current_avg"], row["current_lots"], row["buy_price"], row["buy_lots"],
+                             row["buy_fee_pct"], row["sell_fee_pct"], row["target_sell_price"])
+
+
+def test_batcher_survives_unexpected_error():
+    async def scenario():
+        batcher = MicroBatcher()
+        worker = asyncio.create_task(batcher.run())
+        # Not a dict: fails inside the batcher task, not in submit
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(batcher.submit([1]), 5)
+        results = await asyncio.wait_for(batcher.submit([GOOD]), 5)
+        assert not worker.done()
+        worker.cancel()
+        return results
+
+    (result,) = asyncio.run(scenario())
+    assert tuple(result.values()) == expected(GOOD)
+
+
+@pytest.mark.parametrize("payload", [
+    [1],
+    ["BBCA"],
+    [{"current_avg": 1000, "target_sell_price": 1100}],
+    [{**GOOD, "current_lots": 10.5}],
+    [{**GOOD, "buy_lots": 2.5}],
+])
+def test_bad_request_then_good_request(server_address, payload):
+    client = CalcClient("http://%s:%d" % server_address, timeout=5)
+    with pytest.raises(ValueError):
+        client.metrics(payload)
+    assert client.calculate_metrics(*(GOOD[name] for name in (
+        "current_avg", "current_lots", "buy_price", "buy_lots", "buy_fee_pct", "sell_fee_pct", "target_sell_price",
+    ))) == expected(GOOD)
+    client.close()
+
+
+def test_whole_float_lots_accepted(server_address):
+    client = CalcClient("http://%s:%d" % server_address, timeout=5)
+    (result,) = client.metrics([{**GOOD, "current_lots": 10.0, "buy_lots": 5.0}])
+    assert tuple(result.values()) == expected(GOOD)
+    client.close()
+
+
+def test_malformed_request_line(server_address):
+    with socket.create_connection(server_address, timeout=5) as sock:
+        sock.sendall(b"GARBAGE\r\n\r\n")
+        assert sock.recv(4096).startswith(b"HTTP/1.1 400")
+    client = CalcClient("http://%s:%d" % server_address, timeout=5)
+    assert len(client.metrics([GOOD])) == 1
+    client.close()
+
+
+@pytest.mark.parametrize("length, status", [(-1, b"400"), (MAX_BODY + 1, b"413")])
+def test_content_length_out_of_bounds(server_address, length, status):
+    with socket.create_connection(server_address, timeout=5) as sock:
+        sock.sendall(b"POST /metrics HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % length)
+        assert sock.recv(4096).startswith(b"HTTP/1.1 " + status)
+    client = CalcClient("http://%s:%d" % server_address, timeout=5)
+    assert len(client.metrics([GOOD])) == 1
+    client.close()
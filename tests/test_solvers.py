@@ -0,0 +1,42 @@
+import numpy as np
+
+from calculations import calculate_metrics
+from solvers import min_lots_to_reach_avg, min_lots_to_reach_avg_batch
+
+
+def test_empty_position_has_no_lot_answer():
+    assert min_lots_to_reach_avg(0, 0, 900, 950, 0.15) is None
+    assert np.isnan(min_lots_to_reach_avg_batch([0], [0], [900], [950], 0.15)[0])
+
+
+def test_unreachable_and_already_at_target():
+    assert min_lots_to_reach_avg(1000, 10, 1000, 950, 0.15) is None
+    assert min_lots_to_reach_avg(900, 10, 800, 950, 0.15) == 0
+
+
+def test_scalar_answer_is_minimal():
+    lots = min_lots_to_reach_avg(1000, 10, 800, 950, 0.15)
+    assert calculate_metrics(1000, 10, 800, lots, 0.15, 0, 0)[0] <= 950
+    assert calculate_metrics(1000, 10, 800, lots - 1, 0.15, 0, 0)[0] > 950
+
+
+def test_batch_matches_scalar():
+    rng = np.random.default_rng(7)
+    n = 5000
+    current_avg = rng.integers(50, 20_000, n).astype(float)
+    current_lots = rng.integers(0, 5_000, n)
+    buy_price = np.floor(current_avg * rng.uniform(0.3, 1.1, n))
+    target_avg = np.floor(current_avg * rng.uniform(0.5, 1.05, n))
+    # Targets that sit exactly on a reachable average, where float rounding decides the answer
+    exact = rng.random(n) < 0.3
+    k = rng.integers(1, 500, n)
+    fee = 0.15
+    target_avg[exact] = ((current_lots * 100 * current_avg + k * 100 * buy_price * (1 + fee / 100)) / ((current_lots + k) * 100))[exact]
+
+    batch = min_lots_to_reach_avg_batch(current_avg, current_lots, buy_price, target_avg, fee)
+    for i in range(n):
+        scalar = min_lots_to_reach_avg(current_avg[i], int(current_lots[i]), buy_price[i], target_avg[i], fee)
+        if scalar is None:
+            assert np.isnan(batch[i])
+        else:
+            assert batch[i] == scalar
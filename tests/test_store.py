@@ -0,0 +1,32 @@
+import numpy as np
+
+from store import PortfolioStore
+
+ROWS = [
+    {"ticker": "BBCA", "shares": 1000, "avg": 9000.0},
+    {"ticker": "BBRI", "shares": 500, "avg": 4000.0},
+]
+
+
+def cached_metric(store, computed):
+    def compute(columns):
+        computed.extend(columns["ticker"])
+        return columns["avg"] * 2
+
+    return store.metric_column("ACC1", "double", {"fee": 0.15}, store.load_positions("ACC1"), compute)
+
+
+def test_upsert_keeps_cached_metrics_of_untouched_tickers():
+    store = PortfolioStore(":memory:")
+    store.upsert_positions("ACC1", ROWS)
+    store.upsert_positions("ACC2", ROWS)
+    computed = []
+    cached_metric(store, computed)
+    assert computed == ["BBCA", "BBRI"]
+
+    store.upsert_positions("ACC1", [{"ticker": "BBCA", "shares": 2000, "avg": 8500.0}])
+    computed.clear()
+    values = cached_metric(store, computed)
+    assert computed == ["BBCA"]
+    np.testing.assert_array_equal(values, [17000.0, 8000.0])
+    store.close()